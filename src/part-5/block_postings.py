@@ -0,0 +1,191 @@
+"""
+分块压缩的 posting list 与块级跳表
+文档编号每 BLOCK_SIZE 个一块，块内相对上一块的最后一个编号做 gap 编码 (posting_codec 中的任一编码)，
+各块的字节首尾相接；另外保存一张很小的跳表，每块一项:
+├── last_docs[i]: 第 i 块的最后一个文档编号
+└── offsets[i]:   第 i 块在 data 中的起始字节，offsets[-1] 为 data 的长度
+游标 skip_to(id) 先在 last_docs 上二分找到第一个 last_docs >= id 的块，只解码这一块再在块内二分，
+中间跳过的块完全不解码。求交时短列表作为主导，长列表的大部分块不会被解码。
+
+ArrayCursor 为未压缩的有序编号列表提供相同的游标接口，两者可以混合求交。
+"""
+
+import bisect
+from array import array
+import posting_codec
+import skiplist
+
+
+BLOCK_SIZE = 64                 # 越小每次 skip_to 解码越少，跳表越大（每块 8 字节）
+DEFAULT_CODEC = 'varbyte'
+
+
+class BlockPostings:
+    """
+    用法:
+        postings = BlockPostings.build([3, 7, 8, 20, ...], codec='varbyte')
+        cursor = postings.cursor()
+        cursor.skip_to(10)       # -> 20
+    """
+
+    def __init__(self, data, last_docs, offsets, length, codec_name=DEFAULT_CODEC, block_size=BLOCK_SIZE):
+        self.data = data
+        self.last_docs = last_docs
+        self.offsets = offsets
+        self.length = length
+        self.codec_name = codec_name
+        self.block_size = block_size
+        self.codec = posting_codec.get_codec(codec_name)
+
+    @classmethod
+    def build(cls, doc_ids, codec=DEFAULT_CODEC, block_size=BLOCK_SIZE):
+        """
+        :param doc_ids: 严格递增的非负整数编号
+        :param codec: posting_codec.CODECS 中的编码名
+        """
+        encoder = posting_codec.get_codec(codec)
+        data = bytearray()
+        last_docs = array('I')
+        offsets = array('I', [0])
+        base = 0
+        for start in range(0, len(doc_ids), block_size):
+            block = doc_ids[start:start + block_size]
+            data += encoder.encode([doc_id - base for doc_id in block])
+            base = block[-1]
+            last_docs.append(base)
+            offsets.append(len(data))
+        return cls(bytes(data), last_docs, offsets, len(doc_ids), codec, block_size)
+
+    def __len__(self):
+        return self.length
+
+    @property
+    def block_count(self):
+        return len(self.last_docs)
+
+    def decode_block(self, block_no):
+        base = self.last_docs[block_no - 1] if block_no else 0
+        return self.codec.decode_after(self.data[self.offsets[block_no]:self.offsets[block_no + 1]], base)
+
+    def __iter__(self):
+        for block_no in range(self.block_count):
+            yield from self.decode_block(block_no)
+
+    def to_list(self):
+        return list(self)
+
+    def cursor(self, stats=None):
+        return BlockCursor(self, stats)
+
+    def range(self, start, stop):
+        """编号区间 [start, stop) 内的文档编号列表，只解码与区间相交的块"""
+        cursor = self.cursor()
+        result = []
+        doc = cursor.skip_to(start)
+        while doc is not None and doc < stop:
+            result.append(doc)
+            doc = cursor.next()
+        return result
+
+    def size_in_bytes(self):
+        return len(self.data) + self.last_docs.itemsize * len(self.last_docs) + \
+            self.offsets.itemsize * len(self.offsets)
+
+
+class BlockCursor:
+    """
+    BlockPostings 上的游标，接口与 skiplist.PostingCursor 相同 (doc / next / skip_to)
+    任一时刻只持有当前块解码后的编号
+    stats: 可选的统计字典，累计 'blocks_decoded'
+    """
+
+    def __init__(self, postings, stats=None):
+        self.postings = postings
+        self.stats = stats
+        self.block_no = -1
+        self.values = []
+        self.i = 0
+        if postings.block_count:
+            self._load(0)
+
+    def _load(self, block_no):
+        self.block_no = block_no
+        self.values = self.postings.decode_block(block_no)
+        self.i = 0
+        if self.stats is not None:
+            self.stats['blocks_decoded'] = self.stats.get('blocks_decoded', 0) + 1
+
+    def _finish(self):
+        self.block_no = self.postings.block_count
+        self.values = []
+        self.i = 0
+
+    def doc(self):
+        return self.values[self.i] if self.i < len(self.values) else None
+
+    def next(self):
+        if self.i >= len(self.values):
+            return None
+        self.i += 1
+        if self.i == len(self.values):
+            if self.block_no + 1 < self.postings.block_count:
+                self._load(self.block_no + 1)
+            else:
+                self._finish()
+                return None
+        return self.values[self.i]
+
+    def skip_to(self, id):
+        values = self.values
+        if self.i >= len(values) or values[self.i] >= id:
+            return self.doc()
+        if values[-1] < id:
+            # 当前块里没有，在块级跳表上二分，只解码落到的那一块
+            last_docs = self.postings.last_docs
+            block_no = bisect.bisect_left(last_docs, id, self.block_no + 1)
+            if block_no == len(last_docs):
+                self._finish()
+                return None
+            self._load(block_no)
+            values = self.values
+            self.i = bisect.bisect_left(values, id)
+        else:
+            self.i = bisect.bisect_left(values, id, self.i)
+        return values[self.i]
+
+
+class ArrayCursor:
+    """未压缩的有序编号列表上的游标，skip_to 直接二分"""
+
+    def __init__(self, values):
+        self.values = values
+        self.i = 0
+
+    def doc(self):
+        return self.values[self.i] if self.i < len(self.values) else None
+
+    def next(self):
+        if self.i < len(self.values):
+            self.i += 1
+        return self.doc()
+
+    def skip_to(self, id):
+        values = self.values
+        if self.i < len(values) and values[self.i] < id:
+            self.i = bisect.bisect_left(values, id, self.i)
+        return self.doc()
+
+
+def open_cursor(postings, stats=None):
+    if isinstance(postings, BlockPostings):
+        return postings.cursor(stats)
+    return ArrayCursor(postings)
+
+
+def intersect(*postings, stats=None):
+    """
+    多个 BlockPostings / 有序编号列表求交，最短的列表作为主导，其余的用 skip_to 跟随
+    :return: 交集的编号列表（有序）
+    """
+    postings = sorted(postings, key=len)
+    return list(skiplist.intersect_cursors([open_cursor(p, stats) for p in postings]))
@@ -6,37 +6,57 @@
 3. NOT - 差集操作
 4. 括号 () - 控制优先级
 5. 短语查询 "phrase" - 精确匹配短语（词项按顺序相邻）
+检索时可以指定文档区间 doc_range=(lo, hi)，只在 lo <= doc_id < hi 的文档中查找（任一端为 None 表示不限），
+区间限制下推到每个 posting list 的遍历中，而不是先求出完整结果再过滤。
 """
 
+import skiplist
+import posting_backends
+
+# 可以直接在其上打开游标的 posting list 类型
+_CURSOR_TYPES = (skiplist.SkipList, skiplist.SkipListRange)
+
+
+def _similar_length(posting1, posting2):
+    """两个运算对象的长度比小于 GALLOP_RATIO"""
+    short, long = sorted((len(posting1), len(posting2)))
+    return long < posting_backends.GALLOP_RATIO * short
+
 class BooleanSearchEngine:
-    def __init__(self, dictionary_index, inverted_posting_lists):
+    def __init__(self, dictionary_index, inverted_posting_lists, backend='skiplist', backend_options=None):
         """
         初始化布尔检索引擎
         :param dictionary_index: 压缩词典 {token: DictionaryEntry}
-        :param inverted_posting_lists: 倒排索引 {token: SkipList}
+        :param inverted_posting_lists: 倒排索引 {token: SkipList}，也可以是经由压缩词典解析的 DictionaryPostings
+        :param backend: 布尔运算的实现方式
+                        'skiplist' - AND 在长度悬殊的 SkipList 之间有序归并，利用跳表指针跳过不匹配的文档；
+                                     长度相近时改用集合求交（见 boolean_and）
+                        'set'      - 先把 posting list 展开成 Python set 再做集合运算
+                        'numpy'    - posting list 转为有序的 NumPy 整数数组，批量求交/并/差（需安装 numpy）
+                        'roaring'  - 高 df 词项用压缩位图，低 df 词项用有序数组
+                        'compressed' - posting list 分块 gap 压缩，AND 通过块级跳表只解码需要的块
+        :param backend_options: 传给后端的参数，如 {'codec': 'pfor'}
         """
         self.dictionary = dictionary_index
         self.posting_lists = inverted_posting_lists
+        self.backend = backend
+        self.ops = posting_backends.create_backend(backend, inverted_posting_lists, **(backend_options or {}))
         
-    def get_posting_list(self, token):
+    def get_posting_list(self, token, doc_range=None):
         """
         获取token的posting list（文档ID集合）
         :param token: 查询词项
+        :param doc_range: 可选的文档区间 (lo, hi)
         :return: set of doc_ids
         """
         if token not in self.posting_lists:
             return set()
         
         skip_list = self.posting_lists[token]
-        doc_ids = set()
+        lo, hi = doc_range or (None, None)
         
-        # 遍历SkipList获取所有文档ID
-        current = skip_list.header.forward[0]
-        while current:
-            doc_ids.add(current.value.id)
-            current = current.forward[0]
-            
-        return doc_ids
+        # 遍历SkipList获取文档ID（有下界时利用跳表指针直接定位）
+        return {value.id for value in skip_list.range(lo, hi)}
     
     def get_posting_list_with_positions(self, token):
         """
@@ -59,10 +79,23 @@ class BooleanSearchEngine:
             
         return positions
     
-    def phrase_query(self, phrase_tokens):
+    def _cursors(self, tokens, doc_range=None):
+        """
+        为每个词项打开一个 posting list 游标
+        :param doc_range: 可选的文档区间 (lo, hi)，游标只在区间内移动
+        :return: 游标列表；任一词项不存在时返回 None
+        """
+        if any(token not in self.posting_lists for token in tokens):
+            return None
+        lo, hi = doc_range or (None, None)
+        return [self.posting_lists[token].cursor(None, lo, hi) for token in tokens]
+    
+    def phrase_query(self, phrase_tokens, doc_range=None):
         """
         短语查询 - 查找包含指定短语的文档
+        各词项的游标同步推进求交，在公共文档上直接验证位置，不构建中间集合
         :param phrase_tokens: 短语中的词项列表，如 ["information", "retrieval"]
+        :param doc_range: 可选的文档区间 (lo, hi)
         :return: set of doc_ids
         """
         if not phrase_tokens:
@@ -70,70 +103,32 @@ class BooleanSearchEngine:
         
         if len(phrase_tokens) == 1:
             # 单个词项，直接返回posting list
-            return self.get_posting_list(phrase_tokens[0])
-        
-        # 1. 获取第一个词项的posting list（带位置）
-        first_token = phrase_tokens[0]
-        first_positions = self.get_posting_list_with_positions(first_token)
-        
-        # 候选文档集合（包含所有词项的文档）
-        candidate_docs = set(first_positions.keys())
-        
-        # 2. 对于短语中的其他词项，计算交集
-        for i in range(1, len(phrase_tokens)):
-            token = phrase_tokens[i]
-            token_positions = self.get_posting_list_with_positions(token)
-            
-            # 只保留同时包含当前词项的文档
-            candidate_docs = candidate_docs & set(token_positions.keys())
-            
-            if not candidate_docs:
-                return set()
+            return self.get_posting_list(phrase_tokens[0], doc_range)
         
-        # 3. 获取所有词项的位置信息
-        all_positions = []
-        for token in phrase_tokens:
-            all_positions.append(self.get_posting_list_with_positions(token))
+        cursors = self._cursors(phrase_tokens, doc_range)
+        if cursors is None:
+            return set()
         
-        # 4. 位置验证：检查词项是否在文档中按顺序相邻出现
         result_docs = set()
-        
-        for doc_id in candidate_docs:
-            if self._verify_phrase_positions(doc_id, phrase_tokens, all_positions):
+        for doc_id in skiplist.intersect_cursors(cursors):
+            if self._phrase_start_positions([c.positions() for c in cursors]):
                 result_docs.add(doc_id)
         
         return result_docs
     
-    def _verify_phrase_positions(self, doc_id, phrase_tokens, all_positions):
+    def _phrase_start_positions(self, positions_per_token):
         """
-        验证短语中的词项是否在文档中按顺序相邻出现
-        :param doc_id: 文档ID
-        :param phrase_tokens: 短语词项列表
-        :param all_positions: 每个词项的位置信息列表
-        :return: True if 短语匹配，False otherwise
+        验证短语中的词项是否在同一文档中按顺序相邻出现
+        第 i 个词项的位置减去 i 后与第一个词项的位置求交，剩下的即为短语的起始位置
+        :param positions_per_token: 每个词项在该文档中的位置列表
+        :return: 短语的起始位置列表（升序）
         """
-        # 获取第一个词项在该文档中的所有位置
-        first_token_positions = all_positions[0].get(doc_id, [])
-        
-        # 对于第一个词项的每个位置，检查后续词项是否按顺序相邻
-        for start_pos in first_token_positions:
-            match = True
-            
-            # 检查短语中的每个后续词项
-            for i in range(1, len(phrase_tokens)):
-                expected_pos = start_pos + i
-                token_positions = all_positions[i].get(doc_id, [])
-                
-                # 检查期望位置是否在词项的位置列表中
-                if expected_pos not in token_positions:
-                    match = False
-                    break
-            
-            # 如果找到完整匹配，返回True
-            if match:
-                return True
-        
-        return False
+        starts = set(positions_per_token[0])
+        for i in range(1, len(positions_per_token)):
+            starts.intersection_update([pos - i for pos in positions_per_token[i]])
+            if not starts:
+                return []
+        return sorted(starts)
     
     def positional_intersect(self, term1, term2, k=1):
         """
@@ -143,17 +138,15 @@ class BooleanSearchEngine:
         :param k: 词项间的最大距离，k=1表示相邻
         :return: {doc_id: [(pos1, pos2), ...]} - 满足邻近条件的位置对
         """
-        pos1 = self.get_posting_list_with_positions(term1)
-        pos2 = self.get_posting_list_with_positions(term2)
-        
-        # 找到同时包含两个词项的文档
-        common_docs = set(pos1.keys()) & set(pos2.keys())
+        cursors = self._cursors([term1, term2])
+        if cursors is None:
+            return {}
         
         result = {}
         
-        for doc_id in common_docs:
-            positions1 = pos1[doc_id]
-            positions2 = pos2[doc_id]
+        for doc_id in skiplist.intersect_cursors(cursors):
+            positions1 = cursors[0].positions()
+            positions2 = cursors[1].positions()
             
             # 找出满足距离要求的位置对
             valid_pairs = []
@@ -168,26 +161,76 @@ class BooleanSearchEngine:
         
         return result
     
+    def _term_operand(self, token, doc_range=None):
+        """
+        普通词项作为运算对象
+        skiplist 后端先保留 SkipList 本身（有文档区间时为 SkipListRange 视图），参与 AND 时才利用跳表指针求交；
+        set 后端直接展开为集合
+        """
+        if self.ops is not None:
+            return self.ops.term(token, doc_range)
+        if self.backend == 'skiplist' and token in self.posting_lists:
+            skip_list = self.posting_lists[token]
+            return skip_list if doc_range is None else skip_list.view(*doc_range)
+        return self.get_posting_list(token, doc_range)
+    
+    def _to_set(self, posting):
+        """把运算对象（SkipList、后端数组或 set）转换为文档ID集合"""
+        if self.ops is not None and self.ops.is_operand(posting):
+            return self.ops.to_doc_ids(posting)
+        if isinstance(posting, _CURSOR_TYPES):
+            return {value.id for value in posting.cursor()}
+        return posting
+    
     def boolean_and(self, posting1, posting2):
-        """AND操作 - 交集"""
+        """
+        AND操作 - 交集
+        长度相差 GALLOP_RATIO 倍以上时才利用跳表指针，长度相近时跳表指针几乎跳不过任何文档，直接做集合求交更快:
+        两个 SkipList: 有序归并，落后的一方沿跳表指针跳跃
+        SkipList 与 set: 按序用 set 中的文档在 SkipList 上 skip_to 探测
+        """
+        if self.ops is not None:
+            return self.ops.intersect(self.ops.coerce(posting1), self.ops.coerce(posting2))
+        list1 = isinstance(posting1, _CURSOR_TYPES)
+        list2 = isinstance(posting2, _CURSOR_TYPES)
+        if (list1 or list2) and _similar_length(posting1, posting2):
+            return self._to_set(posting1) & self._to_set(posting2)
+        if list1 and list2:
+            return set(skiplist.intersect(posting1, posting2))
+        if list1 or list2:
+            skip_list, doc_ids = (posting1, posting2) if list1 else (posting2, posting1)
+            cursor = skip_list.cursor()
+            return {doc_id for doc_id in sorted(doc_ids) if cursor.skip_to(doc_id) == doc_id}
         return posting1 & posting2
     
     def boolean_or(self, posting1, posting2):
         """OR操作 - 并集"""
-        return posting1 | posting2
+        if self.ops is not None:
+            return self.ops.union(self.ops.coerce(posting1), self.ops.coerce(posting2))
+        return self._to_set(posting1) | self._to_set(posting2)
     
     def boolean_not(self, posting1, all_docs):
         """NOT操作 - 差集（全集减去posting1）"""
-        return all_docs - posting1
+        if self.ops is not None:
+            return self.ops.difference(self.ops.coerce(all_docs), self.ops.coerce(posting1))
+        return all_docs - self._to_set(posting1)
     
-    def get_all_documents(self):
-        """获取所有文档ID集合"""
+    def _all_documents_operand(self, doc_range=None):
+        """NOT 运算使用的全集：数组后端直接使用后端的全集，避免重新遍历所有 posting list"""
+        if self.ops is not None:
+            return self.ops.all_docs(doc_range)
+        return self.get_all_documents(doc_range)
+    
+    def get_all_documents(self, doc_range=None):
+        """
+        获取所有文档ID集合
+        :param doc_range: 可选的文档区间 (lo, hi)，此时全集只包含区间内的文档
+        """
+        lo, hi = doc_range or (None, None)
         all_docs = set()
         for skip_list in self.posting_lists.values():
-            current = skip_list.header.forward[0]
-            while current:
-                all_docs.add(current.value.id)
-                current = current.forward[0]
+            for value in skip_list.range(lo, hi):
+                all_docs.add(value.id)
         return all_docs
     
     def tokenize_query(self, query):
@@ -245,12 +288,29 @@ class BooleanSearchEngine:
         
         return tokens
     
-    def parse_expression(self, tokens):
+    def parse_expression(self, tokens, doc_range=None):
         """
         递归解析布尔表达式（支持短语查询）
         :param tokens: token列表
+        :param doc_range: 可选的文档区间 (lo, hi)，传递给每个运算对象
         :return: 文档ID集合
         """
+        return self._to_set(self._evaluate_query(tokens, doc_range))
+    
+    def _evaluate_query(self, tokens, doc_range=None):
+        """
+        求值整个查询；数组后端在求值途中遇到新文档会重建编号表，此前得到的运算对象用的是旧编号，需要重新求值一次
+        """
+        doc_table = self.ops.doc_table if self.ops is not None else None
+        result = self._evaluate(tokens, doc_range)
+        if self.ops is not None and self.ops.doc_table is not doc_table:
+            result = self._evaluate(tokens, doc_range)
+        return result
+    
+    def _evaluate(self, tokens, doc_range=None):
+        """
+        parse_expression 的实现，返回运算对象本身（数组后端为整数编号），子表达式之间不转换为文档ID集合
+        """
         # 处理括号优先级
         def find_matching_paren(tokens, start):
             """找到匹配的右括号"""
@@ -276,7 +336,7 @@ class BooleanSearchEngine:
                 end = find_matching_paren(tokens, i)
                 if end == -1:
                     raise ValueError("括号不匹配")
-                sub_result = self.parse_expression(tokens[i+1:end])
+                sub_result = self._evaluate(tokens[i+1:end], doc_range)
                 
                 if result is None:
                     result = sub_result
@@ -302,19 +362,19 @@ class BooleanSearchEngine:
                     end = find_matching_paren(tokens, i)
                     if end == -1:
                         raise ValueError("括号不匹配")
-                    sub_result = self.parse_expression(tokens[i+1:end])
+                    sub_result = self._evaluate(tokens[i+1:end], doc_range)
                     i = end + 1
                 elif next_token.startswith('PHRASE:'):
                     # 短语查询
                     phrase_content = next_token[7:]  # 去掉 'PHRASE:' 前缀
                     phrase_tokens = phrase_content.split()
-                    sub_result = self.phrase_query(phrase_tokens)
+                    sub_result = self.phrase_query(phrase_tokens, doc_range)
                     i += 1
                 else:
-                    sub_result = self.get_posting_list(next_token)
+                    sub_result = self._term_operand(next_token, doc_range)
                     i += 1
                 
-                all_docs = self.get_all_documents()
+                all_docs = self._all_documents_operand(doc_range)
                 not_result = self.boolean_not(sub_result, all_docs)
                 
                 if result is None:
@@ -329,10 +389,10 @@ class BooleanSearchEngine:
                 if token.startswith('PHRASE:'):
                     phrase_content = token[7:]  # 去掉 'PHRASE:' 前缀
                     phrase_tokens = phrase_content.split()
-                    current_posting = self.phrase_query(phrase_tokens)
+                    current_posting = self.phrase_query(phrase_tokens, doc_range)
                 else:
                     # 普通词项
-                    current_posting = self.get_posting_list(token)
+                    current_posting = self._term_operand(token, doc_range)
                 
                 if result is None:
                     result = current_posting
@@ -347,16 +407,28 @@ class BooleanSearchEngine:
         
         return result if result is not None else set()
     
-    def search(self, query):
+    def search(self, query, doc_range=None):
         """
         执行布尔检索（支持短语查询）
         :param query: 布尔查询表达式，支持短语用引号括起来
+        :param doc_range: 可选的文档区间 (lo, hi)，只返回 lo <= doc_id < hi 的文档，None 表示不限
         :return: 匹配的文档ID集合
         """
         tokens = self.tokenize_query(query)
-        result = self.parse_expression(tokens)
+        result = self.parse_expression(tokens, doc_range)
         return result
     
+    def search_ordinals(self, query, doc_range=None):
+        """
+        与 search 相同，但数组后端 ('numpy' / 'roaring' / 'compressed') 直接返回后端的运算对象，
+        即有序的整数编号（self.ops.doc_table 中的 ordinal），省去把结果逐个转换回文档ID的开销；
+        'skiplist' / 'set' 后端没有整数编号，返回文档ID集合
+        """
+        result = self._evaluate_query(self.tokenize_query(query), doc_range)
+        if self.ops is None:
+            return self._to_set(result)
+        return self.ops.coerce(result)
+    
     def search_with_positions(self, token):
         """
         获取token在文档中的详细位置信息
@@ -377,41 +449,14 @@ class BooleanSearchEngine:
         if len(phrase_tokens) == 1:
             return self.get_posting_list_with_positions(phrase_tokens[0])
         
-        # 获取所有词项的位置信息
-        all_positions = []
-        candidate_docs = None
-        
-        for token in phrase_tokens:
-            token_positions = self.get_posting_list_with_positions(token)
-            all_positions.append(token_positions)
-            
-            if candidate_docs is None:
-                candidate_docs = set(token_positions.keys())
-            else:
-                candidate_docs = candidate_docs & set(token_positions.keys())
+        cursors = self._cursors(phrase_tokens)
+        if cursors is None:
+            return {}
         
         # 找出短语的起始位置
         result = {}
-        assert candidate_docs is not None
-        
-        for doc_id in candidate_docs:
-            start_positions = []
-            first_token_positions = all_positions[0].get(doc_id, [])
-            
-            for start_pos in first_token_positions:
-                match = True
-                
-                for i in range(1, len(phrase_tokens)):
-                    expected_pos = start_pos + i
-                    token_positions = all_positions[i].get(doc_id, [])
-                    
-                    if expected_pos not in token_positions:
-                        match = False
-                        break
-                
-                if match:
-                    start_positions.append(start_pos)
-            
+        for doc_id in skiplist.intersect_cursors(cursors):
+            start_positions = self._phrase_start_positions([c.positions() for c in cursors])
             if start_positions:
                 result[doc_id] = start_positions
         
@@ -1,6 +1,12 @@
-from collections import defaultdict
+from collections import defaultdict, OrderedDict
+from collections.abc import Mapping
+from array import array
+import bisect
 import os
+import random
 import sys
+import threading
+import time
 import skiplist
 
 
@@ -60,8 +66,14 @@ def front_code_and_block(sorted_tokens, block_size=4):
         
     return global_term_string, dictionary_index
 
-def reconstruct_token_from_string(block_data, index_in_block):
-    """从压缩字符串中重建词项"""
+def reconstruct_token_from_string(block_data, index_in_block, cache=None):
+    """
+    从压缩字符串中重建词项
+    :param cache: 可选的 BlockCache，以块数据为键缓存解码后的整个块，同一个块只切分、解码一次
+    """
+    if cache is not None:
+        tokens = cache.get(block_data, lambda data: tuple(iter_block_tokens(data)))
+        return tokens[index_in_block] if index_in_block < len(tokens) else None
     tokens = []
     parts = block_data.split('|')
     
@@ -87,6 +99,385 @@ def reconstruct_token_from_string(block_data, index_in_block):
         return tokens[index_in_block]
     return None
 
+def iter_block_tokens(block_data):
+    """按顺序逐个解码块内的词项（生成器），查找时可以在找到目标后提前结束"""
+    parts = block_data.split('|')
+    if len(parts) < 3:
+        return
+    current_token = parts[2]
+    yield current_token
+    for i in range(3, len(parts) - 2, 3):
+        current_token = current_token[:int(parts[i])] + parts[i + 2]
+        yield current_token
+
+# --- 字节级前端编码 ---
+# 每个块: varint(len(anchor)) anchor
+#         [varint(prefix_len) varint(len(suffix)) suffix] * (k-1)
+# 词项按 UTF-8 编码，公共前缀按字节计算；varint 每字节低 7 位存数据，最高位为 1 表示后面还有字节
+
+def encode_varint(value, out):
+    """把非负整数以 varint 格式追加到 bytearray"""
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+def decode_varint(data, pos):
+    """
+    从 data[pos] 开始读取一个 varint
+    :return: (value, 下一个字节的位置)
+    """
+    value = 0
+    shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, pos
+        shift += 7
+
+def front_code_and_block_bytes(sorted_tokens, block_size=4):
+    """
+    字节级的前端编码和分块，在 bytearray 中原地追加构建
+    :return: (term_bytes, dictionary_index)，DictionaryEntry 中的偏移和长度以字节计
+    """
+    term_bytes = bytearray()
+    dictionary_index = {}
+
+    for block_id, i in enumerate(range(0, len(sorted_tokens), block_size)):
+        block_tokens = sorted_tokens[i:i + block_size]
+        anchor_token = block_tokens[0]
+        block_start = len(term_bytes)
+
+        prev = anchor_token.encode('utf-8')
+        encode_varint(len(prev), term_bytes)
+        term_bytes += prev
+        for token in block_tokens[1:]:
+            current = token.encode('utf-8')
+            prefix_len = 0
+            limit = min(len(prev), len(current))
+            while prefix_len < limit and prev[prefix_len] == current[prefix_len]:
+                prefix_len += 1
+            encode_varint(prefix_len, term_bytes)
+            encode_varint(len(current) - prefix_len, term_bytes)
+            term_bytes += current[prefix_len:]
+            prev = current
+
+        dictionary_index[anchor_token] = skiplist.DictionaryEntry(
+            block_id=block_id,
+            term_string_offset=block_start,
+            compressed_length=len(term_bytes) - block_start,
+            df=calculate_df_placeholder(anchor_token),
+            post_list_ref=1000 + block_id
+        )
+
+    return bytes(term_bytes), dictionary_index
+
+def iter_block_tokens_bytes(block_data):
+    """单遍解码字节格式的块：每个词项由上一个词项的前缀和本项后缀拼接，不需要先切分整个块"""
+    length, pos = decode_varint(block_data, 0)
+    current = block_data[pos:pos + length]
+    pos += length
+    yield current.decode('utf-8')
+    end = len(block_data)
+    while pos < end:
+        prefix_len, pos = decode_varint(block_data, pos)
+        suffix_len, pos = decode_varint(block_data, pos)
+        current = current[:prefix_len] + block_data[pos:pos + suffix_len]
+        pos += suffix_len
+        yield current.decode('utf-8')
+
+# --- 解码后的词典块缓存 ---
+
+DEFAULT_BLOCK_CACHE_BYTES = 1 << 20
+
+def decoded_block_size(tokens):
+    """解码后的块（词项元组）占用的内存字节数"""
+    return sys.getsizeof(tokens) + sum(sys.getsizeof(token) for token in tokens)
+
+class BlockCache:
+    """
+    解码后词典块的 LRU 缓存，按内存字节数限制容量
+    查询路径上的热点块只解码一次；记录命中、未命中和淘汰次数
+    多个读线程可以共享同一个缓存
+    """
+    def __init__(self, max_bytes=DEFAULT_BLOCK_CACHE_BYTES):
+        """
+        :param max_bytes: 缓存的块占用内存的上限（字节），超过时淘汰最久未使用的块
+        """
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._blocks = OrderedDict()      # {key: (tokens, size)}
+        self._lock = threading.Lock()
+
+    def get(self, key, decode):
+        """
+        :param key: 块的键（块号或块数据）
+        :param decode: 未命中时调用 decode(key) 解码，返回词项元组
+        """
+        with self._lock:
+            cached = self._blocks.get(key)
+            if cached is not None:
+                self._blocks.move_to_end(key)
+                self.hits += 1
+                return cached[0]
+            self.misses += 1
+        tokens = decode(key)
+        size = decoded_block_size(tokens)
+        if size > self.max_bytes:
+            return tokens
+        with self._lock:
+            if key not in self._blocks:
+                self._blocks[key] = (tokens, size)
+                self.current_bytes += size
+                while self.current_bytes > self.max_bytes:
+                    _, (_, evicted_size) = self._blocks.popitem(last=False)
+                    self.current_bytes -= evicted_size
+                    self.evictions += 1
+        return tokens
+
+    def __len__(self):
+        return len(self._blocks)
+
+    @property
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self):
+        return {
+            'blocks': len(self._blocks),
+            'bytes': self.current_bytes,
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hit_rate,
+        }
+
+    def clear(self):
+        with self._lock:
+            self._blocks.clear()
+            self.current_bytes = 0
+            self.hits = self.misses = self.evictions = 0
+
+class BlockedDictionary:
+    """
+    分块前端编码词典上的词项查找（字符串格式和字节格式均可）
+    只保存各块的 Anchor Token（有序）和对应的 DictionaryEntry，不需要全部词项的字典:
+    1. 在 Anchor 列表上二分查找，定位词项所在的块 —— O(log B)
+    2. 在块内顺序解码，与目标比较 —— O(k)；给出 block_cache 时热点块只解码一次，块内二分查找
+    """
+    def __init__(self, term_string, dictionary_index, posting_store=None, block_cache=None):
+        """
+        :param term_string: front_code_and_block 生成的压缩词典字符串，或 front_code_and_block_bytes 生成的字节串
+        :param dictionary_index: {anchor_token: DictionaryEntry}
+        :param posting_store: posting list 存储（列表），entry.post_list_offsets 中的下标指向这里
+        :param block_cache: 可选的 BlockCache，以块号为键缓存解码后的块
+        """
+        self.term_string = term_string
+        self._decode_block = iter_block_tokens_bytes if isinstance(term_string, bytes) else iter_block_tokens
+        self.anchors = sorted(dictionary_index)
+        self.entries = [dictionary_index[anchor] for anchor in self.anchors]
+        self.posting_store = posting_store
+        self.block_cache = block_cache
+
+    def __len__(self):
+        return len(self.anchors)
+
+    @property
+    def block_size(self):
+        """块大小 k：除最后一个块外，每个块都恰好有 k 个词项"""
+        return len(self.decode_block_terms(0)) if self.entries else 0
+
+    def find_block(self, term):
+        """词项可能所在的块号（最后一个 Anchor <= term 的块），term 小于所有 Anchor 时返回 -1"""
+        return bisect.bisect_right(self.anchors, term) - 1
+
+    def block_data(self, block_no):
+        entry = self.entries[block_no]
+        return self.term_string[entry.term_string_offset : entry.term_string_offset + entry.compressed_length]
+
+    def decode_block_terms(self, block_no):
+        """不经过缓存解码一个块；全量扫描时使用，避免冲掉缓存中的热点块"""
+        return tuple(self._decode_block(self.block_data(block_no)))
+
+    def block_terms(self, block_no):
+        if self.block_cache is not None:
+            return list(self.block_cache.get(block_no, self.decode_block_terms))
+        return list(self._decode_block(self.block_data(block_no)))
+
+    def lookup(self, term):
+        """
+        查找词项
+        :return: (DictionaryEntry, 块内序号)；词项不存在时返回 None
+        """
+        block_no = self.find_block(term)
+        if block_no < 0:
+            return None
+        if self.block_cache is not None:
+            # 块内词项有序（字节格式按 UTF-8 字节序，与码点序一致）
+            tokens = self.block_cache.get(block_no, self.decode_block_terms)
+            index_in_block = bisect.bisect_left(tokens, term)
+            if index_in_block < len(tokens) and tokens[index_in_block] == term:
+                return self.entries[block_no], index_in_block
+            return None
+        for index_in_block, token in enumerate(self._decode_block(self.block_data(block_no))):
+            if token == term:
+                return self.entries[block_no], index_in_block
+            if token > term:
+                break
+        return None
+
+    def __contains__(self, term):
+        return self.lookup(term) is not None
+
+    def attach_postings(self, inverted_posting_lists):
+        """
+        按块解码全部词项，把每个词项的 posting list 依次放入 posting_store，
+        并在所在块的 entry.post_list_offsets 中记录下标；之后可以只通过词典访问 posting list
+        :return: posting_store
+        """
+        self.posting_store = []
+        for block_no, entry in enumerate(self.entries):
+            offsets = array('I')
+            for token in self.decode_block_terms(block_no):
+                offsets.append(len(self.posting_store))
+                self.posting_store.append(inverted_posting_lists[token])
+            entry.post_list_offsets = offsets
+        return self.posting_store
+
+    def get_posting_list(self, term):
+        """词项 -> posting list（经由块内序号和 post_list_offsets），词项不存在时返回 None"""
+        found = self.lookup(term)
+        if found is None:
+            return None
+        entry, index_in_block = found
+        return self.posting_store[entry.post_list_offsets[index_in_block]]
+
+class DictionaryPostings(Mapping):
+    """
+    经由压缩词典解析的只读倒排表 {token: SkipList}
+    可以代替完整的以字符串为键的倒排表字典传给 BooleanSearchEngine 等模块:
+    token -> lookup (Anchor 二分 + 块内解码) -> post_list_offsets -> posting_store
+    给出 term_hash (perfect_hash.PerfectHash) 时精确查找改为 O(1):
+    token -> term_hash.lookup -> 词项序号，posting_store 与有序词表同序，序号即下标
+    """
+    def __init__(self, blocked_dictionary, term_hash=None):
+        self.dictionary = blocked_dictionary
+        self.term_hash = term_hash
+
+    @classmethod
+    def build(cls, term_string, dictionary_index, inverted_posting_lists, term_hash=None, block_cache=None):
+        blocked_dictionary = BlockedDictionary(term_string, dictionary_index, block_cache=block_cache)
+        blocked_dictionary.attach_postings(inverted_posting_lists)
+        return cls(blocked_dictionary, term_hash)
+
+    def __getitem__(self, token):
+        if self.term_hash is not None:
+            term_id = self.term_hash.lookup(token)
+            if term_id is None:
+                raise KeyError(token)
+            return self.dictionary.posting_store[term_id]
+        posting = self.dictionary.get_posting_list(token)
+        if posting is None:
+            raise KeyError(token)
+        return posting
+
+    def __contains__(self, token):
+        if self.term_hash is not None:
+            return self.term_hash.lookup(token) is not None
+        return self.dictionary.lookup(token) is not None
+
+    def __iter__(self):
+        for block_no in range(len(self.dictionary)):
+            yield from self.dictionary.decode_block_terms(block_no)
+
+    def __len__(self):
+        return len(self.dictionary.posting_store)
+
+    def values(self):
+        # posting_store 与词项同序，直接返回，避免逐个词项查找
+        return self.dictionary.posting_store
+
+    def items(self):
+        return zip(iter(self), self.dictionary.posting_store)
+
+# --- 块大小 k 的选择 ---
+
+BLOCK_SIZE_CANDIDATES = [1, 2, 4, 8, 16, 32, 64]
+BLOCK_POINTER_BYTES = 4     # 每个块在 Anchor 表中需要一个指向词典字节串的偏移
+LATENCY_SLACK = 2.0         # 不限内存时，p99 不超过最快的 k 的该倍数即可接受，在其中选择词典最小的 k
+
+# 词典的存储格式 -> 构建函数；index_build 的检查点和快照保存的是 'string' 格式
+DICTIONARY_FORMATS = {
+    'string': front_code_and_block,
+    'bytes': front_code_and_block_bytes,
+}
+
+def dictionary_size_in_bytes(term_bytes, dictionary_index):
+    """词典占用的字节数：前端编码字节串（字符串格式按 UTF-8 计）+ 二分查找用的 Anchor 字符串 + 每块一个偏移"""
+    if isinstance(term_bytes, str):
+        term_bytes = term_bytes.encode('utf-8')
+    anchor_bytes = sum(len(anchor.encode('utf-8')) for anchor in dictionary_index)
+    return len(term_bytes) + anchor_bytes + BLOCK_POINTER_BYTES * len(dictionary_index)
+
+def measure_block_size(sorted_tokens, block_size, query_tokens, dictionary_format='string'):
+    """
+    对一个 k 构建词典并测量
+    :param dictionary_format: DICTIONARY_FORMATS 中的格式，默认与实际保存的格式相同
+    :return: {'k', 'bytes', 'build_ms', 'p50_us', 'p99_us'}
+    """
+    start_time = time.perf_counter()
+    term_string, dictionary_index = DICTIONARY_FORMATS[dictionary_format](sorted_tokens, block_size)
+    blocked_dictionary = BlockedDictionary(term_string, dictionary_index)
+    build_time = time.perf_counter() - start_time
+
+    latencies = []
+    for token in query_tokens:
+        start_time = time.perf_counter()
+        blocked_dictionary.lookup(token)
+        latencies.append(time.perf_counter() - start_time)
+    latencies.sort()
+    return {
+        'k': block_size,
+        'bytes': dictionary_size_in_bytes(term_string, dictionary_index),
+        'build_ms': build_time * 1000,
+        'p50_us': latencies[len(latencies) // 2] * 1e6,
+        'p99_us': latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1e6,
+    }
+
+def choose_block_size(measurements, memory_budget=None, latency_slack=LATENCY_SLACK):
+    """
+    有内存预算时，在满足预算的 k 中选择 p99 查找延迟最低的一个；没有 k 能满足预算时选择词典最小的一个
+    不限内存时只看延迟会选到 k=1（词典比原始词项还大），因此在 p99 不超过最快者 latency_slack 倍的 k 中选择词典最小的一个
+    :param measurements: measure_block_size 的结果列表
+    :param memory_budget: 词典的字节数上限，None 表示不限
+    """
+    if memory_budget is None:
+        fastest = min(m['p99_us'] for m in measurements)
+        acceptable = [m for m in measurements if m['p99_us'] <= fastest * latency_slack]
+        return min(acceptable, key=lambda m: (m['bytes'], m['p99_us']))['k']
+    fitting = [m for m in measurements if m['bytes'] <= memory_budget]
+    if not fitting:
+        return min(measurements, key=lambda m: m['bytes'])['k']
+    return min(fitting, key=lambda m: (m['p99_us'], m['bytes']))['k']
+
+def tune_block_size(sorted_tokens, memory_budget=None, candidates=BLOCK_SIZE_CANDIDATES, n_queries=20000, seed=42,
+                    dictionary_format='string'):
+    """
+    在真实词表上扫描候选的 k，返回 (选中的 k, 测量结果列表)
+    查询词项从词表中随机抽取（有放回）
+    """
+    rng = random.Random(seed)
+    query_tokens = [rng.choice(sorted_tokens) for _ in range(n_queries)]
+    measurements = [measure_block_size(sorted_tokens, k, query_tokens, dictionary_format) for k in candidates]
+    return choose_block_size(measurements, memory_budget), measurements
+
 # --- 文件读取与Token收集 ---
 
 def read_documents(input_path, input_ending):
@@ -132,6 +523,25 @@ def invert_index(documents):
 
     return dict(inverted_index)
 
+def add_documents(inverted_posting_lists, new_documents):
+    """
+    增量更新倒排索引：把新文档按词项分组、按 doc_id 排序后，用 merge_sorted 一次合并进各自的 SkipList
+    :param inverted_posting_lists: 倒排索引 {token: SkipList}，原地修改
+    :param new_documents: 新文档 {doc_id: {token: [positions]}}，格式同 read_documents
+    :return: 本次更新涉及的词项集合
+    """
+    new_postings = defaultdict(list)
+    for doc_id in sorted(new_documents):
+        for token, pos in new_documents[doc_id].items():
+            new_postings[token].append(skiplist.Value(doc_id, pos))
+
+    for token, values in new_postings.items():
+        if token not in inverted_posting_lists:
+            inverted_posting_lists[token] = skiplist.SkipList(max_level=MAX_LEVEL, p=P)
+        inverted_posting_lists[token].merge_sorted(values)
+
+    return set(new_postings)
+
 def integrate_index_and_dictionary(documents, sorted_tokens, BLOCK_SIZE):
     """集成倒排索引和压缩词典"""
     # 步骤1: 构建倒排索引
@@ -157,24 +567,23 @@ def integrate_index_and_dictionary(documents, sorted_tokens, BLOCK_SIZE):
 def run():
     input_path = "output_data/"
     input_ending = '.stw' 
-    BLOCK_SIZE = 4
-
-    # 1. 文件读取与 Token 收集
-    documents = read_documents(input_path, input_ending)
-    
-    # 2. 收集并排序所有唯一的 Token
-    sorted_tokens = collect_and_sort_tokens(documents)
+    BLOCK_SIZE = 4                 # 或 'auto'：按 DICTIONARY_MEMORY_BUDGET 自动选择 k（见 test_block_size.py）
+    DICTIONARY_MEMORY_BUDGET = None   # 词典字节数上限，None 表示不限
+    POSTING_CODEC = 'varbyte'      # 快照中文档编号的编码: 'varbyte' | 'gamma' | 'delta' | 'rice' | 'pfor' | None
+    CHECKPOINT_DIR = "./checkpoint/"
 
-    # 3. 构建压缩词典
-    # term_string, dictionary_index = front_code_and_block(sorted_tokens, BLOCK_SIZE)
+    # index_build 依赖本模块，在函数内导入以避免循环导入
+    import index_build
 
-    # 3.5 融入之前的倒排表设计
-    global_term_string, final_dictionary, inverted_posting_lists = integrate_index_and_dictionary(
-        documents=documents,
-        sorted_tokens=sorted_tokens,
-        BLOCK_SIZE=BLOCK_SIZE
+    # 1~3. 文件读取、Token 收集、倒排、词典压缩，按阶段写检查点，中断后可续建
+    sorted_tokens, term_string, dictionary_index, inverted_posting_lists = index_build.build_index(
+        input_path=input_path,
+        input_ending=input_ending,
+        block_size=BLOCK_SIZE,
+        checkpoint_dir=CHECKPOINT_DIR,
+        memory_budget=DICTIONARY_MEMORY_BUDGET,
+        codec=POSTING_CODEC
     )
-    term_string, dictionary_index = global_term_string, final_dictionary
     
     # --- 4. 结果演示 ---
     
@@ -200,21 +609,20 @@ def run():
         print("----------------------------------------------------------------------------------------------------")
 
         # --- 查询演示 ---
-        
-        # 1. 查找 'apricot' (Block 0, Anchor 'apple')
-        query_token = 'archer'
-        anchor_token_for_query = 'april' # 手动查找 Anchor Token
-        
-        if anchor_token_for_query in dictionary_index:
-            entry = dictionary_index[anchor_token_for_query]
-            block_data = term_string[entry.term_string_offset : entry.term_string_offset + entry.compressed_length]
-            
-            # 查找 'archer' 在 Block 0 中的索引 (['apple', 'apply', 'apricot', 'banana']) -> 2
-            reconstructed = reconstruct_token_from_string(block_data, 2)
-            print(f"\n查询演示：查找 '{query_token}'")
-            print(f"  使用 Anchor: '{anchor_token_for_query}', 重建结果: '{reconstructed}'")
-        else:
-            print(f"\n警告：Anchor Token '{anchor_token_for_query}' 不存在于词典索引中。")
+        # 在 Anchor 上二分定位块，再在块内解码，不需要事先知道词项所在块的 Anchor
+        block_cache = BlockCache()
+        blocked_dictionary = BlockedDictionary(term_string, dictionary_index, block_cache=block_cache)
+        print("\n查询演示：")
+        for query_token in ['archer', sorted_tokens[len(sorted_tokens) // 2], 'zzzz_not_a_term']:
+            found = blocked_dictionary.lookup(query_token)
+            if found is None:
+                print(f"  '{query_token}': 不存在于词典中")
+                continue
+            entry, index_in_block = found
+            anchor_token = blocked_dictionary.anchors[entry.block_id]
+            print(f"  '{query_token}': Block {entry.block_id} (Anchor '{anchor_token}'), 块内序号 {index_in_block}, "
+                  f"块内词项 {blocked_dictionary.block_terms(entry.block_id)}")
+        print(f"块缓存: {block_cache.stats()}")
 
         sys.stdout = STDOUT
         print(f"词典压缩方案已成功演示，结果已写入 '{filename}'")
@@ -227,13 +635,19 @@ def run():
 
     print("\n\n--- 存储空间对比摘要 ---")
     print(f"Token 总数: {len(sorted_tokens)}")
-    print(f"词典块大小 (k): {BLOCK_SIZE}")
+    block_size = blocked_dictionary.block_size
+    print(f"词典块大小 (k): {block_size}")
     print("-----------------------------------")
     print(f"1. 词典字符串存储:")
     print(f"   - 原索引 (所有 Token 字符串): {original_token_length} 字符/字节")
     print(f"   - 压缩后 (global_term_string): {compressed_string_length} 字符/字节")
     compression_ratio = (1 - (compressed_string_length / original_token_length)) * 100
     print(f"   - 压缩率: {compression_ratio:.2f}%")
+    term_bytes, _ = front_code_and_block_bytes(sorted_tokens, block_size)
+    string_bytes = len(term_string.encode('utf-8'))
+    print(f"   - 字节格式 (varint 长度): {len(term_bytes)} 字节")
+    print(f"   - 每词项字节数: 字符串格式 {string_bytes / len(sorted_tokens):.2f}, "
+          f"字节格式 {len(term_bytes) / len(sorted_tokens):.2f}")
     print("-----------------------------------")
     print("2. 倒排记录表存储:")
     print(f"2. 倒排索引统计:")
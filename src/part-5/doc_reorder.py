@@ -0,0 +1,136 @@
+"""
+文档编号重排 (doc-ID reassignment)
+快照中的文档编号默认是文档名排序后的下标，与内容无关，posting list 中的 gap 基本随机。
+把内容相似的文档编到相邻的编号上，同一词项的文档就会聚在一起，gap 变小、压缩后更短，
+直接用新编号构建的分块 posting list (block_postings) 求交时需要解码的块也可能更少（见 test_doc_reorder.py）。
+index_build 的快照和加载后的各布尔后端都按文档名编号，本模块只用于比较各种编号顺序的效果（结果见 test_doc_reorder 的日志）。
+
+可选的编号顺序 (ORDERINGS):
+├── name       文档名的字典序（默认，与 DocIdTable 一致）
+├── file_id    文件名是数字 ID 时按数值排序（相当于按 URL / 抓取 ID 排列），否则按文档名
+├── minhash    每个文档的词项集合取 MinHash 签名，按签名排序: Jaccard 相似的文档签名前缀相同的概率高
+└── bisection  递归图二分 (Dhulipala et al., KDD 2016): 把文档集合对半划分，反复交换能让
+               sum_t deg_t * log2(n / (deg_t + 1)) (两半各自估计的 log-gap 代价) 下降最多的文档对，再对两半递归
+只出现在一个文档中的词项不影响任何 gap，排序时忽略
+"""
+
+from collections import Counter
+import math
+import random
+
+
+MINHASH_FUNCTIONS = 8
+BISECTION_ITERATIONS = 8
+BISECTION_MIN_SIZE = 16
+_MERSENNE_PRIME = (1 << 61) - 1
+
+
+def document_terms(postings):
+    """
+    :param postings: {token: [(doc_id, pos), ...]}
+    :return: {doc_id: [词项序号, ...]}，只包含出现在两个及以上文档中的词项
+    """
+    doc_terms = {}
+    for term_id, token in enumerate(sorted(postings)):
+        entries = postings[token]
+        for doc_id, _ in entries:
+            terms = doc_terms.setdefault(doc_id, [])
+            if len(entries) > 1:
+                terms.append(term_id)
+    return doc_terms
+
+
+def order_by_name(doc_terms):
+    return sorted(doc_terms)
+
+
+def _file_id_key(name):
+    return (0, int(name), name) if name.isdigit() else (1, 0, name)
+
+
+def order_by_file_id(doc_terms):
+    return sorted(doc_terms, key=_file_id_key)
+
+
+def order_by_minhash(doc_terms, n_functions=MINHASH_FUNCTIONS, seed=42):
+    """按 MinHash 签名 (n_functions 个 (a * t + b) mod p 的最小值) 的字典序排列文档"""
+    rng = random.Random(seed)
+    functions = [(rng.randrange(1, _MERSENNE_PRIME), rng.randrange(_MERSENNE_PRIME)) for _ in range(n_functions)]
+
+    def signature(doc_id):
+        terms = doc_terms[doc_id]
+        if not terms:
+            return (_MERSENNE_PRIME,) * n_functions
+        return tuple(min((a * t + b) % _MERSENNE_PRIME for t in terms) for a, b in functions)
+
+    return sorted(doc_terms, key=lambda doc_id: (signature(doc_id), doc_id))
+
+
+def _move_gains(docs, doc_terms, deg_from, deg_to, log2):
+    """
+    每个文档从所在的一半移到另一半后代价的下降量
+    两半大小相同，log2(n) 项在移动前后抵消，只需比较 -deg * log2(deg + 1)；
+    同一半中含词项 t 的文档移动时 t 的代价变化都相同，按词项先算一次再对每个文档求和
+    """
+    def cost(deg):
+        return -deg * log2[deg + 1]
+
+    delta = {t: cost(a) + cost(deg_to[t]) - cost(a - 1) - cost(deg_to[t] + 1) for t, a in deg_from.items()}
+    gains = [(sum(map(delta.__getitem__, doc_terms[doc_id])), doc_id) for doc_id in docs]
+    gains.sort(reverse=True)
+    return gains
+
+
+def _bisect(docs, doc_terms, iterations, min_size, log2, out):
+    if len(docs) <= min_size:
+        out.extend(sorted(docs))
+        return
+    half = len(docs) // 2
+    left, right = docs[:half], docs[half:]
+    for _ in range(iterations):
+        deg_left = Counter(t for doc_id in left for t in doc_terms[doc_id])
+        deg_right = Counter(t for doc_id in right for t in doc_terms[doc_id])
+        gains_left = _move_gains(left, doc_terms, deg_left, deg_right, log2)
+        gains_right = _move_gains(right, doc_terms, deg_right, deg_left, log2)
+        moved = set()
+        for (gain_l, doc_l), (gain_r, doc_r) in zip(gains_left, gains_right):
+            if gain_l + gain_r <= 0:
+                break
+            moved.add(doc_l)
+            moved.add(doc_r)
+        if not moved:
+            break
+        left, right = ([d for d in left if d not in moved] + [d for d in right if d in moved],
+                       [d for d in right if d not in moved] + [d for d in left if d in moved])
+    _bisect(left, doc_terms, iterations, min_size, log2, out)
+    _bisect(right, doc_terms, iterations, min_size, log2, out)
+
+
+def order_by_bisection(doc_terms, iterations=BISECTION_ITERATIONS, min_size=BISECTION_MIN_SIZE):
+    """
+    :param iterations: 每一层划分最多的交换轮数
+    :param min_size: 文档数不超过该值时不再划分，按文档名排列
+    """
+    log2 = [0.0] + [math.log2(i) for i in range(1, len(doc_terms) + 2)]
+    out = []
+    _bisect(sorted(doc_terms), doc_terms, iterations, min_size, log2, out)
+    return out
+
+
+ORDERINGS = {
+    'name': order_by_name,
+    'file_id': order_by_file_id,
+    'minhash': order_by_minhash,
+    'bisection': order_by_bisection,
+}
+
+
+def reorder(postings, order='name'):
+    """
+    :param postings: {token: [(doc_id, pos), ...]}
+    :param order: ORDERINGS 中的名称
+    :return: doc_names，doc_names[新编号] 为文档ID
+    """
+    if order not in ORDERINGS:
+        raise ValueError(f"未知的文档编号顺序: {order}，可选: {', '.join(ORDERINGS)}")
+    return ORDERINGS[order](document_terms(postings))
@@ -0,0 +1,59 @@
+"""
+文档ID映射表
+倒排表中的 doc_id 是文件名字符串；位图、NumPy 数组和差值编码都需要连续的整数编号。
+DocIdTable 在二者之间转换：整数编号 (ordinal) 即文档在 names 列表中的下标。
+"""
+
+import bisect
+
+
+class DocIdTable:
+    def __init__(self, names):
+        """
+        :param names: 文档ID列表，下标即整数编号
+        """
+        self.names = list(names)
+        self.index = {name: ordinal for ordinal, name in enumerate(self.names)}
+
+    @classmethod
+    def from_posting_lists(cls, inverted_posting_lists):
+        """收集倒排表中出现的全部文档ID，按 doc_id 排序后编号（与 SkipList 中的顺序一致）"""
+        all_docs = set()
+        for skip_list in inverted_posting_lists.values():
+            for value in skip_list.cursor():
+                all_docs.add(value.id)
+        return cls(sorted(all_docs))
+
+    def __len__(self):
+        return len(self.names)
+
+    def ordinal(self, name):
+        return self.index[name]
+
+    def name(self, ordinal):
+        return self.names[ordinal]
+
+    def to_ordinals(self, names):
+        """文档ID序列 -> 有序的整数编号列表（忽略表中不存在的文档）"""
+        index = self.index
+        return sorted(index[name] for name in names if name in index)
+
+    def to_names(self, ordinals):
+        """整数编号序列 -> 文档ID集合"""
+        names = self.names
+        return {names[ordinal] for ordinal in ordinals}
+
+    def ordinal_range(self, doc_range):
+        """
+        文档ID区间 (lo, hi) -> 整数编号区间 [start, stop)
+        要求 names 有序（from_posting_lists 构建的表满足），任一端为 None 表示不限
+        """
+        lo, hi = doc_range
+        start = 0 if lo is None else bisect.bisect_left(self.names, lo)
+        stop = len(self.names) if hi is None else bisect.bisect_left(self.names, hi)
+        return start, max(start, stop)
+
+    def posting_ordinals(self, skip_list):
+        """SkipList 中的文档 -> 有序的整数编号列表"""
+        index = self.index
+        return sorted(index[value.id] for value in skip_list.cursor())
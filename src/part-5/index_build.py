@@ -0,0 +1,367 @@
+"""
+可断点续建的索引构建流程
+将 compress_index / main 中的一次性构建拆分为若干阶段，每个阶段完成后写入检查点:
+1. read       - 读取文档，收集 Token 及位置
+2. invert     - 按文档分区构建倒排表，每个分区单独写检查点
+3. dictionary - 词典前端编码与分块
+4. snapshot   - 写出最终的索引快照，词表上的最小完美哈希 term_hash 另存为单独的文件（加载它不需要读取整个快照）；
+                文档编号按 posting_codec 差值压缩后写入，位置另存为单独的 varbyte 流
+构建中途崩溃后重新运行，会从最后一个完成的阶段(分区)继续，而不是从头开始。
+"""
+
+from collections import defaultdict
+import hashlib
+import json
+import os
+import pickle
+import compress_index as Compress
+import perfect_hash
+import posting_codec
+from position_store import PackedValue, pack_positions
+import skiplist
+
+
+PHASES = ['read', 'invert', 'dictionary', 'snapshot']
+MANIFEST_NAME = 'manifest.json'
+SNAPSHOT_NAME = 'index.snapshot'
+TERM_HASH_NAME = 'term_hash.pkl'
+NUM_PARTITIONS = 8
+POSTING_CODEC = 'varbyte'
+
+
+# --- 检查点文件读写 ---
+
+def _atomic_write(path, data, binary=True):
+    """先写临时文件再 rename，保证检查点文件要么完整、要么不存在"""
+    tmp_path = path + '.tmp'
+    mode = 'wb' if binary else 'w'
+    encoding = None if binary else 'utf-8'
+    with open(tmp_path, mode, encoding=encoding) as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def _dump(obj, path):
+    _atomic_write(path, pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL))
+
+
+def _load(path):
+    with open(path, 'rb') as f:
+        return pickle.load(f)
+
+
+class BuildCheckpoint:
+    """
+    检查点目录及其 manifest 的管理
+    manifest 记录构建参数（含输入文件指纹）和已完成的阶段；参数或输入文件变化时旧检查点作废，重新构建
+    """
+    def __init__(self, checkpoint_dir, params):
+        self.checkpoint_dir = checkpoint_dir
+        self.params = params
+        os.makedirs(checkpoint_dir, exist_ok=True)
+        self.manifest_path = os.path.join(checkpoint_dir, MANIFEST_NAME)
+        self.manifest = self._load_manifest()
+
+    def _load_manifest(self):
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+            if manifest.get('params') == self.params:
+                return manifest
+            print("构建参数或输入文件已改变，丢弃旧的检查点")
+        return {'params': self.params, 'completed': [], 'partitions': []}
+
+    def _save_manifest(self):
+        _atomic_write(self.manifest_path, json.dumps(self.manifest, ensure_ascii=False, indent=2), binary=False)
+
+    def path(self, name):
+        return os.path.join(self.checkpoint_dir, name)
+
+    def is_done(self, phase):
+        return phase in self.manifest['completed']
+
+    def mark_done(self, phase):
+        if phase not in self.manifest['completed']:
+            self.manifest['completed'].append(phase)
+        self._save_manifest()
+
+    def is_partition_done(self, partition_id):
+        return partition_id in self.manifest['partitions']
+
+    def mark_partition_done(self, partition_id):
+        self.manifest['partitions'].append(partition_id)
+        self._save_manifest()
+
+
+def input_fingerprint(input_path, input_ending):
+    """
+    输入文件的指纹：文件名、大小和修改时间的摘要
+    放进构建参数后，增删或修改输入文件都会让旧检查点作废，而不是一直加载过期的快照
+    """
+    digest = hashlib.sha1()
+    for name in sorted(os.listdir(input_path)):
+        if name.endswith(input_ending):
+            stat = os.stat(os.path.join(input_path, name))
+            digest.update(f"{name}\0{stat.st_size}\0{stat.st_mtime_ns}\n".encode('utf-8'))
+    return digest.hexdigest()
+
+
+# --- 倒排表的可序列化形式 ---
+# SkipList 是深层链表，直接 pickle 会触发递归深度限制，所以检查点中统一存 {token: [(doc_id, pos), ...]}
+
+def skiplists_to_postings(inverted_posting_lists):
+    """SkipList 倒排表 -> {token: [(doc_id, pos), ...]}"""
+    postings = {}
+    for token, skip_list in inverted_posting_lists.items():
+        entries = []
+        current = skip_list.header.forward[0]
+        while current:
+            entries.append((current.value.id, current.value.pos))
+            current = current.forward[0]
+        postings[token] = entries
+    return postings
+
+
+def postings_to_skiplists(postings):
+    """{token: [(doc_id, pos), ...]} -> SkipList 倒排表"""
+    inverted_posting_lists = {}
+    for token, entries in postings.items():
+        skip_list = skiplist.SkipList(max_level=Compress.MAX_LEVEL, p=Compress.P)
+        for doc_id, pos in entries:
+            skip_list.insert(skiplist.Value(doc_id, pos))
+        inverted_posting_lists[token] = skip_list
+    return inverted_posting_lists
+
+
+def _invert_partition(documents, doc_ids):
+    """对一个文档分区构建倒排表，结果按 doc_id 有序"""
+    partial = defaultdict(list)
+    for doc_id in doc_ids:
+        for token, pos in documents[doc_id].items():
+            partial[token].append((doc_id, list(pos)))
+    return dict(partial)
+
+
+def _split_partitions(doc_ids, num_partitions):
+    """将有序的 doc_id 列表切分为连续的区间"""
+    size = max(1, -(-len(doc_ids) // num_partitions))
+    return [doc_ids[i:i + size] for i in range(0, len(doc_ids), size)]
+
+
+# --- 各阶段 ---
+
+def _phase_read(ckpt, input_path, input_ending):
+    path = ckpt.path('documents.pkl')
+    if ckpt.is_done('read'):
+        print("[read] 检查点已存在，跳过文档读取")
+        return _load(path)
+    documents = Compress.read_documents(input_path, input_ending)
+    _dump(documents, path)
+    ckpt.mark_done('read')
+    print(f"[read] 完成: {len(documents)} 个文档")
+    return documents
+
+
+def _phase_invert(ckpt, documents, num_partitions):
+    partitions = _split_partitions(sorted(documents.keys()), num_partitions)
+    if not ckpt.is_done('invert'):
+        for partition_id, doc_ids in enumerate(partitions):
+            if ckpt.is_partition_done(partition_id):
+                print(f"[invert] 分区 {partition_id} 检查点已存在，跳过")
+                continue
+            _dump(_invert_partition(documents, doc_ids), ckpt.path(f'invert-{partition_id}.pkl'))
+            ckpt.mark_partition_done(partition_id)
+            print(f"[invert] 分区 {partition_id}/{len(partitions) - 1} 完成 ({len(doc_ids)} 个文档)")
+        ckpt.mark_done('invert')
+    else:
+        print("[invert] 检查点已存在，跳过倒排")
+
+    return load_partitions([ckpt.path(f'invert-{partition_id}.pkl') for partition_id in range(len(partitions))])
+
+
+def load_partitions(paths):
+    """
+    读取并拼接若干倒排分区文件
+    各分区是连续的 doc_id 区间，按分区顺序拼接即保持有序
+    :return: {token: [(doc_id, pos), ...]}
+    """
+    postings = defaultdict(list)
+    for path in paths:
+        for token, entries in _load(path).items():
+            postings[token].extend(entries)
+    return dict(postings)
+
+
+def partition_paths(checkpoint_dir):
+    """
+    检查点中倒排分区文件的路径（按 doc_id 区间的顺序），分片进程可以直接各自加载，不经过主进程
+    """
+    with open(os.path.join(checkpoint_dir, MANIFEST_NAME), 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    if 'invert' not in manifest['completed']:
+        raise ValueError(f"检查点 '{checkpoint_dir}' 中的倒排阶段尚未完成")
+    return [os.path.join(checkpoint_dir, f'invert-{partition_id}.pkl')
+            for partition_id in sorted(manifest['partitions'])]
+
+
+def _phase_dictionary(ckpt, sorted_tokens, block_size, memory_budget=None):
+    path = ckpt.path('dictionary.pkl')
+    if ckpt.is_done('dictionary'):
+        print("[dictionary] 检查点已存在，跳过词典压缩")
+        return _load(path)
+    if block_size == 'auto':
+        block_size, _ = Compress.tune_block_size(sorted_tokens, memory_budget)
+        budget = "不限内存" if memory_budget is None else f"按内存预算 {memory_budget} 字节"
+        print(f"[dictionary] {budget}选择块大小 k={block_size}")
+    global_term_string, dictionary_index = Compress.front_code_and_block(sorted_tokens, block_size)
+    _dump((global_term_string, dictionary_index), path)
+    ckpt.mark_done('dictionary')
+    print(f"[dictionary] 完成: {len(dictionary_index)} 个块")
+    return global_term_string, dictionary_index
+
+
+def _phase_snapshot(ckpt, snapshot, term_hash):
+    _dump(term_hash, ckpt.path(TERM_HASH_NAME))
+    _dump(snapshot, ckpt.path(SNAPSHOT_NAME))
+    ckpt.mark_done('snapshot')
+    print(f"[snapshot] 索引快照已写入 '{ckpt.path(SNAPSHOT_NAME)}'")
+
+
+def _attach_posting_lists(dictionary_index, inverted_posting_lists):
+    """与 integrate_index_and_dictionary 的步骤3相同：把 SkipList 关联到 DictionaryEntry"""
+    for anchor_token, entry in dictionary_index.items():
+        entry.post_list_ref = inverted_posting_lists[anchor_token]
+    return dictionary_index
+
+
+def _snapshot_postings(snapshot):
+    """快照中的倒排表 -> {token: [(doc_id, pos), ...]}；未压缩的旧快照原样返回"""
+    codec_name = snapshot.get('posting_codec')
+    if codec_name is None:
+        return snapshot['postings']
+    return posting_codec.decode_postings(snapshot['doc_names'], snapshot['postings'], codec_name)
+
+
+def _packed_skiplists(snapshot, position_store):
+    """
+    快照中的压缩倒排表 -> SkipList 倒排表，节点的值是指向 position_store 的 PackedValue
+    每个词项位置流中的 gap 段直接复制到 position_store，不还原位置列表
+    """
+    codec = posting_codec.get_codec(snapshot['posting_codec'])
+    doc_names = snapshot['doc_names']
+    reordered = any(a > b for a, b in zip(doc_names, doc_names[1:]))
+    inverted_posting_lists = {}
+    for token, (data, stream) in snapshot['postings'].items():
+        values = [PackedValue(doc_names[ordinal], tf, offset, position_store)
+                  for ordinal, (tf, offset) in zip(codec.decode(data), position_store.extend(stream))]
+        if reordered:
+            values.sort(key=lambda value: value.id)
+        inverted_posting_lists[token] = skiplist.SkipList.from_sorted(
+            values, max_level=Compress.MAX_LEVEL, p=Compress.P, stride=None)
+    return inverted_posting_lists
+
+
+def _snapshot_skiplists(snapshot, position_store=None):
+    """
+    快照中的倒排表 -> SkipList 倒排表
+    给出 position_store 时位置装入其中（见 _packed_skiplists）；未压缩或位置仍以列表存放的旧快照先还原再 pack_positions
+    """
+    if position_store is None:
+        return postings_to_skiplists(_snapshot_postings(snapshot))
+    if snapshot.get('posting_codec') is not None and all(
+            isinstance(stream, bytes) for _, stream in snapshot['postings'].values()):
+        return _packed_skiplists(snapshot, position_store)
+    inverted_posting_lists = postings_to_skiplists(_snapshot_postings(snapshot))
+    pack_positions(inverted_posting_lists, position_store)
+    return inverted_posting_lists
+
+
+def load_snapshot(snapshot_path, position_store=None):
+    """
+    读取索引快照
+    :param position_store: 可选的 PositionStore，给出时 posting 为 PackedValue，位置直接取自快照中的位置流
+    :return: (sorted_tokens, global_term_string, final_dictionary, inverted_posting_lists)
+    """
+    snapshot = _load(snapshot_path)
+    inverted_posting_lists = _snapshot_skiplists(snapshot, position_store)
+    final_dictionary = _attach_posting_lists(snapshot['dictionary'], inverted_posting_lists)
+    return snapshot['sorted_tokens'], snapshot['term_string'], final_dictionary, inverted_posting_lists
+
+
+def load_term_hash(checkpoint_dir):
+    """
+    读取词项完美哈希 (term -> 有序词表中的序号)，只读取 term_hash 文件，不反序列化整个快照
+    旧版本的检查点没有该文件时退回到快照: 快照中也没有 term_hash 时由其中的 sorted_tokens 重新构建
+    """
+    path = os.path.join(checkpoint_dir, TERM_HASH_NAME)
+    if os.path.exists(path):
+        return _load(path)
+    snapshot = _load(os.path.join(checkpoint_dir, SNAPSHOT_NAME))
+    term_hash = snapshot.get('term_hash')
+    if term_hash is None:
+        term_hash = perfect_hash.PerfectHash.build(snapshot['sorted_tokens'])
+    return term_hash
+
+
+def build_index(input_path, input_ending, block_size, checkpoint_dir, num_partitions=NUM_PARTITIONS,
+                memory_budget=None, codec=POSTING_CODEC, position_store=None):
+    """
+    带检查点的索引构建，中断后再次调用会从最后完成的阶段继续
+    :param input_path: 输入文件目录
+    :param input_ending: 输入文件后缀
+    :param block_size: 词典分块大小 k；'auto' 表示在真实词表上扫描 k，选择满足 memory_budget 的最快的一个，
+                       不限内存时选择 p99 与最快者相差不超过 LATENCY_SLACK 倍的最小词典（见 Compress.choose_block_size）
+    :param checkpoint_dir: 检查点目录
+    :param num_partitions: 倒排阶段的文档分区数
+    :param memory_budget: block_size='auto' 时词典的字节数上限，None 表示不限
+    :param codec: 快照中文档编号的压缩编码（见 posting_codec.CODECS），None 表示不压缩
+    :param position_store: 可选的 PositionStore，给出时返回的倒排表中 posting 为 PackedValue，
+                           位置由快照中的位置流直接装入该 store，不在内存中保留位置列表
+    :return: (sorted_tokens, global_term_string, final_dictionary, inverted_posting_lists)
+    """
+    params = {
+        'input_path': input_path,
+        'input_ending': input_ending,
+        'input_fingerprint': input_fingerprint(input_path, input_ending),
+        'block_size': block_size,
+        'num_partitions': num_partitions,
+        'memory_budget': memory_budget,
+        'codec': codec,
+    }
+    ckpt = BuildCheckpoint(checkpoint_dir, params)
+
+    if ckpt.is_done('snapshot'):
+        print("[snapshot] 检查点已存在，直接加载索引快照")
+        return load_snapshot(ckpt.path(SNAPSHOT_NAME), position_store)
+
+    # 1. 文档读取
+    documents = _phase_read(ckpt, input_path, input_ending)
+    sorted_tokens = Compress.collect_and_sort_tokens(documents)
+
+    # 2. 分区倒排
+    postings = _phase_invert(ckpt, documents, num_partitions)
+
+    # 3. 词典压缩
+    global_term_string, dictionary_index = _phase_dictionary(ckpt, sorted_tokens, block_size, memory_budget)
+
+    # 4. 快照写出
+    snapshot = {
+        'sorted_tokens': sorted_tokens,
+        'term_string': global_term_string,
+        'dictionary': dictionary_index,
+        'postings': postings,
+    }
+    if codec is not None:
+        snapshot['posting_codec'] = codec
+        snapshot['doc_names'], snapshot['postings'] = posting_codec.encode_postings(postings, codec)
+    _phase_snapshot(ckpt, snapshot, perfect_hash.PerfectHash.build(sorted_tokens))
+
+    if position_store is None:
+        inverted_posting_lists = postings_to_skiplists(postings)
+    else:
+        del postings
+        inverted_posting_lists = _snapshot_skiplists(snapshot, position_store)
+    final_dictionary = _attach_posting_lists(dictionary_index, inverted_posting_lists)
+    return sorted_tokens, global_term_string, final_dictionary, inverted_posting_lists
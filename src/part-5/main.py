@@ -2,6 +2,9 @@ from collections import defaultdict
 import os
 import sys
 import compress_index as Compress
+import index_build
+import term_trie
+import position_store
 import boolean_search_v2 as boolean_search   # 导入布尔检索模块
 
 
@@ -10,21 +13,33 @@ import boolean_search_v2 as boolean_search   # 导入布尔检索模块
 def run():
     input_path = "output_data/"
     input_ending = '.stw' 
-    BLOCK_SIZE = 4
+    BLOCK_SIZE = 4                 # 或 'auto'：按 DICTIONARY_MEMORY_BUDGET 自动选择 k（见 test_block_size.py）
+    DICTIONARY_MEMORY_BUDGET = None   # 词典字节数上限，None 表示不限
+    POSTING_CODEC = 'varbyte'      # 快照中文档编号的编码: 'varbyte' | 'gamma' | 'delta' | 'rice' | 'pfor' | None
+    CHECKPOINT_DIR = "./checkpoint/"
+    BOOLEAN_BACKEND = 'skiplist'   # 'skiplist'（长度悬殊时跳表归并，相近时集合求交）| 'set' | 'numpy' | 'roaring' | 'compressed'
 
-    # 1. 文件读取与Token收集
-    documents = Compress.read_documents(input_path, input_ending)
-    
-    # 2. 收集并排序所有唯一Token
-    sorted_tokens = Compress.collect_and_sort_tokens(documents)
-
-    # 3. 构建压缩词典和倒排索引
-    global_term_string, final_dictionary, inverted_posting_lists = Compress.integrate_index_and_dictionary(
-        documents=documents,
-        sorted_tokens=sorted_tokens,
-        BLOCK_SIZE=BLOCK_SIZE
+    # 1~3. 文件读取、Token 收集、倒排、词典压缩，按阶段写检查点，中断后可续建
+    # 位置放在单独的压缩流中，posting 只保留 tf 与偏移，短语 / 邻近查询读取 .pos 时才解码；
+    # 从快照加载时位置流直接装入 positions，不先还原出位置列表
+    positions = position_store.PositionStore()
+    sorted_tokens, global_term_string, final_dictionary, inverted_posting_lists = index_build.build_index(
+        input_path=input_path,
+        input_ending=input_ending,
+        block_size=BLOCK_SIZE,
+        checkpoint_dir=CHECKPOINT_DIR,
+        memory_budget=DICTIONARY_MEMORY_BUDGET,
+        codec=POSTING_CODEC,
+        position_store=positions
     )
     term_string, dictionary_index = global_term_string, final_dictionary
+
+    # 每个块记录块内全部词项的 posting 下标，之后只通过压缩词典访问 posting list，释放完整的倒排表字典
+    # 精确查找经由检查点中单独保存的最小完美哈希（不重新读取快照），O(1) 得到词项序号（即 posting 下标）
+    term_hash = index_build.load_term_hash(CHECKPOINT_DIR)
+    posting_lists = Compress.DictionaryPostings.build(term_string, dictionary_index, inverted_posting_lists,
+                                                      term_hash=term_hash)
+    del inverted_posting_lists
     
     # --- 4. 基础结果演示 ---
     os.makedirs('./test', exist_ok=True)
@@ -49,7 +64,25 @@ def run():
         for i, (token, entry) in enumerate(dictionary_index.items()):
             if i >= 10: break
             print(f"Anchor: '{token}' -> {entry}")
-        
+
+        print(f"\n[D] 词典查找 (Anchor 二分定位块 + 块内解码)")
+        print("-"*80)
+        blocked_dictionary = posting_lists.dictionary
+        for token in ['book', 'club', 'information', 'zzzz_not_a_term']:
+            found = blocked_dictionary.lookup(token)
+            if found is None:
+                print(f"'{token}': 不存在于词典中")
+            else:
+                entry, index_in_block = found
+                offset = entry.post_list_offsets[index_in_block]
+                print(f"'{token}': Block {entry.block_id}, 块内序号 {index_in_block}, Posting 下标 {offset}")
+
+        print(f"\n[E] 输入提示 (DAWG 词典，按 df 取前 5 个补全)")
+        print("-"*80)
+        trie = term_trie.TermTrie.build(sorted_tokens, term_trie.document_frequencies(posting_lists))
+        for prefix in ['bo', 'cl', 'inf']:
+            print(f"'{prefix}' -> {trie.complete(prefix, 5)}")
+
         # --- 5. 布尔检索演示 ---
         print("\n\n")
         print("="*80)
@@ -59,13 +92,16 @@ def run():
         # 初始化布尔检索引擎
         search_engine = boolean_search.BooleanSearchEngine(
             dictionary_index=dictionary_index,
-            inverted_posting_lists=inverted_posting_lists
+            inverted_posting_lists=posting_lists,
+            backend=BOOLEAN_BACKEND
         )
         
         # 演示三种复杂查询
         boolean_search.demo_boolean_search(search_engine)
+        boolean_decodes = positions.decodes
         # 新增短语查询
         boolean_search.demo_phrase_search(search_engine)
+        phrase_decodes = positions.decodes - boolean_decodes
         
         # 性能分析
         test_queries = [
@@ -86,26 +122,31 @@ def run():
         compressed_string_length = len(term_string)
         
         print(f"Token总数: {len(sorted_tokens)}")
-        print(f"词典块大小 (k): {BLOCK_SIZE}")
+        print(f"词典块大小 (k): {posting_lists.dictionary.block_size}")
         print("-"*80)
         print(f"1. 词典字符串存储:")
         print(f"   - 原始存储: {original_token_length} 字符")
         print(f"   - 压缩存储: {compressed_string_length} 字符")
         compression_ratio = (1 - (compressed_string_length / original_token_length)) * 100
         print(f"   - 压缩率: {compression_ratio:.2f}%")
+        print(f"   - 各词典格式与 posting 编码的字节数、构建时间和查询延迟见 test_compression_report.py")
+        print(f"   - 最小完美哈希 (term -> term-ID): {term_hash.size_in_bytes()} 字节, "
+              f"每词项 {term_hash.size_in_bytes() / len(sorted_tokens):.2f} 字节")
         print("-"*80)
         print(f"2. 倒排索引统计:")
-        print(f"   - 总词项数: {len(inverted_posting_lists)}")
+        print(f"   - 总词项数: {len(posting_lists)}")
         
         total_postings = 0
-        for skip_list in inverted_posting_lists.values():
+        for skip_list in posting_lists.values():
             current = skip_list.header.forward[0]
             while current:
                 total_postings += 1
                 current = current.forward[0]
         
         print(f"   - 总posting数: {total_postings}")
-        print(f"   - 平均每词项posting数: {total_postings/len(inverted_posting_lists):.2f}")
+        print(f"   - 平均每词项posting数: {total_postings/len(posting_lists):.2f}")
+        print(f"   - 位置流: {positions.size_in_bytes()} 字节, 布尔查询解码 {boolean_decodes} 次, "
+              f"短语查询解码 {phrase_decodes} 次")
         
         sys.stdout = STDOUT
         print(f"\n✓ 完整演示已写入 '{filename}'")
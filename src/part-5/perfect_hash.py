@@ -0,0 +1,180 @@
+"""
+词表上的最小完美哈希 (hash and displace)
+把 n 个词项一一映射到 [0, n)，再由槽位映射到词项的序号 (term-ID)，不需要保存词项字符串本身:
+1. 每个词项的哈希值分成四部分: 桶号、h1、h2、指纹
+2. 按桶从大到小依次为每个桶寻找位移 d = d0 * n + d1，使桶内全部词项的槽位 (h1 + d0 * h2 + d1) % n
+   都空闲且互不相同（只用 d0 时 n 次之后槽位序列就会循环，表快满时找不到可用的位移）
+3. 只有一个词项的桶最后处理，直接占用剩余的空槽，位移记为 -(槽位 + 1)
+查找时计算一次哈希、读一次位移，再用槽位上的指纹拒绝词表之外的词项（误判率 2^-fingerprint_bits）
+
+每个词项的空间约为: 位移 (每 LOAD 个词项一个) + 指纹 + 序号，与词项长度无关
+哈希使用 blake2b（带 seed 作为 salt），与进程的 PYTHONHASHSEED 无关，可以随索引快照保存
+"""
+
+from array import array
+import hashlib
+
+
+LOAD = 4                    # 平均每个桶的词项数
+FINGERPRINT_BITS = 32
+MAX_D0 = 64                 # 超过该次数仍找不到位移时换一个 seed 重新构建
+MAX_SEEDS = 16
+
+
+def _narrow(values, signed=False):
+    """用能容纳全部值的最小类型码保存整数数组"""
+    values = list(values)
+    low, high = min(values, default=0), max(values, default=0)
+    for typecode in ('bhiq' if signed else 'BHIQ'):
+        bits = 8 * array(typecode).itemsize
+        if signed and -(1 << (bits - 1)) <= low and high < 1 << (bits - 1):
+            return array(typecode, values)
+        if not signed and high < 1 << bits:
+            return array(typecode, values)
+    raise OverflowError("数值超出 64 位整数的范围")
+
+
+def _find_displacement(items, occupied, n):
+    """
+    为一个桶寻找位移 d = d0 * n + d1
+    对每个 d0，只尝试让桶内第一个词项落到空槽上的 d1（用 bytearray.find 枚举空槽），
+    表快满时也不需要逐个尝试全部 n 个 d1
+    空槽从第一个词项的哈希位置开始环绕枚举：每次都从 0 开始时，前面不合适的空槽会被所有桶反复尝试
+    """
+    for d0 in range(MAX_D0):
+        base = [(h1 + d0 * h2) % n for h1, h2, _, _ in items]
+        for lo, hi in ((base[0], n), (0, base[0])):
+            free = occupied.find(0, lo, hi)
+            while free >= 0:
+                d1 = (free - base[0]) % n
+                slots = {(b + d1) % n for b in base}
+                if len(slots) == len(base) and not any(occupied[slot] for slot in slots):
+                    return d0 * n + d1
+                free = occupied.find(0, free + 1, hi)
+    return None
+
+
+class PerfectHash:
+    """
+    用法:
+        term_hash = PerfectHash.build(sorted_tokens)
+        term_hash.lookup('book')     # -> 'book' 在 sorted_tokens 中的下标；不在词表中时返回 None
+    """
+
+    def __init__(self, n, seed, displacements, fingerprints, term_ids, fingerprint_bits=FINGERPRINT_BITS):
+        self.n = n
+        self.seed = seed
+        self.displacements = displacements
+        self.fingerprints = fingerprints
+        self.term_ids = term_ids
+        self.fingerprint_bits = fingerprint_bits
+        self._salt = seed.to_bytes(16, 'little')
+
+    @staticmethod
+    def _hash(key, salt, n_buckets, n, fingerprint_mask):
+        x = int.from_bytes(hashlib.blake2b(key.encode('utf-8'), digest_size=16, salt=salt).digest(), 'little')
+        bucket = (x & 0xFFFFFFFF) % n_buckets
+        h1 = ((x >> 32) & 0xFFFFFFFF) % n
+        h2 = ((x >> 64) & 0xFFFFFFFF) % (n - 1) + 1 if n > 1 else 1
+        return bucket, h1, h2, (x >> 96) & fingerprint_mask
+
+    @classmethod
+    def build(cls, keys, load=LOAD, fingerprint_bits=FINGERPRINT_BITS, seed=0):
+        """
+        :param keys: 互不相同的词项，lookup 返回词项在其中的下标
+        :param load: 平均每个桶的词项数，越大越省空间、构建越慢
+        :param fingerprint_bits: 指纹位数，不超过 32
+        :param seed: 初始 seed；构建失败时依次尝试后续的 seed
+        """
+        keys = list(keys)
+        for attempt in range(seed, seed + MAX_SEEDS):
+            table = cls._build(keys, load, fingerprint_bits, attempt)
+            if table is not None:
+                return table
+        raise ValueError("无法构建完美哈希：词表中可能有重复的词项")
+
+    @classmethod
+    def _build(cls, keys, load, fingerprint_bits, seed):
+        n = len(keys)
+        n_buckets = max(1, -(-n // load))
+        salt = seed.to_bytes(16, 'little')
+        mask = (1 << fingerprint_bits) - 1
+
+        buckets = [[] for _ in range(n_buckets)]
+        for term_id, key in enumerate(keys):
+            bucket, h1, h2, fingerprint = cls._hash(key, salt, n_buckets, n, mask)
+            buckets[bucket].append((h1, h2, fingerprint, term_id))
+
+        displacements = [0] * n_buckets
+        fingerprints = [0] * n
+        term_ids = [0] * n
+        occupied = bytearray(n)
+        order = sorted(range(n_buckets), key=lambda b: len(buckets[b]), reverse=True)
+
+        position = 0
+        for position, b in enumerate(order):
+            items = buckets[b]
+            if len(items) <= 1:
+                break
+            d = _find_displacement(items, occupied, n)
+            if d is None:
+                return None
+            displacements[b] = d
+            d0, d1 = divmod(d, n)
+            slots = [(h1 + d0 * h2 + d1) % n for h1, h2, _, _ in items]
+            for slot, (_, _, fingerprint, term_id) in zip(slots, items):
+                occupied[slot] = 1
+                fingerprints[slot] = fingerprint
+                term_ids[slot] = term_id
+        else:
+            position = len(order)
+
+        free_slots = [slot for slot in range(n) if not occupied[slot]]
+        for b in order[position:]:
+            if not buckets[b]:
+                break
+            (_, _, fingerprint, term_id), = buckets[b]
+            slot = free_slots.pop()
+            displacements[b] = -slot - 1
+            fingerprints[slot] = fingerprint
+            term_ids[slot] = term_id
+
+        fingerprint_code = 'B' if fingerprint_bits <= 8 else 'H' if fingerprint_bits <= 16 else 'I'
+        return cls(n, seed, _narrow(displacements, signed=True), array(fingerprint_code, fingerprints),
+                   _narrow(term_ids), fingerprint_bits)
+
+    def __len__(self):
+        return self.n
+
+    def lookup(self, key):
+        """
+        :return: 词项的序号；不在词表中时返回 None（指纹相同的未知词项会被误判，概率为 2^-fingerprint_bits）
+        """
+        if not self.n:
+            return None
+        bucket, h1, h2, fingerprint = self._hash(key, self._salt, len(self.displacements), self.n,
+                                                 (1 << self.fingerprint_bits) - 1)
+        d = self.displacements[bucket]
+        if d < 0:
+            slot = -d - 1
+        else:
+            d0, d1 = divmod(d, self.n)
+            slot = (h1 + d0 * h2 + d1) % self.n
+        if self.fingerprints[slot] != fingerprint:
+            return None
+        return self.term_ids[slot]
+
+    def __contains__(self, key):
+        return self.lookup(key) is not None
+
+    def size_in_bytes(self):
+        return sum(arr.itemsize * len(arr) for arr in (self.displacements, self.fingerprints, self.term_ids))
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_salt']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._salt = self.seed.to_bytes(16, 'little')
@@ -0,0 +1,92 @@
+"""
+与文档编号分开存放的位置表
+倒排表中的 Value.pos 是每个 posting 各自持有的 Python list，布尔检索和 TF-IDF 只需要文档编号和词频，
+却也要为这些列表付出内存。pack_positions 把全部位置写入一条 varbyte gap 编码的字节流:
+├── PositionStore.data: 所有 posting 的位置首尾相接，每段是该 posting 的位置 gap
+└── PackedValue: 替换原来的 Value，只保存 id、tf 和该段在流中的偏移
+从快照加载时 (index_build.load_snapshot(position_store=...)) 把快照位置流中各 posting 的 gap 段直接复制到 data (extend)，
+不先还原出位置列表
+只有 phrase_query / positional_intersect 等读取 .pos 时才解码对应的一段，其余查询不触碰位置流
+"""
+
+from posting_codec import VarByteCodec, position_segments
+from skiplist import Value
+
+
+class PositionStore:
+    """
+    用法:
+        store = PositionStore()
+        offset = store.append([3, 17, 40])
+        store.decode(offset, 3)      # -> [3, 17, 40]
+    """
+
+    def __init__(self):
+        self.data = bytearray()
+        self.codec = VarByteCodec()
+        self.decodes = 0            # 解码次数，用于确认只有位置查询读取了位置流
+
+    def append(self, positions):
+        """
+        :param positions: 升序的位置列表
+        :return: 该列表在流中的偏移
+        """
+        offset = len(self.data)
+        self.data += self.codec.encode(positions)
+        return offset
+
+    def extend(self, stream):
+        """
+        追加一条 posting_codec.encode_positions 格式的位置流，只复制各段的 gap，丢弃段前的 varint(tf)
+        :return: [(tf, offset), ...]，每个 posting 一项
+        """
+        data = self.data
+        view = memoryview(stream)
+        entries = []
+        for tf, start, end in position_segments(stream):
+            entries.append((tf, len(data)))
+            data += view[start:end]
+        return entries
+
+    def decode(self, offset, count):
+        self.decodes += 1
+        return self.codec.decode_from(self.data, offset, count)[0]
+
+    def size_in_bytes(self):
+        return len(self.data)
+
+
+class PackedValue(Value):
+    """
+    位置保存在 PositionStore 中的 posting，读取 pos 时才解码
+    Value 定义了 __slots__，这里只追加自己的字段；pos 属性覆盖了继承来的 pos 槽，该槽不使用（每个对象 8 字节）
+    """
+    __slots__ = ('tf', 'offset', 'store')
+
+    def __init__(self, doc_id, tf, offset, store):
+        self.id = doc_id
+        self.tf = tf
+        self.offset = offset
+        self.store = store
+
+    @property
+    def pos(self):
+        return self.store.decode(self.offset, self.tf)
+
+
+def pack_positions(posting_lists, store=None):
+    """
+    把跳表中每个节点的 Value 原地替换为 PackedValue
+    :param posting_lists: {token: SkipList}，也可以是 DictionaryPostings
+    :return: 保存全部位置的 PositionStore
+    """
+    store = PositionStore() if store is None else store
+    for skip_list in posting_lists.values():
+        current = skip_list.header.forward[0]
+        while current:
+            value = current.value
+            if not isinstance(value, PackedValue):
+                positions = value.pos
+                current.value = PackedValue(value.id, len(positions), store.append(positions), store)
+            current = current.forward[0]
+    return store
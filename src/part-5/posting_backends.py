@@ -0,0 +1,276 @@
+"""
+布尔运算的可选后端
+BooleanSearchEngine(backend=...) 通过 create_backend 选择；'skiplist' 和 'set' 由引擎自身实现，
+这里提供把 posting list 转成整数数组后做批量运算的后端:
+- 'numpy': posting list 为有序、无重复的 NumPy int32 数组
+           AND -> searchsorted 探测(长度悬殊时) / intersect1d(assume_unique=True)
+           OR  -> union1d
+           NOT -> setdiff1d(assume_unique=True)
+- 'roaring': 高 df 的词项用 Roaring 风格的压缩位图，低 df 的词项用有序数组，混合类型之间直接运算
+- 'compressed': posting list 分块 gap 压缩 (block_postings.BlockPostings)，AND 借助块级跳表只解码落到的块
+NumPy 是可选依赖，未安装时选择 'numpy' 后端会抛出 ImportError。
+term() / all_docs() 接受可选的文档区间 doc_range=(lo, hi)，由 DocIdTable 换算为编号区间后直接截取。
+各后端按 (SkipList 对象, SkipList.version) 缓存词项的转换结果，posting list 被替换或原地修改后自动重新转换；
+出现 DocIdTable 中没有的文档时重建编号表并清空缓存；all_docs() 发现任一 posting list 被替换或版本变化时也重建，
+删除文档后全集 (NOT、整个区间) 中不会残留已删除的文档。
+"""
+
+import bisect
+from doc_table import DocIdTable
+import block_postings
+import roaring
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+# 两个数组长度比超过该值时，用 searchsorted 在长数组中逐个探测短数组的元素
+GALLOP_RATIO = 16
+
+
+def _lists_state(posting_lists):
+    """倒排表的当前状态: 每个词项的 (SkipList, version)，任一 posting list 被替换或原地修改后都会改变"""
+    return [(skip_list, skip_list.version) for skip_list in posting_lists.values()]
+
+
+def _refresh_doc_table(backend):
+    """倒排表在上次建表后有变化时重建编号表，使全集只包含仍出现在 posting list 中的文档"""
+    if _lists_state(backend.posting_lists) != backend._lists_state:
+        backend.reset_doc_table()
+
+
+def _cached_term(backend, token, convert):
+    """
+    词项 -> 后端的运算对象，缓存项为 (SkipList, version, 转换结果)，SkipList 不是同一个对象或版本变化时重新转换
+    :param convert: 有序整数编号列表 -> 运算对象
+    :return: 运算对象；词项不存在时返回 None
+    """
+    if token not in backend.posting_lists:
+        return None
+    skip_list = backend.posting_lists[token]
+    entry = backend._cache.get(token)
+    if entry is not None and entry[0] is skip_list and entry[1] == skip_list.version:
+        return entry[2]
+    try:
+        ordinals = backend.doc_table.posting_ordinals(skip_list)
+    except KeyError:
+        # 新增了文档：编号按文档ID排序，已缓存的编号全部失效
+        backend.reset_doc_table()
+        ordinals = backend.doc_table.posting_ordinals(skip_list)
+    postings = convert(ordinals)
+    backend._cache[token] = (skip_list, skip_list.version, postings)
+    return postings
+
+
+class NumpyPostingBackend:
+    name = 'numpy'
+
+    def __init__(self, inverted_posting_lists):
+        if np is None:
+            raise ImportError("backend='numpy' 需要安装 numpy: pip install numpy")
+        self.posting_lists = inverted_posting_lists
+        self.reset_doc_table()
+
+    def reset_doc_table(self):
+        self._lists_state = _lists_state(self.posting_lists)
+        self.doc_table = DocIdTable.from_posting_lists(self.posting_lists)
+        self._cache = {}
+        self._all_docs = np.arange(len(self.doc_table), dtype=np.int32)
+
+    def empty(self):
+        return np.empty(0, dtype=np.int32)
+
+    def is_operand(self, posting):
+        return isinstance(posting, np.ndarray)
+
+    def term(self, token, doc_range=None):
+        """词项 -> 有序的文档编号数组（由 SkipList 转换并缓存）"""
+        array = _cached_term(self, token, lambda ordinals: np.array(ordinals, dtype=np.int32))
+        if array is None:
+            return self.empty()
+        if doc_range is not None:
+            # 数组有序，二分定位区间后取切片（视图，不复制）
+            start, stop = self.doc_table.ordinal_range(doc_range)
+            array = array[np.searchsorted(array, start):np.searchsorted(array, stop)]
+        return array
+
+    def coerce(self, posting):
+        """把引擎中的其他运算对象（文档ID集合）转换为数组"""
+        if self.is_operand(posting):
+            return posting
+        return np.array(self.doc_table.to_ordinals(posting), dtype=np.int32)
+
+    def all_docs(self, doc_range=None):
+        _refresh_doc_table(self)
+        if doc_range is None:
+            return self._all_docs
+        start, stop = self.doc_table.ordinal_range(doc_range)
+        return self._all_docs[start:stop]
+
+    def intersect(self, a, b):
+        if len(a) > len(b):
+            a, b = b, a
+        if len(a) == 0:
+            return self.empty()
+        if len(b) >= GALLOP_RATIO * len(a):
+            idx = np.searchsorted(b, a)
+            idx[idx == len(b)] = 0
+            return a[b[idx] == a]
+        return np.intersect1d(a, b, assume_unique=True)
+
+    def union(self, a, b):
+        return np.union1d(a, b)
+
+    def difference(self, all_docs, a):
+        return np.setdiff1d(all_docs, a, assume_unique=True)
+
+    def to_doc_ids(self, posting):
+        return self.doc_table.to_names(posting.tolist())
+
+
+class RoaringPostingBackend:
+    name = 'roaring'
+
+    def __init__(self, inverted_posting_lists, dense_threshold=roaring.DENSE_THRESHOLD):
+        self.posting_lists = inverted_posting_lists
+        self.dense_threshold = dense_threshold
+        self.reset_doc_table()
+
+    def reset_doc_table(self):
+        self._lists_state = _lists_state(self.posting_lists)
+        self.doc_table = DocIdTable.from_posting_lists(self.posting_lists)
+        self._cache = {}
+        self._all_docs = roaring.RoaringBitmap.from_range(0, len(self.doc_table))
+
+    def empty(self):
+        return roaring.SortedArrayPostings([])
+
+    def is_operand(self, posting):
+        return isinstance(posting, (roaring.RoaringBitmap, roaring.SortedArrayPostings))
+
+    def _make(self, ordinals):
+        return roaring.make_postings(ordinals, len(self.doc_table), self.dense_threshold)
+
+    def term(self, token, doc_range=None):
+        """词项 -> 压缩位图或有序数组（由 SkipList 转换并缓存）"""
+        postings = _cached_term(self, token, self._make)
+        if postings is None:
+            return self.empty()
+        if doc_range is not None:
+            postings = roaring.postings_range(postings, *self.doc_table.ordinal_range(doc_range))
+        return postings
+
+    def coerce(self, posting):
+        if self.is_operand(posting):
+            return posting
+        return self._make(self.doc_table.to_ordinals(posting))
+
+    def all_docs(self, doc_range=None):
+        _refresh_doc_table(self)
+        if doc_range is None:
+            return self._all_docs
+        return roaring.RoaringBitmap.from_range(*self.doc_table.ordinal_range(doc_range))
+
+    def intersect(self, a, b):
+        return roaring.postings_and(a, b)
+
+    def union(self, a, b):
+        return roaring.postings_or(a, b)
+
+    def difference(self, all_docs, a):
+        return roaring.postings_andnot(all_docs, a)
+
+    def to_doc_ids(self, posting):
+        return self.doc_table.to_names(posting)
+
+
+class CompressedPostingBackend:
+    name = 'compressed'
+
+    def __init__(self, inverted_posting_lists, codec=block_postings.DEFAULT_CODEC,
+                 block_size=block_postings.BLOCK_SIZE):
+        """
+        :param codec: 块内的 posting 编码（见 posting_codec.CODECS），None 表示不压缩，直接使用有序编号列表
+        """
+        self.posting_lists = inverted_posting_lists
+        self.codec = codec
+        self.block_size = block_size
+        self.reset_doc_table()
+
+    def reset_doc_table(self):
+        self._lists_state = _lists_state(self.posting_lists)
+        self.doc_table = DocIdTable.from_posting_lists(self.posting_lists)
+        self._cache = {}
+
+    def empty(self):
+        return []
+
+    def _make(self, ordinals):
+        if self.codec is None:
+            return ordinals
+        return block_postings.BlockPostings.build(ordinals, self.codec, self.block_size)
+
+    def is_operand(self, posting):
+        return isinstance(posting, (block_postings.BlockPostings, list))
+
+    def term(self, token, doc_range=None):
+        """词项 -> 分块压缩的 posting list（由 SkipList 转换并缓存）"""
+        postings = _cached_term(self, token, self._make)
+        if postings is None:
+            return self.empty()
+        if doc_range is not None:
+            start, stop = self.doc_table.ordinal_range(doc_range)
+            if isinstance(postings, list):
+                return postings[bisect.bisect_left(postings, start):bisect.bisect_left(postings, stop)]
+            return postings.range(start, stop)
+        return postings
+
+    def coerce(self, posting):
+        if self.is_operand(posting):
+            return posting
+        return self.doc_table.to_ordinals(posting)
+
+    def all_docs(self, doc_range=None):
+        _refresh_doc_table(self)
+        start, stop = (0, len(self.doc_table)) if doc_range is None else self.doc_table.ordinal_range(doc_range)
+        return list(range(start, stop))
+
+    def intersect(self, a, b):
+        if len(a) > len(b):
+            a, b = b, a
+        if len(b) < GALLOP_RATIO * len(a):
+            # 长度接近时长列表几乎每块都会被解码，直接展开后用集合求交更快
+            return sorted(set(a).intersection(b))
+        return block_postings.intersect(a, b)
+
+    def union(self, a, b):
+        return sorted(set(a).union(b))
+
+    def difference(self, all_docs, a):
+        excluded = set(a)
+        return [ordinal for ordinal in all_docs if ordinal not in excluded]
+
+    def to_doc_ids(self, posting):
+        return self.doc_table.to_names(posting)
+
+
+BACKENDS = {
+    'numpy': NumpyPostingBackend,
+    'roaring': RoaringPostingBackend,
+    'compressed': CompressedPostingBackend,
+}
+
+
+def create_backend(name, inverted_posting_lists, **options):
+    """
+    :param name: 后端名称
+    :param options: 传给后端构造函数的参数，如 'compressed' 后端的 codec
+    :return: 后端实例；'skiplist' / 'set' 由引擎自身处理，返回 None
+    """
+    if name in ('skiplist', 'set'):
+        return None
+    if name not in BACKENDS:
+        raise ValueError(f"未知的布尔运算后端: {name}")
+    return BACKENDS[name](inverted_posting_lists, **options)
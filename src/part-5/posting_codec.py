@@ -0,0 +1,536 @@
+"""
+Posting list 的文档编号压缩
+倒排表中的文档按 DocIdTable 转换为有序的整数编号，先做差值 (gap) 编码，再把 gap 序列压缩为 bytes:
+    [3, 7, 8, 20] -> gaps [3, 4, 1, 12] -> 编码
+第一个 gap 是第一个编号本身；gap 越小（文档越密集）编码越短
+
+编码器接口 (PostingCodec):
+├── name
+├── encode(doc_ids) -> bytes      doc_ids 为严格递增的非负整数
+├── decode(data) -> list          还原 doc_ids
+└── decode_after(data, base)      还原按 [doc_id - base] 编码的一段 (block_postings 的分块)
+
+已实现的编码 (CODECS):
+├── varbyte   按字节对齐的变长编码
+├── gamma     Elias gamma: floor(log2 x) 个 0，再接 x 的二进制
+├── delta     Elias delta: 用 gamma 编码 x 的位数，再接 x 去掉最高位的二进制
+├── rice      Golomb-Rice: 参数 b = 2^k 按每个 list 的平均 gap 选择，商用一元编码，余数用 k 位
+└── pfor      PForDelta: 每 128 个 gap 一块，按块选择位宽 b 紧凑打包，放不下的 gap 作为异常另存下标和高位；
+              长 list 用 NumPy 一次解码全部块，未安装 NumPy 时逐块用整数移位解码
+按位编码的 gap 必须为正数，第一个编号加 1 后编码（编号可以为 0）
+
+位置不与文档编号放在一起: 每个词项的位置单独写成一条 varbyte 流 (encode_positions)，
+只需要文档编号的场景不必解码位置
+"""
+
+from itertools import accumulate
+import math
+
+try:
+    import numpy as np
+except ImportError:  # NumPy 是可选依赖，pfor 退回纯 Python 解码
+    np = None
+
+
+def to_gaps(doc_ids):
+    """有序编号 -> gap 序列"""
+    previous = 0
+    gaps = []
+    for doc_id in doc_ids:
+        gaps.append(doc_id - previous)
+        previous = doc_id
+    return gaps
+
+
+def from_gaps(gaps):
+    return list(accumulate(gaps))
+
+
+class PostingCodec:
+    """posting 编码器的公共接口"""
+    name = None
+
+    def encode(self, doc_ids):
+        raise NotImplementedError
+
+    def decode(self, data):
+        raise NotImplementedError
+
+    def decode_after(self, data, base):
+        """解码相对 base 编码的一段（分块存放时每块相对上一块的最后一个编号），返回原编号"""
+        return [base + doc_id for doc_id in self.decode(data)]
+
+
+class VarByteCodec(PostingCodec):
+    """
+    变长字节 (varbyte) 编码，与 compress_index.encode_varint 的格式相同:
+    每字节低 7 位存数据（低位在前），最高位为 1 表示后面还有字节
+    gap 全部小于 128 时（稠密的 posting list 很常见）每个 gap 恰好一个字节，编码和解码都走 C 实现的快速路径
+    """
+    name = 'varbyte'
+
+    def encode(self, doc_ids):
+        gaps = to_gaps(doc_ids)
+        if not gaps or max(gaps) < 0x80:
+            return bytes(gaps)
+        out = bytearray()
+        append = out.append
+        for gap in gaps:
+            while gap >= 0x80:
+                append((gap & 0x7F) | 0x80)
+                gap >>= 7
+            append(gap)
+        return bytes(out)
+
+    def decode(self, data):
+        if not data or max(data) < 0x80:
+            return list(accumulate(data))
+        doc_ids = []
+        append = doc_ids.append
+        doc_id = value = shift = 0
+        for byte in data:
+            if byte & 0x80:
+                value |= (byte & 0x7F) << shift
+                shift += 7
+            else:
+                doc_id += value | (byte << shift)
+                append(doc_id)
+                value = shift = 0
+        return doc_ids
+
+    def decode_after(self, data, base):
+        if not data or max(data) < 0x80:
+            doc_ids = list(accumulate(data, initial=base))
+            del doc_ids[0]
+            return doc_ids
+        return super().decode_after(data, base)
+
+    def decode_from(self, data, offset, count):
+        """
+        从 data[offset] 开始解码 count 个 gap（用于多个 list 首尾相接的流）
+        :return: (编号列表, 下一个 list 的起始位置)
+        """
+        end = offset + count
+        chunk = data[offset:end]
+        if max(chunk, default=0) < 0x80:
+            return list(accumulate(chunk)), end
+        values = []
+        append = values.append
+        current = value = shift = 0
+        pos = offset
+        while len(values) < count:
+            byte = data[pos]
+            pos += 1
+            if byte & 0x80:
+                value |= (byte & 0x7F) << shift
+                shift += 7
+            else:
+                current += value | (byte << shift)
+                append(current)
+                value = shift = 0
+        return values, pos
+
+
+# --- 按位编码 ---
+# 位串用 '0' / '1' 字符串拼接，再一次性转换为整数和 bytes；解码时反向转换后用 str.find 定位一元编码，
+# 把逐位的循环交给 C 实现的字符串操作
+# 格式: varint(个数) [参数字节] 位串（末尾补 0 到整字节）
+
+def _encode_count(count, out):
+    while count >= 0x80:
+        out.append((count & 0x7F) | 0x80)
+        count >>= 7
+    out.append(count)
+
+
+def _decode_count(data, pos=0):
+    count = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        count |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return count, pos
+        shift += 7
+
+
+def _pack_bits(header, bits):
+    if bits:
+        padded = bits + '0' * (-len(bits) % 8)
+        header += int(padded, 2).to_bytes(len(padded) // 8, 'big')
+    return bytes(header)
+
+
+def _unpack_bits(data, pos):
+    length = len(data) - pos
+    if length <= 0:
+        return ''
+    return format(int.from_bytes(data[pos:], 'big'), f'0{8 * length}b')
+
+
+def _positive_gaps(doc_ids):
+    gaps = to_gaps(doc_ids)
+    if gaps:
+        gaps[0] += 1
+    return gaps
+
+
+def _from_positive_gaps(gaps):
+    doc_ids = list(accumulate(gaps))
+    return [doc_id - 1 for doc_id in doc_ids]
+
+
+class EliasGammaCodec(PostingCodec):
+    name = 'gamma'
+
+    def encode(self, doc_ids):
+        header = bytearray()
+        _encode_count(len(doc_ids), header)
+        bits = ''.join('0' * (gap.bit_length() - 1) + format(gap, 'b') for gap in _positive_gaps(doc_ids))
+        return _pack_bits(header, bits)
+
+    def decode(self, data):
+        count, pos = _decode_count(data)
+        bits = _unpack_bits(data, pos)
+        gaps = []
+        append = gaps.append
+        find = bits.find
+        pos = 0
+        for _ in range(count):
+            one = find('1', pos)
+            end = 2 * one - pos + 1          # 前导 0 的个数 = one - pos，之后还有同样多位再加最高位的 1
+            append(int(bits[one:end], 2))
+            pos = end
+        return _from_positive_gaps(gaps)
+
+
+class EliasDeltaCodec(PostingCodec):
+    name = 'delta'
+
+    def encode(self, doc_ids):
+        header = bytearray()
+        _encode_count(len(doc_ids), header)
+        parts = []
+        for gap in _positive_gaps(doc_ids):
+            n = gap.bit_length()
+            parts.append('0' * (n.bit_length() - 1) + format(n, 'b') + format(gap, 'b')[1:])
+        return _pack_bits(header, ''.join(parts))
+
+    def decode(self, data):
+        count, pos = _decode_count(data)
+        bits = _unpack_bits(data, pos)
+        gaps = []
+        append = gaps.append
+        find = bits.find
+        pos = 0
+        for _ in range(count):
+            one = find('1', pos)
+            end = 2 * one - pos + 1
+            n = int(bits[one:end], 2)
+            append(int('1' + bits[end:end + n - 1], 2))
+            pos = end + n - 1
+        return _from_positive_gaps(gaps)
+
+
+class GolombRiceCodec(PostingCodec):
+    """
+    b = 2^k 时 Golomb 编码的余数恰好是 k 位，编码和解码都不需要除法
+    k 取 floor(log2(0.69 * 平均 gap))，即最接近最优 Golomb 参数的 2 的幂
+    """
+    name = 'rice'
+
+    @staticmethod
+    def choose_k(gaps):
+        mean = sum(gaps) / len(gaps)
+        return max(0, int(math.log2(0.69 * mean))) if mean >= 2 else 0
+
+    def encode(self, doc_ids):
+        header = bytearray()
+        _encode_count(len(doc_ids), header)
+        if not doc_ids:
+            return bytes(header)
+        gaps = _positive_gaps(doc_ids)
+        k = self.choose_k(gaps)
+        header.append(k)
+        mask = (1 << k) - 1
+        remainder_format = f'0{k}b'
+        if k:
+            bits = ''.join('1' * ((gap - 1) >> k) + '0' + format((gap - 1) & mask, remainder_format) for gap in gaps)
+        else:
+            bits = ''.join('1' * (gap - 1) + '0' for gap in gaps)
+        return _pack_bits(header, bits)
+
+    def decode(self, data):
+        count, pos = _decode_count(data)
+        if not count:
+            return []
+        k = data[pos]
+        bits = _unpack_bits(data, pos + 1)
+        gaps = []
+        append = gaps.append
+        find = bits.find
+        pos = 0
+        for _ in range(count):
+            zero = find('0', pos)
+            if k:
+                append((((zero - pos) << k) | int(bits[zero + 1:zero + 1 + k], 2)) + 1)
+                pos = zero + 1 + k
+            else:
+                append(zero - pos + 1)
+                pos = zero + 1
+        return _from_positive_gaps(gaps)
+
+
+# --- PForDelta ---
+# 格式: varint(个数)，之后每块 (n <= 128 个 gap):
+#   b | 异常个数 m | 异常高位的位宽 hb      (各 1 字节)
+#   n 个 gap 的低 b 位                      小端位序紧凑打包，ceil(n * b / 8) 字节
+#   m 个异常的块内下标                      每个 1 字节
+#   m 个异常的高位 (gap >> b)               按 hb 位紧凑打包，ceil(m * hb / 8) 字节
+# 块头长度固定，解码时每块只需读 3 个字节就能算出下一块的位置，其余部分全部交给 NumPy 批量处理
+
+PFOR_BLOCK = 128
+NUMPY_MIN_LENGTH = 256      # 短 list 调用 NumPy 的固定开销超过收益，逐块解码
+NUMPY_MAX_WIDTH = 56        # 一次读取 8 字节的窗口，移位 (< 8) 之后还要容纳 b 位
+
+
+def _pack(values, width):
+    packed = 0
+    for i, value in enumerate(values):
+        packed |= value << (i * width)
+    return packed.to_bytes((len(values) * width + 7) // 8, 'little')
+
+
+def _unpack(data, start, n, width):
+    packed = int.from_bytes(data[start:start + (n * width + 7) // 8], 'little')
+    mask = (1 << width) - 1
+    return [(packed >> (i * width)) & mask for i in range(n)]
+
+
+class PForDeltaCodec(PostingCodec):
+    name = 'pfor'
+
+    @staticmethod
+    def choose_width(gaps):
+        """按块内 gap 的位数直方图，选择打包部分加异常部分总位数最小的位宽 b"""
+        histogram = [0] * 65
+        for gap in gaps:
+            histogram[gap.bit_length()] += 1
+        max_bits = max(length for length, count in enumerate(histogram) if count)
+        best_width, best_size = max_bits, None
+        exceptions = 0
+        for width in range(max_bits, -1, -1):
+            # 位宽为 width 时，位数大于 width 的 gap 都是异常，每个异常 8 位下标 + (max_bits - width) 位高位
+            size = len(gaps) * width + exceptions * (8 + max_bits - width)
+            if best_size is None or size < best_size:
+                best_width, best_size = width, size
+            exceptions += histogram[width]
+        return best_width
+
+    def encode(self, doc_ids):
+        gaps = to_gaps(doc_ids)
+        out = bytearray()
+        _encode_count(len(gaps), out)
+        for start in range(0, len(gaps), PFOR_BLOCK):
+            block = gaps[start:start + PFOR_BLOCK]
+            width = self.choose_width(block)
+            mask = (1 << width) - 1
+            exceptions = [(i, gap >> width) for i, gap in enumerate(block) if gap >> width]
+            high_width = max((high.bit_length() for _, high in exceptions), default=0)
+            out.append(width)
+            out.append(len(exceptions))
+            out.append(high_width)
+            out += _pack([gap & mask for gap in block], width)
+            out += bytes(i for i, _ in exceptions)
+            out += _pack([high for _, high in exceptions], high_width)
+        return bytes(out)
+
+    @staticmethod
+    def _parse_blocks(data):
+        """
+        读出全部块头
+        :return: (个数, [(打包数据的起始字节, n, b, 异常个数, 异常下标的起始字节, hb)])
+        """
+        count, pos = _decode_count(data)
+        blocks = []
+        remaining = count
+        while remaining > 0:
+            n = min(PFOR_BLOCK, remaining)
+            width, n_exceptions, high_width = data[pos], data[pos + 1], data[pos + 2]
+            start = pos + 3
+            exception_start = start + (n * width + 7) // 8
+            pos = exception_start + n_exceptions + (n_exceptions * high_width + 7) // 8
+            blocks.append((start, n, width, n_exceptions, exception_start, high_width))
+            remaining -= n
+        return count, blocks
+
+    def decode(self, data):
+        count, blocks = self._parse_blocks(data)
+        if np is not None and count >= NUMPY_MIN_LENGTH and self._numpy_decodable(blocks):
+            return self._decode_numpy(data, count, blocks).tolist()
+        gaps = []
+        for start, n, width, n_exceptions, exception_start, high_width in blocks:
+            block = _unpack(data, start, n, width)
+            if n_exceptions:
+                highs = _unpack(data, exception_start + n_exceptions, n_exceptions, high_width)
+                for i, high in zip(data[exception_start:exception_start + n_exceptions], highs):
+                    block[i] |= high << width
+            gaps.extend(block)
+        return list(accumulate(gaps))
+
+    def decode_array(self, data):
+        """解码为 NumPy int64 数组（需要 NumPy）"""
+        if np is None:
+            raise ImportError("PForDeltaCodec.decode_array 需要安装 numpy: pip install numpy")
+        count, blocks = self._parse_blocks(data)
+        if count and self._numpy_decodable(blocks):
+            return self._decode_numpy(data, count, blocks)
+        return np.array(self.decode(data), dtype=np.int64)
+
+    @staticmethod
+    def _numpy_decodable(blocks):
+        return all(width <= NUMPY_MAX_WIDTH and width + high_width <= 63 and high_width <= NUMPY_MAX_WIDTH
+                   for _, _, width, _, _, high_width in blocks)
+
+    @staticmethod
+    def _gather(windows, starts, lengths, widths):
+        """
+        批量读取多段紧凑打包的整数: 第 j 段从字节 starts[j] 开始，有 lengths[j] 个 widths[j] 位的值
+        每个值以其起始位所在的字节为起点读取 8 字节的小端窗口，再右移、取掩码
+        """
+        total = int(lengths.sum())
+        first_index = np.cumsum(lengths) - lengths
+        value_width = np.repeat(widths, lengths)
+        in_segment = np.arange(total, dtype=np.int64) - np.repeat(first_index, lengths)
+        bit_offset = np.repeat(starts, lengths) * 8 + in_segment * value_width
+        values = np.take(windows, bit_offset >> 3) >> (bit_offset & 7).astype(np.uint64)
+        values &= (np.uint64(1) << value_width.astype(np.uint64)) - np.uint64(1)
+        return values.astype(np.int64)
+
+    @classmethod
+    def _decode_numpy(cls, data, count, blocks):
+        buffer = np.frombuffer(data + bytes(8), dtype=np.uint8)
+        # windows[i] 是从第 i 个字节开始的 8 个字节（小端 uint64）；先用步长为 1 字节的视图构造，
+        # 再复制为连续数组，之后的随机读取比在非对齐视图上快得多
+        windows = np.ascontiguousarray(
+            np.ndarray(shape=(len(buffer) - 7,), dtype='<u8', buffer=buffer, strides=(1,)))
+        table = np.array(blocks, dtype=np.int64)
+        starts, lengths, widths = table[:, 0], table[:, 1], table[:, 2]
+        n_exceptions, exception_starts, high_widths = table[:, 3], table[:, 4], table[:, 5]
+
+        # 除最后一块外每块都有 PFOR_BLOCK 个值，按 (块数, PFOR_BLOCK) 的矩阵一次算出所有值的起始位置，
+        # 最后一块多出的位置越过数据末尾，mode='clip' 读到的值随后被截掉
+        bit_offset = starts[:, None] * 8 + np.arange(PFOR_BLOCK, dtype=np.int64) * widths[:, None]
+        gaps = np.take(windows, bit_offset >> 3, mode='clip') >> (bit_offset & 7).astype(np.uint64)
+        gaps &= ((np.uint64(1) << widths.astype(np.uint64)) - np.uint64(1))[:, None]
+        gaps = gaps.ravel()[:count].astype(np.int64)
+
+        if n_exceptions.any():
+            block_first = np.arange(len(blocks), dtype=np.int64) * PFOR_BLOCK
+            # 异常下标是 1 字节的值，按 8 位宽度读取
+            in_block = cls._gather(windows, exception_starts, n_exceptions, np.full_like(widths, 8))
+            highs = cls._gather(windows, exception_starts + n_exceptions, n_exceptions, high_widths)
+            targets = np.repeat(block_first, n_exceptions) + in_block
+            gaps[targets] |= highs << np.repeat(widths, n_exceptions)
+        return np.cumsum(gaps)
+
+
+CODECS = {
+    codec.name: codec
+    for codec in (VarByteCodec(), EliasGammaCodec(), EliasDeltaCodec(), GolombRiceCodec(), PForDeltaCodec())
+}
+
+
+def get_codec(name):
+    try:
+        return CODECS[name]
+    except KeyError:
+        raise ValueError(f"未知的 posting 编码: {name}，可选: {', '.join(CODECS)}") from None
+
+
+# --- 位置流 ---
+# 位置与文档编号分开存放: 每个 posting 依次写入 varint(tf)，再接 tf 个 varbyte gap 编码的位置
+# 只需要文档编号的查询不必读取位置流
+
+def encode_positions(position_lists):
+    """[[pos, ...], ...] -> 位置流 bytes，每个位置列表升序"""
+    out = bytearray()
+    for positions in position_lists:
+        _encode_count(len(positions), out)
+        out += CODECS['varbyte'].encode(positions)
+    return bytes(out)
+
+
+def decode_positions(data):
+    """encode_positions 的逆过程"""
+    codec = CODECS['varbyte']
+    position_lists = []
+    pos = 0
+    while pos < len(data):
+        tf, pos = _decode_count(data, pos)
+        positions, pos = codec.decode_from(data, pos, tf)
+        position_lists.append(positions)
+    return position_lists
+
+
+def _skip_varbytes(data, pos, count):
+    """跳过从 pos 开始的 count 个 varbyte 数，返回其后的位置"""
+    stop = pos + count
+    if max(data[pos:stop], default=0) < 0x80:
+        return stop
+    while count:
+        if data[pos] < 0x80:
+            count -= 1
+        pos += 1
+    return pos
+
+
+def position_segments(data):
+    """
+    只解析位置流的结构而不解码位置
+    :return: [(tf, start, end), ...]，每个 posting 一项；data[start:end] 是该 posting 的 tf 个 varbyte gap，
+             可直接用 VarByteCodec.decode_from 解码
+    """
+    segments = []
+    pos = 0
+    while pos < len(data):
+        tf, start = _decode_count(data, pos)
+        pos = _skip_varbytes(data, start, tf)
+        segments.append((tf, start, pos))
+    return segments
+
+
+# --- 倒排表的压缩形式 ---
+# {token: [(doc_id, pos), ...]}  <->  doc_names, {token: (编码后的文档编号, 位置流)}
+
+def encode_postings(postings, codec_name, doc_names=None):
+    """
+    :param postings: {token: [(doc_id, pos), ...]}，每个列表按 doc_id 有序
+    :param doc_names: 文档的编号顺序（见 doc_reorder），None 表示按文档ID排序
+    :return: (doc_names, {token: (bytes, 位置流 bytes)})，doc_names[编号] 为文档ID
+    """
+    codec = get_codec(codec_name)
+    if doc_names is None:
+        doc_names = sorted({doc_id for entries in postings.values() for doc_id, _ in entries})
+    index = {name: ordinal for ordinal, name in enumerate(doc_names)}
+    encoded = {}
+    for token, entries in postings.items():
+        entries = sorted(entries, key=lambda entry: index[entry[0]])
+        encoded[token] = (codec.encode([index[doc_id] for doc_id, _ in entries]),
+                          encode_positions([pos for _, pos in entries]))
+    return doc_names, encoded
+
+
+def decode_postings(doc_names, encoded, codec_name):
+    """encode_postings 的逆过程，每个列表恢复为按 doc_id 有序；兼容位置仍以列表存放的旧快照"""
+    codec = get_codec(codec_name)
+    reordered = any(a > b for a, b in zip(doc_names, doc_names[1:]))
+    postings = {}
+    for token, (data, positions) in encoded.items():
+        if isinstance(positions, bytes):
+            positions = decode_positions(positions)
+        entries = [(doc_names[ordinal], pos) for ordinal, pos in zip(codec.decode(data), positions)]
+        if reordered:
+            entries.sort(key=lambda entry: entry[0])
+        postings[token] = entries
+    return postings
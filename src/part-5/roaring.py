@@ -0,0 +1,435 @@
+"""
+Roaring 风格的压缩位图 posting list
+文档编号按高 16 位分桶，每个桶 (chunk) 内的低 16 位根据稠密程度选择一种容器:
+- ArrayContainer:  有序的低位数组，元素不超过 4096 个时使用 (2 字节/元素)
+- BitmapContainer: 65536 位的位图，用 Python int 存储，位运算由解释器的大整数运算完成 (固定 8KB)
+- RunContainer:    连续区间 [(start, length), ...]，适合几乎连续的文档区间 (4 字节/区间)
+由有序数组构建时按三种编码的字节数选择最小的一种；与 CRoaring 一样，运算结果只在数组和位图之间选择，
+需要时再调用 run_optimize() 压缩成连续区间。
+
+make_postings 对整个 posting list 做选择：高 df 的词项用 RoaringBitmap，低 df 的词项用有序数组，
+两种表示之间可以直接做 AND / OR / ANDNOT。
+"""
+
+import bisect
+from array import array
+from itertools import chain, compress
+import operator
+
+
+CHUNK_BITS = 16
+CHUNK_SIZE = 1 << CHUNK_BITS
+LOW_MASK = CHUNK_SIZE - 1
+ARRAY_MAX = 4096                 # 超过该元素数时位图更省空间
+BITMAP_BYTES = CHUNK_SIZE // 8
+
+# 每个字节值中置位的下标，用于把位图快速展开为数组
+_BYTE_BITS = [tuple(i for i in range(8) if (b >> i) & 1) for b in range(256)]
+
+
+# --- 容器之间的表示转换 ---
+
+def _bits_to_list(bits):
+    """位图 (int) -> 有序的低位列表"""
+    values = []
+    extend = values.extend
+    raw = bits.to_bytes(BITMAP_BYTES, 'little')
+    for index, byte in enumerate(raw):
+        if byte:
+            extend(map((index << 3).__add__, _BYTE_BITS[byte]))
+    return values
+
+
+def _list_to_bits(values):
+    """有序的低位列表 -> 位图 (int)"""
+    raw = bytearray(BITMAP_BYTES)
+    for v in values:
+        raw[v >> 3] |= 1 << (v & 7)
+    return int.from_bytes(raw, 'little')
+
+
+def _bits_to_runs(bits):
+    """位图 (int) -> [(start, length), ...]: 每段的起点是 0->1 跳变处，终点是 1->0 跳变处"""
+    starts = _bits_to_list(bits & ~(bits << 1))
+    ends = _bits_to_list(bits & ~(bits >> 1))
+    return [(start, end - start + 1) for start, end in zip(starts, ends)]
+
+
+def _runs_to_bits(runs):
+    bits = 0
+    for start, length in runs:
+        bits |= ((1 << length) - 1) << start
+    return bits
+
+
+def _count_runs(bits):
+    """位图中连续 1 的段数: 每段贡献一个 0->1 和一个 1->0 的跳变"""
+    return ((bits ^ (bits << 1)).bit_count() + 1) // 2
+
+
+# --- 有序数组之间的运算 ---
+# 长度接近时线性归并: 两个有序数组首尾相接后 sorted，timsort 识别出两段有序 run，在 C 层做一次线性归并，
+# 再比较相邻元素即可得到交集 / 并集（各数组内部无重复，归并后每个值至多出现两次）；
+# 长度相差 GALLOP_RATIO 倍以上时改用 bisect 跳跃: 落后的一方一次跳到不小于对方当前元素的位置
+
+GALLOP_RATIO = 16
+
+
+def _merge(a, b):
+    return sorted(chain(a, b))
+
+
+def _skewed(a, b):
+    return max(len(a), len(b)) >= GALLOP_RATIO * min(len(a), len(b))
+
+
+def _sorted_intersect(a, b):
+    if not _skewed(a, b):
+        merged = _merge(a, b)
+        return list(compress(merged, map(operator.eq, merged, merged[1:])))
+    result = []
+    i, j, na, nb = 0, 0, len(a), len(b)
+    while i < na and j < nb:
+        x, y = a[i], b[j]
+        if x == y:
+            result.append(x)
+            i += 1
+            j += 1
+        elif x < y:
+            i = bisect.bisect_left(a, y, i + 1)
+        else:
+            j = bisect.bisect_left(b, x, j + 1)
+    return result
+
+
+def _sorted_union(a, b):
+    merged = _merge(a, b)
+    return merged[:1] + list(compress(merged[1:], map(operator.ne, merged[1:], merged)))
+
+
+def _sorted_difference(a, b):
+    if not _skewed(a, b):
+        # a 与 a ∩ b 归并后，只出现一次的值即 a - b
+        merged = _merge(a, _sorted_intersect(a, b))
+        keep = map(operator.and_, map(operator.ne, merged, [-1] + merged[:-1]), map(operator.ne, merged, merged[1:] + [-1]))
+        return list(compress(merged, keep))
+    result = []
+    i, j, na, nb = 0, 0, len(a), len(b)
+    while i < na and j < nb:
+        x, y = a[i], b[j]
+        if x < y:
+            k = bisect.bisect_left(a, y, i + 1)
+            result.extend(a[i:k])
+            i = k
+        elif y < x:
+            j = bisect.bisect_left(b, x, j + 1)
+        else:
+            i += 1
+            j += 1
+    result.extend(a[i:])
+    return result
+
+
+# --- 三种容器 ---
+
+class ArrayContainer:
+    kind = 'array'
+
+    def __init__(self, values):
+        self.values = array('H', values)
+
+    def __len__(self):
+        return len(self.values)
+
+    def __contains__(self, low):
+        i = bisect.bisect_left(self.values, low)
+        return i < len(self.values) and self.values[i] == low
+
+    def to_list(self):
+        return self.values.tolist()
+
+    def to_bits(self):
+        return _list_to_bits(self.values)
+
+    def size_in_bytes(self):
+        return 2 * len(self.values)
+
+
+class BitmapContainer:
+    kind = 'bitmap'
+
+    def __init__(self, bits):
+        self.bits = bits
+        self.cardinality = bits.bit_count()
+        self._raw = None
+
+    def __len__(self):
+        return self.cardinality
+
+    def __contains__(self, low):
+        # 逐个探测时在字节表示上查找，避免每次对 8KB 的大整数做移位
+        if self._raw is None:
+            self._raw = self.bits.to_bytes(BITMAP_BYTES, 'little')
+        return (self._raw[low >> 3] >> (low & 7)) & 1 == 1
+
+    def to_list(self):
+        return _bits_to_list(self.bits)
+
+    def to_bits(self):
+        return self.bits
+
+    def size_in_bytes(self):
+        return BITMAP_BYTES
+
+
+class RunContainer:
+    kind = 'run'
+
+    def __init__(self, runs):
+        self.runs = runs
+        self.starts = [start for start, _ in runs]
+        self.cardinality = sum(length for _, length in runs)
+
+    def __len__(self):
+        return self.cardinality
+
+    def __contains__(self, low):
+        i = bisect.bisect_right(self.starts, low) - 1
+        return i >= 0 and low < self.runs[i][0] + self.runs[i][1]
+
+    def to_list(self):
+        values = []
+        for start, length in self.runs:
+            values.extend(range(start, start + length))
+        return values
+
+    def to_bits(self):
+        return _runs_to_bits(self.runs)
+
+    def size_in_bytes(self):
+        return 4 * len(self.runs)
+
+
+def _best_container_from_bits(bits):
+    """运算结果: 元素少时用数组，否则保留位图"""
+    cardinality = bits.bit_count()
+    if cardinality == 0:
+        return None
+    if cardinality <= ARRAY_MAX:
+        return ArrayContainer(_bits_to_list(bits))
+    return BitmapContainer(bits)
+
+
+def _run_optimize(container):
+    """按编码后的字节数在三种容器中选择最省空间的一种"""
+    bits = container.to_bits()
+    if 4 * _count_runs(bits) < min(container.size_in_bytes(), 2 * len(container), BITMAP_BYTES):
+        return RunContainer(_bits_to_runs(bits))
+    return container
+
+
+def _container_from_list(values):
+    """运算结果: 元素少时用数组，否则转换为位图"""
+    if not values:
+        return None
+    if len(values) <= ARRAY_MAX:
+        return ArrayContainer(values)
+    return BitmapContainer(_list_to_bits(values))
+
+
+def _best_container_from_list(values):
+    """构建时: 按编码后的字节数在三种容器中选择最省空间的一种"""
+    container = _container_from_list(values)
+    return container and _run_optimize(container)
+
+
+def _container_and(a, b):
+    if a.kind == 'array' and b.kind == 'array':
+        return _container_from_list(_sorted_intersect(a.values, b.values))
+    if a.kind == 'array' or b.kind == 'array':
+        # 用数组逐个探测位图 / 区间
+        small, other = (a, b) if a.kind == 'array' else (b, a)
+        return _container_from_list([v for v in small.values if v in other])
+    return _best_container_from_bits(a.to_bits() & b.to_bits())
+
+
+def _container_or(a, b):
+    if a.kind == 'array' and b.kind == 'array' and len(a) + len(b) <= ARRAY_MAX:
+        return _container_from_list(_sorted_union(a.values, b.values))
+    return _best_container_from_bits(a.to_bits() | b.to_bits())
+
+
+def _container_andnot(a, b):
+    if a.kind == 'array' and b.kind == 'array':
+        return _container_from_list(_sorted_difference(a.values, b.values))
+    if a.kind == 'array':
+        return _container_from_list([v for v in a.values if v not in b])
+    return _best_container_from_bits(a.to_bits() & ~b.to_bits())
+
+
+class RoaringBitmap:
+    """
+    压缩位图: {高16位: 容器}
+    支持 &, |, - (ANDNOT), len, in, 迭代
+    """
+
+    def __init__(self, containers=None):
+        self.containers = containers or {}
+        self.keys = sorted(self.containers)
+
+    @classmethod
+    def from_sorted(cls, values, run_optimize=True):
+        """
+        由有序、无重复的整数序列构建
+        :param run_optimize: 是否尝试 RunContainer（运算中临时转换时关闭以节省时间）
+        """
+        make = _best_container_from_list if run_optimize else _container_from_list
+        containers = {}
+        i, n = 0, len(values)
+        while i < n:
+            high = values[i] >> CHUNK_BITS
+            base = high << CHUNK_BITS
+            j = bisect.bisect_left(values, base + CHUNK_SIZE, i)
+            containers[high] = make([v - base for v in values[i:j]])
+            i = j
+        return cls(containers)
+
+    @classmethod
+    def from_range(cls, start, stop):
+        """[start, stop) 的全部整数，用 RunContainer 表示"""
+        containers = {}
+        v = start
+        while v < stop:
+            high = v >> CHUNK_BITS
+            chunk_end = min(stop, (high + 1) << CHUNK_BITS)
+            containers[high] = RunContainer([(v & LOW_MASK, chunk_end - v)])
+            v = chunk_end
+        return cls(containers)
+
+    def __len__(self):
+        return sum(len(c) for c in self.containers.values())
+
+    def __contains__(self, v):
+        container = self.containers.get(v >> CHUNK_BITS)
+        return container is not None and (v & LOW_MASK) in container
+
+    def __iter__(self):
+        for high in self.keys:
+            base = high << CHUNK_BITS
+            for low in self.containers[high].to_list():
+                yield base + low
+
+    def to_list(self):
+        return list(self)
+
+    def _combine(self, other, op, keep_left_only, keep_right_only):
+        containers = {}
+        for high in set(self.containers) | set(other.containers):
+            a = self.containers.get(high)
+            b = other.containers.get(high)
+            if a is not None and b is not None:
+                c = op(a, b)
+            elif a is not None:
+                c = a if keep_left_only else None
+            else:
+                c = b if keep_right_only else None
+            if c is not None:
+                containers[high] = c
+        return RoaringBitmap(containers)
+
+    def __and__(self, other):
+        return self._combine(other, _container_and, False, False)
+
+    def __or__(self, other):
+        return self._combine(other, _container_or, True, True)
+
+    def __sub__(self, other):
+        return self._combine(other, _container_andnot, True, False)
+
+    def run_optimize(self):
+        """把适合的容器转换为 RunContainer，返回新的位图"""
+        return RoaringBitmap({high: _run_optimize(c) for high, c in self.containers.items()})
+
+    def size_in_bytes(self):
+        """序列化大小估计: 每个容器 2 字节键 + 2 字节类型/长度 + 容器内容"""
+        return sum(4 + c.size_in_bytes() for c in self.containers.values())
+
+    def container_stats(self):
+        stats = {'array': 0, 'bitmap': 0, 'run': 0}
+        for c in self.containers.values():
+            stats[c.kind] += 1
+        return stats
+
+
+class SortedArrayPostings:
+    """稀疏词项的 posting list：有序的 32 位整数数组"""
+
+    def __init__(self, values):
+        self.values = array('I', values)
+
+    def __len__(self):
+        return len(self.values)
+
+    def __contains__(self, v):
+        i = bisect.bisect_left(self.values, v)
+        return i < len(self.values) and self.values[i] == v
+
+    def __iter__(self):
+        return iter(self.values)
+
+    def to_list(self):
+        return self.values.tolist()
+
+    def size_in_bytes(self):
+        return 4 * len(self.values)
+
+
+# --- 混合类型的集合运算 ---
+
+def _as_roaring(postings):
+    if isinstance(postings, RoaringBitmap):
+        return postings
+    return RoaringBitmap.from_sorted(postings.values, run_optimize=False)
+
+
+def postings_and(a, b):
+    if isinstance(a, SortedArrayPostings) and isinstance(b, SortedArrayPostings):
+        return SortedArrayPostings(_sorted_intersect(a.values, b.values))
+    # 数组按块转换为位图后逐个容器求交，只有两边都存在的块才需要计算
+    return _as_roaring(a) & _as_roaring(b)
+
+
+def postings_or(a, b):
+    if isinstance(a, SortedArrayPostings) and isinstance(b, SortedArrayPostings):
+        return SortedArrayPostings(_sorted_union(a.values, b.values))
+    return _as_roaring(a) | _as_roaring(b)
+
+
+def postings_andnot(a, b):
+    if isinstance(a, SortedArrayPostings):
+        if isinstance(b, SortedArrayPostings):
+            return SortedArrayPostings(_sorted_difference(a.values, b.values))
+        return SortedArrayPostings([v for v in a.values if v not in b])
+    return a - _as_roaring(b)
+
+
+def postings_range(postings, start, stop):
+    """只保留 [start, stop) 内的文档编号"""
+    if isinstance(postings, SortedArrayPostings):
+        values = postings.values
+        return SortedArrayPostings(values[bisect.bisect_left(values, start):bisect.bisect_left(values, stop)])
+    return postings & RoaringBitmap.from_range(start, stop)
+
+
+DENSE_THRESHOLD = 1 / 32    # df / 文档总数 超过该比例时使用压缩位图
+
+
+def make_postings(sorted_ordinals, num_docs, dense_threshold=DENSE_THRESHOLD):
+    """
+    根据词项的稠密程度选择 posting list 的表示
+    :param sorted_ordinals: 有序的文档编号
+    :param num_docs: 文档总数
+    """
+    if num_docs and len(sorted_ordinals) / num_docs >= dense_threshold:
+        return RoaringBitmap.from_sorted(sorted_ordinals)
+    return SortedArrayPostings(sorted_ordinals)
@@ -0,0 +1,357 @@
+"""
+文档分区的索引分片与 scatter-gather 查询
+按 doc_id 区间把倒排表切成 N 个分片，每个分片由一个独立的工作进程加载并提供服务:
+- 布尔查询: 广播到所有分片，各分片结果不相交，取并集；指定文档区间时只发给与区间相交的分片
+- 排名查询: 广播到所有分片，各分片返回本地 Top-K，再归并为全局 Top-K
+各分片使用全局的 df / 文档总数计算 IDF，因此分片得分与单进程的 VectorSpaceModel 一致。
+
+两种创建方式:
+├── ShardedSearchEngine(inverted_posting_lists): 主进程持有完整的倒排表，切分后把每个分片序列化发给工作进程，
+│   主进程与各分片进程合计约占两倍于索引的内存，只适合演示与小语料
+└── ShardedSearchEngine.from_checkpoint(checkpoint_dir): 各工作进程直接读取 index_build 检查点中
+    自己负责的倒排分区文件，主进程不加载倒排表，只汇总各分片的文档数与 df
+"""
+
+import bisect
+import heapq
+import multiprocessing
+import os
+import sys
+import time
+from collections import defaultdict
+import index_build
+import boolean_search_v2 as boolean_search
+import tfidf_vector_space
+
+
+NUM_SHARDS = 4
+# 等待分片回复时每隔多少秒检查一次工作进程是否还活着
+POLL_INTERVAL = 1.0
+
+
+def _collect_doc_ids(inverted_posting_lists):
+    """收集全部文档ID（有序）"""
+    all_docs = set()
+    for skip_list in inverted_posting_lists.values():
+        current = skip_list.header.forward[0]
+        while current:
+            all_docs.add(current.value.id)
+            current = current.forward[0]
+    return sorted(all_docs)
+
+
+def split_into_shards(inverted_posting_lists, num_shards=NUM_SHARDS):
+    """
+    按 doc_id 区间切分倒排表
+    :param inverted_posting_lists: 倒排索引 {token: SkipList}
+    :param num_shards: 分片数
+    :return: (shards, boundaries, global_stats)
+             shards: [{token: [(doc_id, pos), ...]}, ...]，每个分片的可序列化倒排表
+             boundaries: 各分片的起始 doc_id（第0个分片之外），用于定位文档所在分片
+             global_stats: (num_docs, {token: df})
+    """
+    doc_ids = _collect_doc_ids(inverted_posting_lists)
+    shard_size = max(1, -(-len(doc_ids) // num_shards))
+    boundaries = [doc_ids[i] for i in range(shard_size, len(doc_ids), shard_size)]
+
+    shards = [defaultdict(list) for _ in range(len(boundaries) + 1)]
+    global_df = {}
+    for token, skip_list in inverted_posting_lists.items():
+        df = 0
+        current = skip_list.header.forward[0]
+        while current:
+            shard_id = bisect.bisect_right(boundaries, current.value.id)
+            shards[shard_id][token].append((current.value.id, current.value.pos))
+            df += 1
+            current = current.forward[0]
+        global_df[token] = df
+
+    return [dict(shard) for shard in shards], boundaries, (len(doc_ids), global_df)
+
+
+def _local_stats(postings):
+    """本分片的 (文档数, 最小 doc_id, {token: df})"""
+    doc_ids = {doc_id for entries in postings.values() for doc_id, _ in entries}
+    df = {token: len(entries) for token, entries in postings.items()}
+    return len(doc_ids), min(doc_ids, default=None), df
+
+
+def _shard_worker(conn, source, global_stats):
+    """
+    分片工作进程：加载本分片的倒排表，循环处理查询请求
+    :param source: 本分片的倒排表 {token: [(doc_id, pos), ...]}，或检查点中倒排分区文件的路径列表
+    :param global_stats: (num_docs, {token: df})；为 None 时先把本分片的统计量发给主进程，再接收汇总后的全局统计量
+    请求格式: (op, args)，op 为 'boolean' | 'ranked' | 'close'
+    """
+    # 模型构建过程中的打印不输出到主进程终端
+    with open(os.devnull, 'w', encoding='utf-8') as devnull:
+        sys.stdout = devnull
+        postings = index_build.load_partitions(source) if isinstance(source, list) else source
+        if global_stats is None:
+            conn.send(_local_stats(postings))
+            global_stats = conn.recv()
+            if global_stats is None:
+                conn.close()
+                return
+
+        inverted_posting_lists = index_build.postings_to_skiplists(postings)
+        del postings
+        engine = boolean_search.BooleanSearchEngine(
+            dictionary_index={},
+            inverted_posting_lists=inverted_posting_lists
+        )
+        vsm = tfidf_vector_space.VectorSpaceModel(inverted_posting_lists, global_stats=global_stats)
+        conn.send('ready')
+
+        while True:
+            op, args = conn.recv()
+            if op == 'boolean':
+                query, doc_range = args
+                conn.send(engine.search(query, doc_range))
+            elif op == 'ranked':
+                query_terms, top_k = args
+                conn.send(vsm.search(query_terms, top_k))
+            elif op == 'close':
+                break
+        conn.close()
+
+
+class ShardedSearchEngine:
+    """
+    Scatter-gather 检索引擎
+    用法:
+        with ShardedSearchEngine(inverted_posting_lists, num_shards=4) as engine:
+            engine.search("book AND club")
+            engine.search_ranked(["book", "club"], top_k=10)
+    """
+
+    def __init__(self, inverted_posting_lists, num_shards=NUM_SHARDS):
+        shards, self.boundaries, self.global_stats = split_into_shards(inverted_posting_lists, num_shards)
+        self.connections = []
+        self.processes = []
+        for postings in shards:
+            self._start_worker(postings, self.global_stats)
+
+        # 等待所有分片完成加载
+        for shard_id in range(self.num_shards):
+            self._recv(shard_id)
+
+    @classmethod
+    def from_checkpoint(cls, checkpoint_dir, num_shards=NUM_SHARDS):
+        """
+        由 index_build 的检查点创建，连续的倒排分区文件分给同一个分片，分片数不超过分区数
+        工作进程各自加载分区文件，主进程只接收各分片的文档数与 df 并汇总成全局统计量，
+        不含文档的分片直接关闭
+        """
+        paths = index_build.partition_paths(checkpoint_dir)
+        per_shard = max(1, -(-len(paths) // num_shards))
+
+        engine = cls.__new__(cls)
+        engine.connections = []
+        engine.processes = []
+        for start in range(0, len(paths), per_shard):
+            engine._start_worker(paths[start:start + per_shard], None)
+
+        local_stats = [engine._recv(i) for i in range(len(engine.connections))]
+        global_df = defaultdict(int)
+        for _, _, df in local_stats:
+            for token, count in df.items():
+                global_df[token] += count
+        engine.global_stats = (sum(num_docs for num_docs, _, _ in local_stats), dict(global_df))
+
+        connections, processes, first_docs = [], [], []
+        for conn, process, (num_docs, first_doc, _) in zip(engine.connections, engine.processes, local_stats):
+            if num_docs:
+                conn.send(engine.global_stats)
+                connections.append(conn)
+                processes.append(process)
+                first_docs.append(first_doc)
+            else:
+                conn.send(None)
+                conn.close()
+                process.join(timeout=5)
+        engine.connections, engine.processes = connections, processes
+        engine.boundaries = first_docs[1:]
+
+        for shard_id in range(engine.num_shards):
+            engine._recv(shard_id)
+        return engine
+
+    def _start_worker(self, source, global_stats):
+        parent_conn, child_conn = multiprocessing.Pipe()
+        process = multiprocessing.Process(
+            target=_shard_worker,
+            args=(child_conn, source, global_stats),
+            daemon=True
+        )
+        process.start()
+        child_conn.close()
+        self.connections.append(parent_conn)
+        self.processes.append(process)
+
+    @property
+    def num_shards(self):
+        return len(self.connections)
+
+    def _scatter(self, op, args, shard_ids=None):
+        for shard_id in shard_ids if shard_ids is not None else range(self.num_shards):
+            try:
+                self.connections[shard_id].send((op, args))
+            except (BrokenPipeError, ConnectionResetError):
+                raise self._worker_exited(shard_id) from None
+
+    def _recv(self, shard_id):
+        """
+        接收分片 shard_id 的回复；工作进程已经退出（崩溃或被杀死）时抛出 RuntimeError，
+        其中带有分片编号和进程的退出码，而不是一直阻塞在 recv 上
+        """
+        conn, process = self.connections[shard_id], self.processes[shard_id]
+        try:
+            while not conn.poll(POLL_INTERVAL):
+                if not process.is_alive():
+                    break
+            else:
+                return conn.recv()
+        except (EOFError, ConnectionResetError):
+            pass
+        raise self._worker_exited(shard_id)
+
+    def _worker_exited(self, shard_id):
+        process = self.processes[shard_id]
+        process.join(timeout=POLL_INTERVAL)
+        return RuntimeError(f"分片 {shard_id} 的工作进程已退出 (exitcode={process.exitcode})")
+
+    def _gather(self, shard_ids=None):
+        return [self._recv(shard_id)
+                for shard_id in (shard_ids if shard_ids is not None else range(self.num_shards))]
+
+    def shards_in_range(self, doc_range):
+        """与文档区间 [lo, hi) 相交的分片编号"""
+        lo, hi = doc_range
+        first = 0 if lo is None else self.shard_of(lo)
+        last = self.num_shards - 1 if hi is None else bisect.bisect_left(self.boundaries, hi)
+        return list(range(first, last + 1))
+
+    def search(self, query, doc_range=None):
+        """
+        布尔检索：各分片文档不相交，结果直接取并集
+        :param doc_range: 可选的文档区间 (lo, hi)，区间外的分片不参与查询，区间内的分片把区间下推到 posting list 遍历
+        """
+        shard_ids = None if doc_range is None else self.shards_in_range(doc_range)
+        self._scatter('boolean', (query, doc_range), shard_ids)
+        result = set()
+        for shard_result in self._gather(shard_ids):
+            result |= shard_result
+        return result
+
+    def search_ranked(self, query_terms, top_k=10):
+        """排名检索：归并各分片的 Top-K"""
+        self._scatter('ranked', (query_terms, top_k))
+        return self._merge_top_k(self._gather(), top_k)
+
+    def search_many(self, queries):
+        """
+        批量布尔检索：先把所有查询发给各分片再统一收结果，
+        使多个分片进程同时处理流水线中的查询
+        """
+        for query in queries:
+            self._scatter('boolean', (query, None))
+        results = []
+        for _ in queries:
+            result = set()
+            for shard_result in self._gather():
+                result |= shard_result
+            results.append(result)
+        return results
+
+    def search_ranked_many(self, queries, top_k=10):
+        """批量排名检索"""
+        for query_terms in queries:
+            self._scatter('ranked', (query_terms, top_k))
+        return [self._merge_top_k(self._gather(), top_k) for _ in queries]
+
+    @staticmethod
+    def _merge_top_k(shard_results, top_k):
+        return heapq.nlargest(top_k, (item for result in shard_results for item in result),
+                              key=lambda x: x[1])
+
+    def shard_of(self, doc_id):
+        """文档所在的分片编号"""
+        return bisect.bisect_right(self.boundaries, doc_id)
+
+    def close(self):
+        for conn in self.connections:
+            try:
+                conn.send(('close', None))
+                conn.close()
+            except (BrokenPipeError, OSError):
+                pass
+        for process in self.processes:
+            process.join(timeout=5)
+        self.connections = []
+        self.processes = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+# --- 演示：与单进程引擎对比 ---
+
+def demo_sharded_search(inverted_posting_lists, num_shards=NUM_SHARDS):
+    boolean_queries = [
+        "book AND club",
+        "(book OR club) AND NOT chat",
+        "(book AND club) OR (chat AND date)",
+        '"last week" AND tea',
+    ]
+    ranked_queries = [["book", "club"], ["last", "week"], ["information", "retrieval"]]
+
+    single_engine = boolean_search.BooleanSearchEngine({}, inverted_posting_lists)
+    single_vsm = tfidf_vector_space.VectorSpaceModel(inverted_posting_lists)
+
+    start_time = time.perf_counter()
+    with ShardedSearchEngine(inverted_posting_lists, num_shards) as engine:
+        load_time = time.perf_counter() - start_time
+        print(f"\n{engine.num_shards} 个分片加载完成，耗时 {load_time:.3f} 秒")
+
+        print("\n【布尔查询】")
+        for query in boolean_queries:
+            sharded = engine.search(query)
+            single = single_engine.search(query)
+            status = "一致" if sharded == single else "不一致"
+            print(f"  {query:<40} 分片结果: {len(sharded):<6} 单进程结果: {len(single):<6} {status}")
+
+        print("\n【排名查询 Top-5】")
+        for query_terms in ranked_queries:
+            sharded = engine.search_ranked(query_terms, top_k=5)
+            single = single_vsm.search(query_terms, top_k=5)
+            same = [round(s, 6) for _, s in sharded] == [round(s, 6) for _, s in single]
+            print(f"  {' '.join(query_terms):<30} {'一致' if same else '不一致'}: {sharded}")
+
+        repeat = 50
+        queries = boolean_queries * repeat
+        start_time = time.perf_counter()
+        for query in queries:
+            single_engine.search(query)
+        single_time = time.perf_counter() - start_time
+
+        start_time = time.perf_counter()
+        engine.search_many(queries)
+        sharded_time = time.perf_counter() - start_time
+
+        print(f"\n【吞吐量】{len(queries)} 个布尔查询")
+        print(f"  单进程: {single_time:.3f} 秒")
+        print(f"  {engine.num_shards} 分片:  {sharded_time:.3f} 秒 ({single_time / sharded_time:.2f}x)")
+
+
+if __name__ == "__main__":
+    _, _, _, inverted_posting_lists = index_build.build_index(
+        input_path="output_data/",
+        input_ending='.stw',
+        block_size=4,
+        checkpoint_dir="./checkpoint/"
+    )
+    demo_sharded_search(inverted_posting_lists)
@@ -1,3 +1,4 @@
+import math
 import random
 
 '''
@@ -5,10 +6,16 @@ part-5.
 '''
 
 class Value:
+    __slots__ = ('id', 'pos')
+
     def __init__(self, doc_id, pos):
         self.id = doc_id
         self.pos = pos
 
+    @property
+    def tf(self):
+        return len(self.pos)
+
 class Node:
     def __init__(self, value, level):
         self.value = value
@@ -22,13 +29,126 @@ class SkipList:
     ├── header.value: 元素的值，在 inverted_list 中是文档序号 doc_id
     └── header.forward: 元素个数为 level+1 的数组, forward[i] 表示第i层的节点的后继
     level: 节点的层数，表示某个元素有几个(层)跳表节点
+    length: 第0层的元素个数 (df)，布尔查询按两个 posting list 的长度比选择求交方式
+    version: 每次原地修改 (insert / merge_sorted / delete) 后加一，缓存了转换结果的布尔运算后端据此判断是否失效
     '''
     def __init__(self, max_level, p):
         self.max_level = max_level
         self.p = p
         self.header = Node(-1, max_level)
         self.level = 0
+        self.length = 0
+        self.version = 0
+
+    def __len__(self):
+        return self.length
         
+    @classmethod
+    def from_sorted(cls, values, max_level=16, p=0.5, stride='sqrt'):
+        '''
+        用有序的 Value 序列构建静态跳表，跳表指针确定性地等间隔分布（适用于只读的 posting list）
+        stride: 跳表指针间隔，以第0层的元素个数计
+        ├── 'sqrt': 一层跳表指针，间隔为 ⌈√n⌉ (教材中的做法)
+        ├── int:    一层跳表指针，固定间隔
+        ├── list:   多层，stride[i] 为第 i+1 层的间隔，应逐层递增且为前一层的整数倍
+        └── None:   按概率 p 随机分配层数，结构与逐个 insert 得到的相同，但省去了每次插入时的查找
+        '''
+        values = list(values)
+        n = len(values)
+        if stride is None:
+            skip_list = cls(max_level, p)
+            last = [skip_list.header] * (max_level + 1)
+            for value in values:
+                level = skip_list.random_level()
+                node = Node(value, level)
+                for i in range(level + 1):
+                    last[i].forward[i] = node
+                    last[i] = node
+                skip_list.level = max(skip_list.level, level)
+            skip_list.length = n
+            return skip_list
+        if stride == 'sqrt':
+            strides = [max(2, math.isqrt(n - 1) + 1)] if n > 1 else []
+        elif isinstance(stride, int):
+            strides = [stride]
+        else:
+            strides = list(stride)
+        if any(not isinstance(s, int) or s <= 0 for s in strides):
+            raise ValueError(f"stride 必须是正整数: {stride}")
+        if len(strides) > max_level:
+            raise ValueError(f"stride 的层数 {len(strides)} 超过 max_level={max_level}")
+        for lower, upper in zip(strides, strides[1:]):
+            if upper <= lower or upper % lower:
+                raise ValueError(f"stride 应逐层递增且为前一层的整数倍: {strides}")
+        strides = [s for s in strides if s >= 2]
+
+        skip_list = cls(max_level, p)
+        last = [skip_list.header] * (max_level + 1)
+        for index, value in enumerate(values):
+            level = 0
+            while level < len(strides) and index % strides[level] == 0:
+                level += 1
+            node = Node(value, level)
+            for i in range(level + 1):
+                last[i].forward[i] = node
+                last[i] = node
+            skip_list.level = max(skip_list.level, level)
+        skip_list.length = n
+        return skip_list
+
+    def copy(self):
+        '''
+        复制跳表结构：节点和 forward 数组全部新建，层数与原表相同；Value 对象共享（视为不可变）
+        写时复制 (copy-on-write) 更新时，在副本上 insert / delete / merge_sorted 不影响正在读取原表的线程
+        '''
+        skip_list = SkipList(self.max_level, self.p)
+        skip_list.level = self.level
+        skip_list.length = self.length
+        last = [skip_list.header] * (self.max_level + 1)
+        current = self.header.forward[0]
+        while current:
+            level = len(current.forward) - 1
+            node = Node(current.value, level)
+            for i in range(level + 1):
+                last[i].forward[i] = node
+                last[i] = node
+            current = current.forward[0]
+        return skip_list
+
+    def cursor(self, stats=None, lo=None, hi=None):
+        '''
+        返回指向第一个元素的游标
+        lo / hi: 可选的 doc_id 区间 [lo, hi)，游标从 lo 开始，到达 hi 即视为结束
+        '''
+        if lo is None and hi is None:
+            return PostingCursor(self, stats)
+        return RangeCursor(self, stats, lo, hi)
+
+    def lower_bound(self, id, stats=None):
+        '''从头节点逐层下降，返回第一个 doc_id >= id 的节点，不存在时返回 None'''
+        current = self.header
+        for i in range(self.level, -1, -1):
+            while current.forward[i] and current.forward[i].value.id < id:
+                current = current.forward[i]
+                if stats is not None:
+                    stats['comparisons'] = stats.get('comparisons', 0) + 1
+        return current.forward[0]
+
+    def range(self, lo=None, hi=None):
+        '''
+        按 doc_id 顺序产出 lo <= doc_id < hi 的元素 (Value)
+        ├── lo: 下界（包含），None 表示从头开始；利用跳表指针直接定位到下界
+        └── hi: 上界（不包含），None 表示直到末尾；遇到第一个 >= hi 的元素即停止
+        '''
+        node = self.header.forward[0] if lo is None else self.lower_bound(lo)
+        while node and (hi is None or node.value.id < hi):
+            yield node.value
+            node = node.forward[0]
+
+    def view(self, lo=None, hi=None):
+        '''返回 [lo, hi) 区间上的只读视图'''
+        return SkipListRange(self, lo, hi)
+
     def random_level(self):
         level = 0
         while random.random() < self.p and level < self.max_level:
@@ -63,7 +183,60 @@ class SkipList:
         for i in range(level + 1):
             new_node.forward[i] = update[i].forward[i]
             update[i].forward[i] = new_node
+        self.length += 1
+        self.version += 1
             
+    def merge_sorted(self, values):
+        '''
+        把一批按 doc_id 升序排列的元素合并进跳表，只做一次前向扫描
+        update[i] 是第 i 层最后一个 doc_id 小于当前元素的节点，处理下一个元素时从 update 出发继续向后找，
+        不必每次都从 header 重新查找:
+        ├── 先从第0层向上爬，直到某一层的 update 的后继已经不小于当前元素，更高层的 update 保持不变
+        ├── 再从该层逐层向下，每层取 update[i] 和上一层找到的节点中靠后的一个作为起点
+        ├── 插入 k 个元素的总代价不超过一次完整扫描 O(n + k)，追加到表尾时只需 O(k + log n)
+        └── doc_id 已存在时用新的 Value 替换原有的值
+        values 不是升序时抛出 ValueError，检查在修改跳表之前完成 (O(k))，跳表保持不变
+        '''
+        values = list(values)
+        for previous, value in zip(values, values[1:]):
+            if value.id < previous.id:
+                raise ValueError(f"merge_sorted 要求按 doc_id 升序排列: {previous.id!r} 之后是 {value.id!r}")
+        header = self.header
+        update = [header] * (self.max_level + 1)
+        self.version += 1
+        for value in values:
+            id = value.id
+            top = 0
+            while top < self.level:
+                nxt = update[top + 1].forward[top + 1]
+                if nxt is None or nxt.value.id >= id:
+                    break
+                top += 1
+
+            current = update[top]
+            for i in range(top, -1, -1):
+                finger = update[i]
+                if finger is not header and (current is header or current.value.id < finger.value.id):
+                    current = finger
+                while current.forward[i] and current.forward[i].value.id < id:
+                    current = current.forward[i]
+                update[i] = current
+
+            existing = current.forward[0]
+            if existing and existing.value.id == id:
+                existing.value = value
+                continue
+
+            level = self.random_level()
+            if level > self.level:
+                self.level = level
+            new_node = Node(value, level)
+            for i in range(level + 1):
+                new_node.forward[i] = update[i].forward[i]
+                update[i].forward[i] = new_node
+                update[i] = new_node
+            self.length += 1
+
     def delete(self, value):
         update = [None] * (self.max_level + 1)
         current = self.header
@@ -77,20 +250,179 @@ class SkipList:
                 if update[i].forward[i] != current:
                     break
                 update[i].forward[i] = current.forward[i]
+            self.length -= 1
+            self.version += 1
             while self.level > 0 and not self.header.forward[self.level]:
                 self.level -= 1
                 
                 
+# --- 利用跳表指针的有序归并求交 ---
+
+def _finger_search(node, id, stats=None):
+    '''
+    从 node (node.value.id < id) 出发向后查找，返回第一个 id >= 目标的节点
+    每到一个节点都先尝试它最高层的指针，跳不过去再逐层下降
+    '''
+    # 目标就是下一个节点时（稠密列表求交的常见情况）无需尝试高层指针
+    nxt = node.forward[0]
+    if nxt is None or nxt.value.id >= id:
+        if stats is not None:
+            stats['comparisons'] = stats.get('comparisons', 0) + 1
+        return nxt
+    i = len(node.forward) - 1
+    while i >= 0:
+        nxt = node.forward[i]
+        if stats is not None:
+            stats['comparisons'] = stats.get('comparisons', 0) + 1
+        if nxt and nxt.value.id < id:
+            node = nxt
+            i = len(node.forward) - 1
+        else:
+            i -= 1
+    return node.forward[0]
+
+class PostingCursor:
+    '''
+    SkipList 上的游标，顺序读取 posting list 而不必先把整个链表展开为集合
+    ├── doc():          当前文档ID，遍历结束后为 None
+    ├── positions():    当前文档中的位置列表
+    ├── next():         前进到下一个元素
+    └── skip_to(id):    前进到第一个 doc_id >= id 的元素，从当前节点出发利用高层指针跳跃 (finger search)
+    stats: 可选的统计字典，累计 'comparisons'
+    '''
+    def __init__(self, skip_list, stats=None):
+        self.node = skip_list.header.forward[0]
+        self.stats = stats
+
+    def doc(self):
+        return self.node.value.id if self.node else None
+
+    def positions(self):
+        return self.node.value.pos if self.node else None
+
+    def value(self):
+        return self.node.value if self.node else None
+
+    def next(self):
+        node = self.node
+        if node:
+            node = self.node = node.forward[0]
+        return node.value.id if node else None
+
+    def skip_to(self, id):
+        node = self.node
+        if node and node.value.id < id:
+            node = self.node = _finger_search(node, id, self.stats)
+        return node.value.id if node else None
+
+    def __iter__(self):
+        while self.node:
+            yield self.node.value
+            self.node = self.node.forward[0]
+
+class RangeCursor(PostingCursor):
+    '''
+    限定在 doc_id 区间 [lo, hi) 内的游标
+    构造时用 lower_bound 定位到 lo，之后的 next() / skip_to() 一旦越过 hi 就返回 None
+    '''
+    def __init__(self, skip_list, stats=None, lo=None, hi=None):
+        self.stats = stats
+        self.hi = hi
+        node = skip_list.header.forward[0] if lo is None else skip_list.lower_bound(lo, stats)
+        self.node = self._bounded(node)
+
+    def _bounded(self, node):
+        if node and self.hi is not None and node.value.id >= self.hi:
+            return None
+        return node
+
+    def next(self):
+        node = self.node
+        if node:
+            node = self.node = self._bounded(node.forward[0])
+        return node.value.id if node else None
+
+    def skip_to(self, id):
+        node = self.node
+        if node and node.value.id < id:
+            node = self.node = self._bounded(_finger_search(node, id, self.stats))
+        return node.value.id if node else None
+
+    def __iter__(self):
+        while self.node:
+            yield self.node.value
+            self.node = self._bounded(self.node.forward[0])
+
+class SkipListRange:
+    '''
+    SkipList 在 doc_id 区间 [lo, hi) 上的只读视图
+    与 SkipList 一样通过 cursor() 读取，布尔查询把文档区间下推到 posting list 遍历时使用
+    '''
+    def __init__(self, skip_list, lo=None, hi=None):
+        self.skip_list = skip_list
+        self.lo = lo
+        self.hi = hi
+
+    def cursor(self, stats=None):
+        return self.skip_list.cursor(stats, self.lo, self.hi)
+
+    def __iter__(self):
+        return self.skip_list.range(self.lo, self.hi)
+
+    def __len__(self):
+        '''区间内的元素个数未知，以整个跳表的长度作为上界'''
+        return len(self.skip_list)
+
+def intersect_cursors(cursors, stats=None):
+    '''
+    多个游标的有序归并求交（生成器）
+    每产出一个 doc_id 时，所有游标都停在该文档上，可以直接读取各自的 positions()
+    游标只需提供 doc() / next() / skip_to() 三个方法
+    '''
+    if not cursors:
+        return
+    lead, others = cursors[0], cursors[1:]
+    target = lead.doc()
+    while target is not None:
+        doc = target
+        for cursor in others:
+            if stats is not None:
+                stats['comparisons'] = stats.get('comparisons', 0) + 1
+            doc = cursor.skip_to(target)
+            if doc != target:
+                break
+        if doc == target:
+            yield target
+            target = lead.next()
+        elif doc is None:
+            return
+        else:
+            target = lead.skip_to(doc)
+
+def intersect(list1, list2, stats=None):
+    '''
+    两个跳表（或 SkipListRange 视图）的有序归并求交，落后的一方利用跳表指针跳过不可能匹配的文档
+    stats: 可选的统计字典，累计 'comparisons'
+    返回: 交集的 doc_id 列表（有序）
+    '''
+    cursors = [list1.cursor(stats), list2.cursor(stats)]
+    return list(intersect_cursors(cursors, stats))
+
+
 # --- 词典和 Posting List 结构（简化用于演示）---
 
 class DictionaryEntry:
-    """词典条目结构：存储指针和元数据"""
-    def __init__(self, block_id, term_string_offset, compressed_length, df, post_list_ref):
+    """
+    词典条目结构：存储指针和元数据
+    post_list_offsets: 块内每个词项（按块内顺序）的 posting list 在 posting 存储中的下标
+    """
+    def __init__(self, block_id, term_string_offset, compressed_length, df, post_list_ref, post_list_offsets=None):
         self.block_id = block_id
         self.term_string_offset = term_string_offset
         self.compressed_length = compressed_length
         self.document_frequency = df
         self.post_list_ref = post_list_ref
+        self.post_list_offsets = post_list_offsets
 
     def __repr__(self):
         return (f"Entry(Block:{self.block_id}, Offset:{self.term_string_offset}, "
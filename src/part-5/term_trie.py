@@ -0,0 +1,317 @@
+"""
+最小化字典树 (DAWG) 词典
+由 collect_and_sort_tokens 的有序词表增量构建 (Daciuk 算法)，相同的后缀子树只保存一份:
+- lookup(term): 精确查找，返回词项在有序词表中的序号 (term-ID)，不存在时返回 None
+- term_at(term_id): 由序号还原词项
+- enumerate(prefix): 按字典序列出所有以 prefix 开头的词项
+- complete(prefix, k): 以 prefix 开头、df 最大的 k 个词项（输入提示）
+
+以 prefix 开头的词项在有序词表中是连续的一段 [lo, lo + count)，df 按序号存放在数组中，
+top-k 在该区间上用区间最大值查询 (RMQ) 配合堆逐个取出，只访问 O(k) 个区间，与前缀下的词项数无关。
+"""
+
+from array import array
+import bisect
+import heapq
+
+
+class _BuildNode:
+    """构建期间的节点，最小化完成后转换为扁平数组"""
+    __slots__ = ('children', 'final')
+
+    def __init__(self):
+        self.children = {}     # {字符: _BuildNode}，词表有序，插入顺序即字符顺序
+        self.final = False
+
+
+def _narrow(values):
+    """用能容纳最大值的最小类型码保存无符号整数数组"""
+    values = array('I', values)
+    largest = max(values, default=0)
+    for typecode in 'BHI':
+        if largest < 1 << (8 * array(typecode).itemsize):
+            return array(typecode, values)
+    return values
+
+
+def _signature(node):
+    return node.final, tuple((char, id(child)) for char, child in node.children.items())
+
+
+def _minimize(register, unchecked, down_to):
+    """把 unchecked 中深度大于 down_to 的节点与已登记的等价节点合并"""
+    while len(unchecked) > down_to:
+        parent, char, child = unchecked.pop()
+        key = _signature(child)
+        existing = register.get(key)
+        if existing is not None:
+            parent.children[char] = existing
+        else:
+            register[key] = child
+
+
+class RangeMax:
+    """
+    数组上的区间最大值下标查询
+    先把数组按 BLOCK 个元素分块，只在块最大值上建稀疏表，额外空间 O(n / BLOCK * log n)；
+    查询时两端不完整的块直接扫描，中间的完整块查稀疏表
+    相同的值取下标最小的一个
+    """
+    BLOCK = 32
+
+    def __init__(self, values):
+        self.values = values
+        block = self.BLOCK
+        level = array('I', (self._scan(start, min(start + block, len(values)))
+                            for start in range(0, len(values), block)))
+        self.table = [_narrow(level)]
+        width = 1
+        while 2 * width <= len(level):
+            previous = level
+            level = array('I', (self._better(previous[i], previous[i + width])
+                                for i in range(len(previous) - width)))
+            self.table.append(_narrow(level))
+            width *= 2
+
+    def _better(self, i, j):
+        values = self.values
+        return i if values[i] >= values[j] else j
+
+    def _scan(self, lo, hi):
+        return max(range(lo, hi), key=self.values.__getitem__)
+
+    def argmax(self, lo, hi):
+        """[lo, hi) 中最大值的下标，区间不能为空"""
+        block = self.BLOCK
+        first, last = lo // block + 1, (hi - 1) // block
+        if first >= last:
+            return self._scan(lo, hi)
+        best = self._scan(lo, first * block)
+        j = (last - first).bit_length() - 1
+        level = self.table[j]
+        best = self._better(best, self._better(level[first], level[last - (1 << j)]))
+        return self._better(best, self._scan(last * block, hi))
+
+    def top_k(self, lo, hi, k):
+        """[lo, hi) 中最大的 k 个值的下标，按值从大到小（相同的值按下标从小到大）"""
+        result = []
+        if lo >= hi:
+            return result
+        heap = []
+        values = self.values
+
+        def push(lo, hi):
+            if lo < hi:
+                i = self.argmax(lo, hi)
+                heapq.heappush(heap, (-values[i], i, lo, hi))
+
+        push(lo, hi)
+        while heap and len(result) < k:
+            _, i, lo, hi = heapq.heappop(heap)
+            result.append(i)
+            push(lo, i)
+            push(i + 1, hi)
+        return result
+
+    def size_in_bytes(self):
+        return sum(level.itemsize * len(level) for level in self.table)
+
+
+class TermTrie:
+    """
+    DAWG 的扁平数组表示，节点按先序编号，根节点为 0:
+    ├── first_edge[n] : first_edge[n + 1]   节点 n 的出边，按字符有序
+    ├── labels[e]                            边 e 的字符（所有边的字符拼成一个字符串，用 str.find 查找）
+    ├── targets[e]                           边 e 指向的节点
+    ├── edge_rank[e]                         经过边 e 之前、在当前节点已经越过的词项数（用于计算序号）
+    ├── final[n]                             节点 n 是否为某个词项的结尾
+    └── counts[n]                            从节点 n 出发可以到达的词项数
+    """
+
+    def __init__(self, labels, targets, first_edge, edge_rank, final, counts, df=None):
+        self.labels = labels
+        self.targets = targets
+        self.first_edge = first_edge
+        self.edge_rank = edge_rank
+        self.final = final
+        self.counts = counts
+        self.df = df
+        self._range_max = RangeMax(df) if df is not None else None
+
+    @classmethod
+    def build(cls, sorted_tokens, df=None):
+        """
+        :param sorted_tokens: 有序且唯一的词表，同 collect_and_sort_tokens
+        :param df: 可选，{token: df}；给出时才能使用 complete()
+        """
+        root = _BuildNode()
+        register = {}
+        unchecked = []          # 上一个词项路径上尚未最小化的 (父节点, 字符, 子节点)
+        previous = ""
+        for token in sorted_tokens:
+            common = 0
+            limit = min(len(token), len(previous))
+            while common < limit and token[common] == previous[common]:
+                common += 1
+            _minimize(register, unchecked, common)
+            node = unchecked[-1][2] if unchecked else root
+            for char in token[common:]:
+                child = _BuildNode()
+                node.children[char] = child
+                unchecked.append((node, char, child))
+                node = child
+            node.final = True
+            previous = token
+        _minimize(register, unchecked, 0)
+
+        # 先序编号
+        order = []
+        numbers = {}
+        stack = [root]
+        while stack:
+            node = stack.pop()
+            if id(node) in numbers:
+                continue
+            numbers[id(node)] = len(order)
+            order.append(node)
+            stack.extend(reversed(list(node.children.values())))
+
+        # 后序计算每个节点可到达的词项数
+        counts = array('I', [0]) * len(order)
+        done = set()
+        stack = [root]
+        while stack:
+            node = stack[-1]
+            pending = [child for child in node.children.values() if id(child) not in done]
+            if pending:
+                stack.extend(pending)
+                continue
+            stack.pop()
+            if id(node) in done:
+                continue
+            counts[numbers[id(node)]] = node.final + sum(counts[numbers[id(c)]] for c in node.children.values())
+            done.add(id(node))
+
+        labels = []
+        targets = array('I')
+        first_edge = array('I')
+        edge_rank = array('I')
+        final = bytearray(len(order))
+        for n, node in enumerate(order):
+            first_edge.append(len(targets))
+            final[n] = node.final
+            rank = int(node.final)
+            for char, child in node.children.items():
+                labels.append(char)
+                targets.append(numbers[id(child)])
+                edge_rank.append(rank)
+                rank += counts[numbers[id(child)]]
+        first_edge.append(len(targets))
+
+        df_array = None
+        if df is not None:
+            df_array = _narrow(df.get(token, 0) for token in sorted_tokens)
+        return cls(''.join(labels), _narrow(targets), _narrow(first_edge), _narrow(edge_rank), final,
+                   _narrow(counts), df_array)
+
+    def __len__(self):
+        return self.counts[0] if self.counts else 0
+
+    @property
+    def node_count(self):
+        return len(self.final)
+
+    def _locate(self, prefix):
+        """沿 prefix 走到的节点和该节点之前的词项数；路径不存在时返回 (None, 0)"""
+        labels, first_edge = self.labels, self.first_edge
+        node = ordinal = 0
+        for char in prefix:
+            e = labels.find(char, first_edge[node], first_edge[node + 1])
+            if e < 0:
+                return None, 0
+            ordinal += self.edge_rank[e]
+            node = self.targets[e]
+        return node, ordinal
+
+    def lookup(self, term):
+        """
+        精确查找
+        :return: 词项在有序词表中的序号；不存在时返回 None
+        """
+        node, ordinal = self._locate(term)
+        if node is None or not self.final[node]:
+            return None
+        return ordinal
+
+    def __contains__(self, term):
+        return self.lookup(term) is not None
+
+    def prefix_range(self, prefix):
+        """以 prefix 开头的词项的序号区间 [lo, hi)，没有时返回 (0, 0)"""
+        node, ordinal = self._locate(prefix)
+        if node is None:
+            return 0, 0
+        return ordinal, ordinal + self.counts[node]
+
+    def term_at(self, term_id):
+        """由序号还原词项"""
+        if not 0 <= term_id < len(self):
+            raise IndexError(term_id)
+        chars = []
+        node = 0
+        while not (self.final[node] and term_id == 0):
+            # 每条出边的 edge_rank 严格递增，取最后一个不超过剩余序号的边
+            e = bisect.bisect_right(self.edge_rank, term_id, self.first_edge[node], self.first_edge[node + 1]) - 1
+            term_id -= self.edge_rank[e]
+            chars.append(self.labels[e])
+            node = self.targets[e]
+        return ''.join(chars)
+
+    def enumerate(self, prefix="", limit=None):
+        """按字典序生成以 prefix 开头的词项，最多 limit 个"""
+        node, _ = self._locate(prefix)
+        if node is None:
+            return
+        produced = 0
+        stack = [(node, prefix)]
+        while stack:
+            node, text = stack.pop()
+            if self.final[node]:
+                if limit is not None and produced >= limit:
+                    return
+                produced += 1
+                yield text
+            for e in range(self.first_edge[node + 1] - 1, self.first_edge[node] - 1, -1):
+                stack.append((self.targets[e], text + self.labels[e]))
+
+    def complete(self, prefix, k=10):
+        """
+        输入提示：以 prefix 开头、df 最大的 k 个词项
+        :return: [(term, df)]，按 df 从大到小，相同 df 按字典序
+        """
+        if self._range_max is None:
+            raise ValueError("构建 TermTrie 时没有提供 df，无法按 df 补全")
+        lo, hi = self.prefix_range(prefix)
+        return [(self.term_at(i), self.df[i]) for i in self._range_max.top_k(lo, hi, k)]
+
+    def size_in_bytes(self):
+        """扁平数组占用的字节数（字符按 UTF-8 计），包括 df 和区间最大值索引"""
+        size = len(self.labels.encode('utf-8')) + len(self.final)
+        for arr in (self.targets, self.first_edge, self.edge_rank, self.counts):
+            size += arr.itemsize * len(arr)
+        if self.df is not None:
+            size += self.df.itemsize * len(self.df) + self._range_max.size_in_bytes()
+        return size
+
+
+def document_frequencies(inverted_posting_lists):
+    """{token: df}，df 为 posting list 的长度"""
+    df = {}
+    for token, skip_list in inverted_posting_lists.items():
+        count = 0
+        current = skip_list.header.forward[0]
+        while current:
+            count += 1
+            current = current.forward[0]
+        df[token] = count
+    return df
@@ -0,0 +1,87 @@
+'''
+解码后词典块的 LRU 缓存测试
+查询词项按 Zipf 分布从词表中抽取（少数热点词项占大部分查询），对比不同内存上限下:
+1. 命中率、淘汰次数、缓存占用
+2. BlockedDictionary.lookup 的平均 / p99 延迟（与不使用缓存对比）
+并检查使用缓存时的查找结果与不使用缓存时相同
+'''
+import random
+import sys, os
+import time
+import compress_index as Compress
+
+
+CACHE_LIMITS = [16 * 1024, 64 * 1024, 256 * 1024, 1024 * 1024]
+
+
+def zipf_queries(sorted_tokens, n_queries, s=1.1, seed=42):
+    """热点词项随机分布在词表中，而不是集中在字典序的开头"""
+    rng = random.Random(seed)
+    ranked = list(sorted_tokens)
+    rng.shuffle(ranked)
+    weights = [1 / (rank + 1) ** s for rank in range(len(ranked))]
+    return rng.choices(ranked, weights=weights, k=n_queries)
+
+
+def run_queries(blocked_dictionary, queries):
+    results = []
+    latencies = []
+    for token in queries:
+        start_time = time.perf_counter()
+        found = blocked_dictionary.lookup(token)
+        latencies.append(time.perf_counter() - start_time)
+        results.append(None if found is None else (found[0].block_id, found[1]))
+    latencies.sort()
+    return results, sum(latencies) / len(latencies), latencies[int(len(latencies) * 0.99)]
+
+
+def main_test_harness(input_path="output_data/", input_ending='.stw', block_size=16, n_queries=50000):
+    documents = Compress.read_documents(input_path, input_ending)
+    sorted_tokens = Compress.collect_and_sort_tokens(documents)
+    queries = zipf_queries(sorted_tokens, n_queries)
+
+    formats = [
+        ("字符串格式", Compress.front_code_and_block(sorted_tokens, block_size)),
+        ("字节格式", Compress.front_code_and_block_bytes(sorted_tokens, block_size)),
+    ]
+    rows = []
+    errors = 0
+    for format_name, (term_data, dictionary_index) in formats:
+        expected, mean, p99 = run_queries(Compress.BlockedDictionary(term_data, dictionary_index), queries)
+        rows.append((format_name, "无缓存", None, mean, p99))
+        for limit in CACHE_LIMITS:
+            cache = Compress.BlockCache(max_bytes=limit)
+            blocked_dictionary = Compress.BlockedDictionary(term_data, dictionary_index, block_cache=cache)
+            results, mean, p99 = run_queries(blocked_dictionary, queries)
+            errors += sum(a != b for a, b in zip(results, expected))
+            rows.append((format_name, f"{limit // 1024} KB", cache.stats(), mean, p99))
+
+    os.makedirs("./test", exist_ok=True)
+    filename = "./test/test_block_cache.log"
+    with open(filename, 'w', encoding='utf-8') as file:
+        STDOUT = sys.stdout
+        sys.stdout = file
+
+        print(f"词典块缓存测试 (词项数 {len(sorted_tokens)}, 块大小 k={block_size}, "
+              f"块数 {-(-len(sorted_tokens) // block_size)}, Zipf 查询 {n_queries} 次)")
+        print("-" * 100)
+        print(f"{'格式':<8} | {'内存上限':<8} | {'命中率':<8} | {'淘汰次数':<8} | {'缓存块数':<8} | "
+              f"{'占用 (KB)':<10} | {'平均 (us)':<10} | {'p99 (us)':<10}")
+        print("-" * 100)
+        for format_name, limit, stats, mean, p99 in rows:
+            if stats is None:
+                cache_columns = f"{'-':<11} | {'-':<12} | {'-':<12} | {'-':<10}"
+            else:
+                cache_columns = (f"{stats['hit_rate']:<11.2%} | {stats['evictions']:<12} | {stats['blocks']:<12} | "
+                                 f"{stats['bytes'] / 1024:<10.1f}")
+            print(f"{format_name:<6} | {limit:<12} | {cache_columns} | {mean * 1e6:<10.2f} | {p99 * 1e6:<10.2f}")
+        print("-" * 100)
+        print(f"与无缓存结果不一致: {errors}")
+
+        sys.stdout = STDOUT
+        print(f"词典块缓存测试结果已经写入到'{filename}'中！")
+    assert errors == 0
+
+
+if __name__ == '__main__':
+    main_test_harness()
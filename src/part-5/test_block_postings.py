@@ -0,0 +1,92 @@
+'''
+分块压缩 posting list 的块级跳表求交测试
+合成长 posting list (默认 10^6 个文档)，短列表与长列表求交 (AND)，对比:
+1. 未压缩的有序数组: 游标在数组上二分 skip_to
+2. 先完整解码压缩列表再求交
+3. BlockPostings: 在块级跳表上二分，只解码落到的块
+以及 NumPy intersect1d (如已安装) 作为参考；统计每次求交解码的块数与总块数
+另外检查各编码下的结果与 set 求交一致
+'''
+import random
+import sys, os
+import time
+import block_postings
+import posting_codec
+from block_postings import BlockPostings
+
+
+def best_of(func, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start_time)
+    return best
+
+
+def sample(rng, n_docs, n):
+    return sorted(rng.sample(range(n_docs), n))
+
+
+def main_test_harness(n_docs=10**6, long_density=0.3, short_lengths=(10, 100, 1000, 10000),
+                      codecs=('varbyte', 'pfor', 'rice'), repeat=3, seed=42):
+    rng = random.Random(seed)
+    long_list = sample(rng, n_docs, int(n_docs * long_density))
+    shorts = {n: sample(rng, n_docs, n) for n in short_lengths}
+    compressed = {name: BlockPostings.build(long_list, codec=name) for name in codecs}
+
+    errors = 0
+    rows = []
+    for n, short in shorts.items():
+        expected = sorted(set(short) & set(long_list))
+        row = {'short': n, 'matches': len(expected)}
+        row['array'] = best_of(lambda: block_postings.intersect(short, long_list), repeat)
+        for name, postings in compressed.items():
+            stats = {}
+            result = block_postings.intersect(short, postings, stats=stats)
+            errors += result != expected
+            row[name] = best_of(lambda: block_postings.intersect(short, postings), repeat)
+            row[name + ' 全解码'] = best_of(lambda: block_postings.intersect(short, postings.to_list()), repeat)
+            row[name + ' 块数'] = stats['blocks_decoded']
+        if posting_codec.np is not None:
+            np = posting_codec.np
+            a, b = np.array(short, dtype=np.int32), np.array(long_list, dtype=np.int32)
+            row['numpy'] = best_of(lambda: np.intersect1d(a, b, assume_unique=True), repeat)
+        rows.append(row)
+
+    os.makedirs("./test", exist_ok=True)
+    filename = "./test/test_block_postings.log"
+    with open(filename, 'w', encoding='utf-8') as file:
+        STDOUT = sys.stdout
+        sys.stdout = file
+
+        any_postings = next(iter(compressed.values()))
+        print(f"块级跳表求交测试 (文档数 {n_docs}, 长列表 {len(long_list)} 个文档, "
+              f"块大小 {any_postings.block_size}, 共 {any_postings.block_count} 块, 取 {repeat} 次中的最短时间)")
+        print("-" * 100)
+        print(f"{'编码':<10} | {'压缩后字节':<12} | {'其中跳表字节':<12} | {'位/posting':<10}")
+        for name, postings in compressed.items():
+            skip_bytes = postings.size_in_bytes() - len(postings.data)
+            print(f"{name:<10} | {postings.size_in_bytes():<17} | {skip_bytes:<18} | "
+                  f"{postings.size_in_bytes() * 8 / len(long_list):<10.2f}")
+        print(f"{'uint32':<10} | {len(long_list) * 4:<17} | {'-':<18} | {32.0:<10.2f}")
+        for row in rows:
+            print("-" * 100)
+            print(f"短列表 {row['short']} 个文档 AND 长列表 (交集 {row['matches']} 个):")
+            print(f"  未压缩数组:       {row['array'] * 1000:.3f} ms")
+            if 'numpy' in row:
+                print(f"  NumPy intersect1d: {row['numpy'] * 1000:.3f} ms")
+            for name in codecs:
+                print(f"  {name:<8} 块级跳表: {row[name] * 1000:.3f} ms "
+                      f"({row[name] / row['array']:.2f}x 数组, 解码 {row[name + ' 块数']} 块), "
+                      f"完整解码后求交: {row[name + ' 全解码'] * 1000:.3f} ms")
+        print("-" * 100)
+        print(f"与 set 求交结果不一致: {errors}")
+
+        sys.stdout = STDOUT
+        print(f"块级跳表求交测试结果已经写入到'{filename}'中！")
+    assert errors == 0
+
+
+if __name__ == '__main__':
+    main_test_harness()
@@ -0,0 +1,82 @@
+'''
+词典分块大小 k 的扫描基准
+在真实词表上对每个候选 k 构建分块前端编码词典（默认为检查点中实际保存的字符串格式），测量:
+1. 词典字节数（前端编码串 + Anchor 字符串 + 每块一个偏移）
+2. 构建时间
+3. 随机词项查找 (BlockedDictionary.lookup) 的 p50 / p99 延迟
+并给出推荐 k: 有内存预算时为预算内 p99 最低的 k，不限内存时为 p99 不超过最快者 LATENCY_SLACK 倍的 k 中词典最小的一个
+
+用法:
+    python test_block_size.py                       # 不限内存
+    python test_block_size.py --budget 40000        # 词典不超过 40000 字节
+    python test_block_size.py --k 1 2 4 8 16 32 64 128
+    python test_block_size.py --format bytes        # 字节格式的词典
+'''
+import argparse
+import json
+import sys, os
+import compress_index as Compress
+
+
+def main_test_harness(input_path="output_data/", input_ending='.stw', memory_budget=None,
+                      candidates=Compress.BLOCK_SIZE_CANDIDATES, n_queries=20000,
+                      output="./test/block_size_benchmark.json", dictionary_format='string'):
+    """
+    :return: 推荐的 k
+    """
+    documents = Compress.read_documents(input_path, input_ending)
+    sorted_tokens = Compress.collect_and_sort_tokens(documents)
+    best_k, measurements = Compress.tune_block_size(sorted_tokens, memory_budget, candidates, n_queries,
+                                                    dictionary_format=dictionary_format)
+    # 不限预算时 p99 最低的 k，用于说明预算（或延迟容忍度）带来的延迟代价
+    fastest_k = min(measurements, key=lambda m: m['p99_us'])['k']
+
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump({'format': dictionary_format, 'memory_budget': memory_budget, 'recommended_k': best_k,
+                   'results': measurements},
+                  f, indent=2, ensure_ascii=False)
+
+    filename = "./test/test_block_size.log"
+    with open(filename, 'w', encoding='utf-8') as file:
+        STDOUT = sys.stdout
+        sys.stdout = file
+
+        print(f"词典分块大小扫描 (词典格式 {dictionary_format}, 词项数 {len(sorted_tokens)}, 随机查找 {n_queries} 次)")
+        print(f"原始词项字节数: {sum(len(t.encode('utf-8')) for t in sorted_tokens)}")
+        print("-" * 80)
+        print(f"{'k':<6} | {'词典字节数':<10} | {'每词项字节':<10} | {'构建 (ms)':<10} | "
+              f"{'p50 (us)':<10} | {'p99 (us)':<10} | {'满足预算':<6}")
+        print("-" * 80)
+        for m in measurements:
+            fits = memory_budget is None or m['bytes'] <= memory_budget
+            print(f"{m['k']:<6} | {m['bytes']:<15} | {m['bytes'] / len(sorted_tokens):<15.2f} | "
+                  f"{m['build_ms']:<10.2f} | {m['p50_us']:<10.2f} | {m['p99_us']:<10.2f} | {'是' if fits else '否'}")
+        print("-" * 80)
+        budget = "不限" if memory_budget is None else f"{memory_budget} 字节"
+        print(f"内存预算: {budget}, 推荐 k = {best_k}")
+        if memory_budget is None:
+            print(f"（不限内存: p99 不超过最快者 {Compress.LATENCY_SLACK} 倍的 k 中词典最小的一个）")
+        if best_k != fastest_k:
+            print(f"（p99 最低的是 k = {fastest_k}）")
+
+        sys.stdout = STDOUT
+        print(f"推荐 k = {best_k}，扫描结果已经写入到'{output}'和'{filename}'中！")
+    return best_k
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="词典分块大小 k 的扫描基准")
+    parser.add_argument('--budget', type=int, default=None, help="词典字节数上限，默认不限")
+    parser.add_argument('--k', type=int, nargs='+', default=Compress.BLOCK_SIZE_CANDIDATES, help="候选的 k")
+    parser.add_argument('--queries', type=int, default=20000, help="随机查找次数")
+    parser.add_argument('--format', choices=sorted(Compress.DICTIONARY_FORMATS), default='string',
+                        help="词典格式，默认为检查点中保存的字符串格式")
+    parser.add_argument('--output', default="./test/block_size_benchmark.json", help="JSON 结果文件")
+    return parser.parse_args(argv)
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    main_test_harness(memory_budget=args.budget, candidates=args.k, n_queries=args.queries, output=args.output,
+                      dictionary_format=args.format)
@@ -0,0 +1,146 @@
+'''
+布尔运算后端性能对比: set / skiplist / numpy / roaring / compressed
+1. 真实语料上的高频词项查询
+2. 合成的大规模 posting list (长列表运算)
+3. posting list 被替换 / 原地修改 / 删除文档后，数组后端的缓存与全集是否失效（结果仍与 set 后端一致）
+计时使用 search_ordinals: 数组后端返回整数编号，不转换回文档ID（转换的开销与后端无关）
+'''
+import time
+import random
+import skiplist
+import compress_index as Compress
+import boolean_search_v2 as boolean_search
+import posting_backends
+import os, sys
+
+
+BACKENDS = ['set', 'skiplist', 'numpy', 'roaring', 'compressed']
+
+
+def available_backends():
+    if posting_backends.np is None:
+        return [b for b in BACKENDS if b != 'numpy']
+    return BACKENDS
+
+
+def build_queries(inverted_posting_lists, n_terms=6):
+    """用 df 最高的几个词项组合出 AND / OR / NOT 查询"""
+    by_df = sorted(inverted_posting_lists,
+                   key=lambda t: sum(1 for _ in inverted_posting_lists[t].cursor()), reverse=True)
+    top = by_df[:n_terms]
+    queries = []
+    for i in range(0, len(top) - 1, 2):
+        a, b = top[i], top[i + 1]
+        queries += [f"{a} AND {b}", f"{a} OR {b}", f"{a} AND NOT {b}"]
+    rare = by_df[len(by_df) // 2]
+    queries.append(f"{rare} AND {top[0]}")
+    queries.append(f"({top[0]} OR {top[1]}) AND NOT ({top[2]} AND {top[3]})")
+    return queries
+
+
+def time_queries(engine, queries, repeat):
+    # 预热一次，数组后端在这里完成 SkipList -> 数组的转换
+    for query in queries:
+        engine.search_ordinals(query)
+    timings = {}
+    for query in queries:
+        start_time = time.perf_counter()
+        for _ in range(repeat):
+            engine.search_ordinals(query)
+        timings[query] = (time.perf_counter() - start_time) / repeat * 1000
+    return timings
+
+
+def synthetic_posting_lists(n_docs, densities, seed=42):
+    """合成的倒排表: 每个词项以给定的密度随机出现在 n_docs 个文档中"""
+    rng = random.Random(seed)
+    inverted_posting_lists = {}
+    for i, density in enumerate(densities):
+        doc_ids = sorted(rng.sample(range(n_docs), int(n_docs * density)))
+        values = [skiplist.Value(doc_id, [0]) for doc_id in doc_ids]
+        inverted_posting_lists[f"t{i}_{density}"] = skiplist.SkipList.from_sorted(values)
+    return inverted_posting_lists
+
+
+def compare_backends(title, inverted_posting_lists, queries, repeat):
+    print(f"\n{title}")
+    print("-" * 100)
+    engines = {b: boolean_search.BooleanSearchEngine({}, inverted_posting_lists, backend=b)
+               for b in available_backends()}
+
+    results = {b: time_queries(e, queries, repeat) for b, e in engines.items()}
+    for query in queries:
+        expected = engines['set'].search(query)
+        for backend, engine in engines.items():
+            assert engine.search(query) == expected, (backend, query)
+            if engine.ops is not None:
+                assert engine.ops.to_doc_ids(engine.search_ordinals(query)) == expected, (backend, query)
+
+    header = f"{'查询':<45} | " + " | ".join(f"{b + ' (ms)':<14}" for b in engines) + " | 最快/set"
+    print(header)
+    print("-" * 100)
+    for query in queries:
+        row = [results[b][query] for b in engines]
+        speedup = results['set'][query] / min(row)
+        print(f"{query[:45]:<45} | " + " | ".join(f"{t:<14.4f}" for t in row) + f" | {speedup:.2f}x")
+
+
+def check_cache_invalidation(n_docs=2000):
+    """先查询一次让数组后端缓存转换结果，再修改倒排表，修改后的查询结果必须与 set 后端一致"""
+    lists = synthetic_posting_lists(n_docs, [0.5, 0.3, 0.05])
+    a, b, c = sorted(lists)
+    queries = [f"{a} AND {b}", f"{a} OR {c}", f"{b} AND NOT {c}", f"NOT {c}"]
+    engines = {backend: boolean_search.BooleanSearchEngine({}, lists, backend=backend)
+               for backend in available_backends()}
+    for engine in engines.values():
+        for query in queries:
+            engine.search(query)
+
+    changes = [
+        ("原地删除文档", lambda: [lists[a].delete(doc.id) for doc in list(lists[a].cursor())[::3]]),
+        ("原地合并新文档", lambda: lists[b].merge_sorted(
+            [skiplist.Value(doc_id, [0]) for doc_id in range(n_docs, n_docs + 50)])),
+        ("替换为副本后修改", lambda: lists.__setitem__(c, lists[c].copy()) or lists[c].insert(skiplist.Value(n_docs, [1]))),
+        ("从所有列表删除文档", lambda: [skip_list.delete(doc_id) for doc_id in range(0, n_docs, 7)
+                                    for skip_list in lists.values()]),
+    ]
+    errors = 0
+    print(f"\n[3] 修改倒排表后的缓存失效 (文档数 {n_docs})")
+    print("-" * 100)
+    for title, change in changes:
+        change()
+        for query in queries:
+            expected = engines['set'].search(query)
+            wrong = [backend for backend, engine in engines.items() if engine.search(query) != expected]
+            errors += len(wrong)
+            print(f"{title:<12} | {query:<40} | {'一致' if not wrong else '不一致: ' + ', '.join(wrong)}")
+    return errors
+
+
+def main_test_harness(input_path="output_data/", input_ending='.stw', n_docs=200000):
+    documents = Compress.read_documents(input_path, input_ending)
+    inverted_posting_lists = Compress.invert_index(documents)
+
+    os.makedirs("./test", exist_ok=True)
+    filename = "./test/test_boolean_backends.log"
+    with open(filename, 'w', encoding='utf-8') as file:
+        STDOUT = sys.stdout
+        sys.stdout = file
+
+        print(f"布尔运算后端对比 (可用后端: {available_backends()})")
+        compare_backends(f"[1] 真实语料 (文档数 {len(documents)})", inverted_posting_lists,
+                         build_queries(inverted_posting_lists), repeat=20)
+
+        synthetic = synthetic_posting_lists(n_docs, [0.8, 0.5, 0.2, 0.05, 0.001])
+        t = sorted(synthetic)
+        queries = [f"{t[0]} AND {t[1]}", f"{t[0]} OR {t[2]}", f"{t[1]} AND NOT {t[2]}",
+                   f"{t[4]} AND {t[1]}", f"({t[0]} OR {t[3]}) AND NOT {t[2]}"]
+        compare_backends(f"[2] 合成 posting list (文档数 {n_docs})", synthetic, queries, repeat=3)
+        errors = check_cache_invalidation()
+
+        sys.stdout = STDOUT
+        print(f"布尔运算后端对比结果已经写入到'{filename}'中！")
+    assert errors == 0
+
+if __name__ == '__main__':
+    main_test_harness()
@@ -0,0 +1,250 @@
+'''
+压缩效果报告: 词典格式 × posting 编码
+在真实语料上分别构建每种词典格式和每种 posting 编码，测量字节数、构建时间和查询延迟，
+再把两者组合成完整索引的汇总表，同时写出 JSON 和文本两份结果:
+1. 词典格式 (DICTIONARY_FORMATS)
+   ├── raw          有序词表: 词项字节 + 每词项一个 4 字节指针，二分查找
+   ├── front_string 分块前端编码（字符串格式），BlockedDictionary.lookup
+   ├── front_bytes  分块前端编码（字节格式，varint 长度），BlockedDictionary.lookup
+   ├── dawg         最小化的词项 trie (term_trie.TermTrie)，lookup
+   └── mph          最小完美哈希 (perfect_hash.PerfectHash)，只支持精确查找
+   测量: 字节数、每词项字节、构建时间、随机词项查找的 p50 / p99 延迟
+2. posting 编码: 不压缩 (uint32) 与 posting_codec.CODECS 中的每种编码，文档编号按 block_postings 分块
+   测量: 文档编号字节数（含块级跳表）、每 posting 字节、构建时间、标准查询集
+   （'compressed' 后端上的布尔查询）的平均 / p99 延迟；位置流与编码无关，单独统计
+3. 汇总: 每种 (词典格式, posting 编码) 的总字节数 (词典 + 文档编号 + 位置流)、每 posting 字节、
+   构建时间之和、查询延迟（查询词项的词典查找 + 布尔查询）
+
+用法:
+    python test_compression_report.py
+    python test_compression_report.py --k 8 --formats front_bytes dawg --codecs varbyte pfor
+    python test_compression_report.py --output ./test/compression_report.json
+'''
+from array import array
+import argparse
+import bisect
+import json
+import random
+import sys, os
+import time
+import block_postings
+import boolean_search_v2 as boolean_search
+import compress_index as Compress
+import posting_codec
+import term_trie
+from doc_table import DocIdTable
+from perfect_hash import PerfectHash
+
+
+DICTIONARY_FORMATS = ['raw', 'front_string', 'front_bytes', 'dawg', 'mph']
+POSTING_CODECS = ['none'] + list(posting_codec.CODECS)
+STANDARD_QUERIES = [
+    "(book AND club) OR (chat AND date)",
+    "(book OR (chat AND date)) AND (club OR (chat AND date))",
+    "((book OR chat) AND (book OR date)) AND ((club OR chat) AND (club OR date))",
+    "system AND NOT (book OR chat)",
+    "last AND week",
+    "food AND water",
+    "information AND retrieval",
+]
+
+
+def percentile(sorted_values, q):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * q))]
+
+
+def build_dictionary(name, sorted_tokens, block_size):
+    """
+    :return: (lookup 函数, 字节数)
+    """
+    if name == 'raw':
+        tokens = list(sorted_tokens)
+
+        def lookup(token):
+            i = bisect.bisect_left(tokens, token)
+            return i if i < len(tokens) and tokens[i] == token else None
+        return lookup, sum(len(t.encode('utf-8')) for t in tokens) + Compress.BLOCK_POINTER_BYTES * len(tokens)
+    if name == 'front_string':
+        term_string, dictionary_index = Compress.front_code_and_block(sorted_tokens, block_size)
+        return (Compress.BlockedDictionary(term_string, dictionary_index).lookup,
+                Compress.dictionary_size_in_bytes(term_string.encode('utf-8'), dictionary_index))
+    if name == 'front_bytes':
+        term_bytes, dictionary_index = Compress.front_code_and_block_bytes(sorted_tokens, block_size)
+        return (Compress.BlockedDictionary(term_bytes, dictionary_index).lookup,
+                Compress.dictionary_size_in_bytes(term_bytes, dictionary_index))
+    if name == 'dawg':
+        trie = term_trie.TermTrie.build(sorted_tokens)
+        return trie.lookup, trie.size_in_bytes()
+    if name == 'mph':
+        term_hash = PerfectHash.build(sorted_tokens)
+        return term_hash.lookup, term_hash.size_in_bytes()
+    raise ValueError(f"未知的词典格式: {name}，可选: {', '.join(DICTIONARY_FORMATS)}")
+
+
+def measure_dictionary(name, sorted_tokens, block_size, query_tokens):
+    start_time = time.perf_counter()
+    lookup, size = build_dictionary(name, sorted_tokens, block_size)
+    build_time = time.perf_counter() - start_time
+
+    latencies = []
+    for token in query_tokens:
+        start_time = time.perf_counter()
+        lookup(token)
+        latencies.append(time.perf_counter() - start_time)
+    latencies.sort()
+    return {
+        'format': name,
+        'bytes': size,
+        'bytes_per_term': size / len(sorted_tokens),
+        'build_ms': build_time * 1000,
+        'lookup_mean_us': sum(latencies) / len(latencies) * 1e6,
+        'lookup_p50_us': percentile(latencies, 0.5) * 1e6,
+        'lookup_p99_us': percentile(latencies, 0.99) * 1e6,
+    }
+
+
+def measure_codec(name, inverted_posting_lists, ordinal_lists, queries, repeat):
+    codec = None if name == 'none' else name
+    total = sum(len(ordinals) for ordinals in ordinal_lists)
+    start_time = time.perf_counter()
+    if codec is None:
+        size = sum(array('I', ordinals).itemsize * len(ordinals) for ordinals in ordinal_lists)
+    else:
+        size = sum(block_postings.BlockPostings.build(ordinals, codec).size_in_bytes() for ordinals in ordinal_lists)
+    build_time = time.perf_counter() - start_time
+
+    engine = boolean_search.BooleanSearchEngine({}, inverted_posting_lists, backend='compressed',
+                                                backend_options={'codec': codec})
+    results = [engine.search(query) for query in queries]   # 预热: 后端在这里构建并缓存 posting list
+    latencies = []
+    for query in queries:
+        for _ in range(repeat):
+            start_time = time.perf_counter()
+            engine.search(query)
+            latencies.append(time.perf_counter() - start_time)
+    latencies.sort()
+    return {
+        'codec': name,
+        'bytes': size,
+        'bytes_per_posting': size / total,
+        'build_ms': build_time * 1000,
+        'query_mean_ms': sum(latencies) / len(latencies) * 1000,
+        'query_p99_ms': percentile(latencies, 0.99) * 1000,
+    }, results
+
+
+def main_test_harness(input_path="output_data/", input_ending='.stw', block_size=4,
+                      formats=DICTIONARY_FORMATS, codecs=POSTING_CODECS, queries=STANDARD_QUERIES,
+                      n_lookups=20000, repeat=5, output="./test/compression_report.json", seed=42):
+    documents = Compress.read_documents(input_path, input_ending)
+    sorted_tokens = Compress.collect_and_sort_tokens(documents)
+    inverted_posting_lists = Compress.invert_index(documents)
+    doc_table = DocIdTable.from_posting_lists(inverted_posting_lists)
+    ordinal_lists = [doc_table.posting_ordinals(skip_list) for skip_list in inverted_posting_lists.values()]
+    n_postings = sum(len(ordinals) for ordinals in ordinal_lists)
+    positions_bytes = len(posting_codec.encode_positions(
+        [value.pos for skip_list in inverted_posting_lists.values() for value in skip_list.cursor()]))
+
+    rng = random.Random(seed)
+    lookup_tokens = [rng.choice(sorted_tokens) for _ in range(n_lookups)]
+    dictionaries = [measure_dictionary(name, sorted_tokens, block_size, lookup_tokens) for name in formats]
+
+    errors = 0
+    codec_rows = []
+    expected = None
+    for name in codecs:
+        row, results = measure_codec(name, inverted_posting_lists, ordinal_lists, queries, repeat)
+        expected = results if expected is None else expected
+        errors += sum(a != b for a, b in zip(results, expected))
+        codec_rows.append(row)
+
+    # 每个查询需要先在词典中查找它的全部词项
+    terms_per_query = sum(len([t for t in query.replace('(', ' ').replace(')', ' ').split()
+                               if t not in ('AND', 'OR', 'NOT')]) for query in queries) / len(queries)
+    combined = []
+    for d in dictionaries:
+        for c in codec_rows:
+            total = d['bytes'] + c['bytes'] + positions_bytes
+            combined.append({
+                'dictionary': d['format'],
+                'codec': c['codec'],
+                'total_bytes': total,
+                'bytes_per_posting': total / n_postings,
+                'build_ms': d['build_ms'] + c['build_ms'],
+                'query_mean_ms': c['query_mean_ms'] + terms_per_query * d['lookup_mean_us'] / 1000,
+            })
+
+    report = {
+        'corpus': {'documents': len(documents), 'terms': len(sorted_tokens), 'postings': n_postings,
+                   'raw_token_bytes': sum(len(t.encode('utf-8')) for t in sorted_tokens)},
+        'block_size': block_size,
+        'posting_block_size': block_postings.BLOCK_SIZE,
+        'queries': list(queries),
+        'positions_bytes': positions_bytes,
+        'dictionaries': dictionaries,
+        'codecs': codec_rows,
+        'combined': combined,
+    }
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+
+    filename = "./test/test_compression_report.log"
+    with open(filename, 'w', encoding='utf-8') as file:
+        STDOUT = sys.stdout
+        sys.stdout = file
+
+        corpus = report['corpus']
+        print(f"压缩效果报告 (文档 {corpus['documents']} 个, 词项 {corpus['terms']} 个, posting {n_postings} 个, "
+              f"词典块大小 k={block_size}, posting 块大小 {block_postings.BLOCK_SIZE})")
+        print(f"原始词项字节数: {corpus['raw_token_bytes']}, 位置流: {positions_bytes} 字节 (与 posting 编码无关)")
+        print("\n[1] 词典格式")
+        print("-" * 100)
+        print(f"{'格式':<14} | {'字节数':<10} | {'每词项字节':<10} | {'构建 (ms)':<10} | "
+              f"{'平均 (us)':<10} | {'p50 (us)':<10} | {'p99 (us)':<10}")
+        print("-" * 100)
+        for d in dictionaries:
+            print(f"{d['format']:<14} | {d['bytes']:<13} | {d['bytes_per_term']:<15.2f} | {d['build_ms']:<10.2f} | "
+                  f"{d['lookup_mean_us']:<10.2f} | {d['lookup_p50_us']:<10.2f} | {d['lookup_p99_us']:<10.2f}")
+        print(f"\n[2] posting 编码 (标准查询 {len(queries)} 个, 每个重复 {repeat} 次)")
+        print("-" * 100)
+        print(f"{'编码':<10} | {'字节数':<10} | {'每 posting 字节':<14} | {'构建 (ms)':<10} | "
+              f"{'查询平均 (ms)':<12} | {'查询 p99 (ms)':<12}")
+        print("-" * 100)
+        for c in codec_rows:
+            print(f"{c['codec']:<10} | {c['bytes']:<13} | {c['bytes_per_posting']:<18.2f} | {c['build_ms']:<10.2f} | "
+                  f"{c['query_mean_ms']:<16.4f} | {c['query_p99_ms']:<12.4f}")
+        print(f"\n[3] 汇总 (总字节数 = 词典 + 文档编号 + 位置流)")
+        print("-" * 100)
+        print(f"{'词典':<14} | {'编码':<10} | {'总字节数':<10} | {'每 posting 字节':<14} | "
+              f"{'构建 (ms)':<10} | {'查询平均 (ms)':<12}")
+        print("-" * 100)
+        for row in sorted(combined, key=lambda r: r['total_bytes']):
+            print(f"{row['dictionary']:<14} | {row['codec']:<10} | {row['total_bytes']:<14} | "
+                  f"{row['bytes_per_posting']:<18.2f} | {row['build_ms']:<10.2f} | {row['query_mean_ms']:<12.4f}")
+        print("-" * 100)
+        print(f"各编码的查询结果与第一种不一致: {errors}")
+
+        sys.stdout = STDOUT
+        print(f"压缩效果报告已经写入到'{output}'和'{filename}'中！")
+    assert errors == 0
+    return report
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="词典格式与 posting 编码的压缩效果报告")
+    parser.add_argument('--k', type=int, default=4, help="前端编码词典的块大小")
+    parser.add_argument('--formats', nargs='+', default=DICTIONARY_FORMATS, choices=DICTIONARY_FORMATS,
+                        help="参与比较的词典格式")
+    parser.add_argument('--codecs', nargs='+', default=POSTING_CODECS, choices=POSTING_CODECS,
+                        help="参与比较的 posting 编码，none 表示不压缩")
+    parser.add_argument('--lookups', type=int, default=20000, help="随机词项查找次数")
+    parser.add_argument('--repeat', type=int, default=5, help="每个标准查询的重复次数")
+    parser.add_argument('--output', default="./test/compression_report.json", help="JSON 结果文件")
+    return parser.parse_args(argv)
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    main_test_harness(block_size=args.k, formats=args.formats, codecs=args.codecs, n_lookups=args.lookups,
+                      repeat=args.repeat, output=args.output)
@@ -0,0 +1,70 @@
+'''
+文档区间查询测试: 把 doc_range 下推到 posting list 遍历 vs 先求完整结果再按区间过滤
+区间宽度取文档总数的 1% / 10% / 50%
+'''
+import time
+import compress_index as Compress
+import boolean_search_v2 as boolean_search
+import os, sys
+
+
+QUERIES = [
+    "book AND club",
+    "(book OR club) AND NOT chat",
+    '"last week" AND tea',
+    "(book AND club) OR (chat AND date)",
+    "time AND NOT (book OR people)",
+]
+FRACTIONS = [0.01, 0.1, 0.5]
+
+
+def filter_range(doc_ids, doc_range):
+    lo, hi = doc_range
+    return {doc_id for doc_id in doc_ids if lo <= doc_id < hi}
+
+
+def time_call(func, repeat):
+    start_time = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    return (time.perf_counter() - start_time) / repeat * 1000, result
+
+
+def main_test_harness(input_path="output_data/", input_ending='.stw', repeat=20):
+    documents = Compress.read_documents(input_path, input_ending)
+    inverted_posting_lists = Compress.invert_index(documents)
+    engines = {backend: boolean_search.BooleanSearchEngine({}, inverted_posting_lists, backend=backend)
+               for backend in ['skiplist', 'set']}
+    doc_ids = sorted(engines['set'].get_all_documents())
+
+    os.makedirs("./test", exist_ok=True)
+    filename = "./test/test_doc_range.log"
+    with open(filename, 'w', encoding='utf-8') as file:
+        STDOUT = sys.stdout
+        sys.stdout = file
+
+        print(f"文档区间查询测试 (文档数 {len(doc_ids)})")
+        for fraction in FRACTIONS:
+            # 区间取在文档ID序列的中间
+            width = max(1, int(len(doc_ids) * fraction))
+            start = (len(doc_ids) - width) // 2
+            doc_range = (doc_ids[start], doc_ids[start + width - 1] + '\0')
+
+            print(f"\n区间宽度 {fraction:.0%}: [{doc_range[0]}, {doc_range[1][:-1]}]")
+            print("-" * 100)
+            print(f"{'查询':<40} | {'后端':<8} | {'下推 (ms)':<10} | {'过滤 (ms)':<10} | {'加速比':<8} | 结果数")
+            print("-" * 100)
+            for query in QUERIES:
+                for backend, engine in engines.items():
+                    pushed_time, pushed = time_call(lambda: engine.search(query, doc_range), repeat)
+                    filtered_time, filtered = time_call(
+                        lambda: filter_range(engine.search(query), doc_range), repeat)
+                    assert pushed == filtered, (query, backend)
+                    print(f"{query[:40]:<40} | {backend:<8} | {pushed_time:<10.4f} | {filtered_time:<10.4f} | "
+                          f"{filtered_time / pushed_time:<8.2f} | {len(pushed)}")
+
+        sys.stdout = STDOUT
+        print(f"文档区间查询测试结果已经写入到'{filename}'中！")
+
+if __name__ == '__main__':
+    main_test_harness()
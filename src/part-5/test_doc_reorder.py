@@ -0,0 +1,116 @@
+'''
+文档编号重排测试
+对 doc_reorder.ORDERINGS 中的每种编号顺序:
+1. 快照中文档编号压缩后的总字节数（各 posting 编码），相对 name 顺序的变化
+2. 分块压缩 posting list (block_postings) 上一组 AND 查询的耗时与解码块数，相对 name 顺序的加速比
+3. 计算编号顺序本身的耗时
+语料分两部分: 真实语料，以及按主题合成的语料（文档名与主题无关，重排应能把同主题的文档聚到一起）
+并检查重排后的快照解码结果与原倒排表相同
+'''
+import random
+import sys, os
+import time
+import block_postings
+import compress_index as Compress
+import doc_reorder
+import index_build
+import posting_codec
+
+
+def synthetic_postings(n_docs=3000, n_topics=30, topic_terms=200, terms_per_doc=60, n_common=50, seed=42):
+    """每个文档属于一个主题，词项主要取自该主题的词表，少量取自公共词表；文档名随机，与主题无关"""
+    rng = random.Random(seed)
+    names = [str(doc_id) for doc_id in rng.sample(range(10**7, 10**8), n_docs)]
+    postings = {}
+    for name in names:
+        topic = rng.randrange(n_topics)
+        vocabulary = [f"t{topic}_{rng.randrange(topic_terms)}" for _ in range(terms_per_doc)]
+        vocabulary += [f"c{rng.randrange(n_common)}" for _ in range(terms_per_doc // 6)]
+        for pos, token in enumerate(vocabulary):
+            postings.setdefault(token, {}).setdefault(name, []).append(pos)
+    return {token: sorted(docs.items()) for token, docs in postings.items()}
+
+
+def build_queries(postings, n_queries=300, seed=42):
+    """高 df 与中等 df 词项两两组合的 AND 查询"""
+    rng = random.Random(seed)
+    by_df = sorted(postings, key=lambda token: len(postings[token]), reverse=True)
+    frequent, medium = by_df[:50], by_df[50:len(by_df) // 4]
+    return [(rng.choice(frequent), rng.choice(frequent if i % 2 else medium)) for i in range(n_queries)]
+
+
+def measure_ordering(postings, doc_names, queries, repeat=3):
+    row = {}
+    for name in posting_codec.CODECS:
+        _, encoded = posting_codec.encode_postings(postings, name, doc_names)
+        row[name] = sum(len(data) for data, _ in encoded.values())
+
+    index = {doc_id: ordinal for ordinal, doc_id in enumerate(doc_names)}
+    lists = {token: block_postings.BlockPostings.build(sorted(index[doc_id] for doc_id, _ in entries))
+             for token, entries in postings.items()}
+    stats = {}
+    best = float('inf')
+    for i in range(repeat):
+        start_time = time.perf_counter()
+        for a, b in queries:
+            block_postings.intersect(lists[a], lists[b], stats=stats if i == 0 else None)
+        best = min(best, time.perf_counter() - start_time)
+    row['and_ms'] = best * 1000
+    row['blocks'] = stats.get('blocks_decoded', 0)
+    return row
+
+
+def compare_orderings(title, postings, queries):
+    doc_terms = doc_reorder.document_terms(postings)
+    rows = {}
+    errors = 0
+    for order, func in doc_reorder.ORDERINGS.items():
+        start_time = time.perf_counter()
+        doc_names = func(doc_terms)
+        elapsed = time.perf_counter() - start_time
+        doc_names_out, encoded = posting_codec.encode_postings(postings, 'varbyte', doc_names)
+        errors += posting_codec.decode_postings(doc_names_out, encoded, 'varbyte') != postings
+        rows[order] = measure_ordering(postings, doc_names, queries)
+        rows[order]['order_ms'] = elapsed * 1000
+
+    base = rows['name']
+    print(f"\n{title} (文档 {len(doc_terms)} 个, 词项 {len(postings)} 个, "
+          f"posting {sum(len(entries) for entries in postings.values())} 个, AND 查询 {len(queries)} 个)")
+    print("-" * 110)
+    print(f"{'顺序':<10} | " + " | ".join(f"{name:<16}" for name in posting_codec.CODECS) +
+          f" | {'AND (ms)':<16} | {'解码块数':<8} | {'重排 (ms)':<10}")
+    print("-" * 110)
+    for order, row in rows.items():
+        sizes = " | ".join(f"{row[name]:<7} ({row[name] / base[name] - 1:+.1%})" for name in posting_codec.CODECS)
+        print(f"{order:<10} | {sizes} | {row['and_ms']:<7.2f} ({base['and_ms'] / row['and_ms']:.2f}x) | "
+              f"{row['blocks']:<12} | {row['order_ms']:<10.1f}")
+    best = min(rows, key=lambda order: rows[order]['varbyte'])
+    print(f"varbyte 最小的顺序: {best}，字节数 {rows[best]['varbyte'] / base['varbyte'] - 1:+.1%}，"
+          f"AND 加速 {base['and_ms'] / rows[best]['and_ms']:.2f}x，重排耗时 {rows[best]['order_ms']:.1f} ms")
+    return errors
+
+
+def main_test_harness(input_path="output_data/", input_ending='.stw'):
+    documents = Compress.read_documents(input_path, input_ending)
+    postings = index_build.skiplists_to_postings(Compress.invert_index(documents))
+    synthetic = synthetic_postings()
+
+    os.makedirs("./test", exist_ok=True)
+    filename = "./test/test_doc_reorder.log"
+    with open(filename, 'w', encoding='utf-8') as file:
+        STDOUT = sys.stdout
+        sys.stdout = file
+
+        print("文档编号重排测试: 压缩后字节数 (相对 name 顺序)，以及分块 posting list 上 AND 查询的耗时 (相对 name 的加速比)")
+        errors = compare_orderings("[1] 真实语料", postings, build_queries(postings))
+        errors += compare_orderings("[2] 按主题合成的语料", synthetic, build_queries(synthetic))
+        print("-" * 110)
+        print(f"重排后快照解码结果不一致: {errors}")
+
+        sys.stdout = STDOUT
+        print(f"文档编号重排测试结果已经写入到'{filename}'中！")
+    assert errors == 0
+
+
+if __name__ == '__main__':
+    main_test_harness()
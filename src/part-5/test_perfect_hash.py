@@ -0,0 +1,83 @@
+'''
+最小完美哈希测试
+1. 正确性: 词表中每个词项都映射到自己的序号；统计词表之外的词项被指纹误判的比例
+2. 空间: 每词项字节数，对比以字符串为键的 dict {token: term_id}（含键字符串）和前端编码词典
+3. 延迟: 精确查找与 dict、BlockedDictionary.lookup 对比
+'''
+import random
+import sys, os
+import time
+import compress_index as Compress
+from perfect_hash import PerfectHash
+
+
+def dict_size_in_bytes(mapping):
+    """dict 本身 + 键字符串 + 值（小整数有缓存，按 int 对象计）"""
+    return sys.getsizeof(mapping) + sum(sys.getsizeof(k) + sys.getsizeof(v) for k, v in mapping.items())
+
+
+def time_per_lookup(func, tokens, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        for token in tokens:
+            func(token)
+        best = min(best, time.perf_counter() - start_time)
+    return best / len(tokens)
+
+
+def main_test_harness(input_path="output_data/", input_ending='.stw', block_size=4, n_unknown=100000):
+    documents = Compress.read_documents(input_path, input_ending)
+    sorted_tokens = Compress.collect_and_sort_tokens(documents)
+
+    start_time = time.perf_counter()
+    term_hash = PerfectHash.build(sorted_tokens)
+    build_time = time.perf_counter() - start_time
+
+    errors = sum(term_hash.lookup(token) != term_id for term_id, token in enumerate(sorted_tokens))
+    rng = random.Random(42)
+    vocabulary = set(sorted_tokens)
+    unknown = [token for token in (f"{rng.choice(sorted_tokens)}_{i}" for i in range(n_unknown))
+               if token not in vocabulary]
+    false_positives = sum(term_hash.lookup(token) is not None for token in unknown)
+
+    term_ids = {token: term_id for term_id, token in enumerate(sorted_tokens)}
+    term_bytes, dictionary_index = Compress.front_code_and_block_bytes(sorted_tokens, block_size)
+    blocked_dictionary = Compress.BlockedDictionary(term_bytes, dictionary_index)
+    queries = [rng.choice(sorted_tokens) for _ in range(20000)]
+    timings = [
+        ("PerfectHash.lookup", term_hash.lookup),
+        ("dict.get", term_ids.get),
+        (f"BlockedDictionary.lookup (k={block_size})", blocked_dictionary.lookup),
+    ]
+
+    os.makedirs("./test", exist_ok=True)
+    filename = "./test/test_perfect_hash.log"
+    with open(filename, 'w', encoding='utf-8') as file:
+        STDOUT = sys.stdout
+        sys.stdout = file
+
+        n = len(sorted_tokens)
+        print(f"最小完美哈希测试 (词项数 {n}, 每桶平均 {n / len(term_hash.displacements):.2f} 个词项, "
+              f"指纹 {term_hash.fingerprint_bits} 位)")
+        print("-" * 80)
+        print(f"构建耗时: {build_time * 1000:.2f} ms, 映射错误: {errors}")
+        print(f"未知词项 {len(unknown)} 个, 被误判为词表中的词项: {false_positives}")
+        print("-" * 80)
+        print(f"{'结构':<36} | {'字节数':<10} | {'每词项字节':<10}")
+        for name, size in [("PerfectHash", term_hash.size_in_bytes()),
+                           ("dict {token: term_id}", dict_size_in_bytes(term_ids)),
+                           (f"前端编码词典 (k={block_size})",
+                            Compress.dictionary_size_in_bytes(term_bytes, dictionary_index))]:
+            print(f"{name:<36} | {size:<13} | {size / n:<10.2f}")
+        print("-" * 80)
+        for name, func in timings:
+            print(f"{name:<36} | {time_per_lookup(func, queries) * 1e6:.3f} us/次")
+
+        sys.stdout = STDOUT
+        print(f"最小完美哈希测试结果已经写入到'{filename}'中！")
+    assert errors == 0
+
+
+if __name__ == '__main__':
+    main_test_harness()
@@ -0,0 +1,146 @@
+'''
+位置流 (PositionStore) 测试
+同一份倒排表分别保留内联的 Value.pos 和经 pack_positions 移入压缩位置流，对比:
+1. 正确性: 短语查询、邻近查询、TF-IDF 使用的 tf 与内联位置时相同
+2. 空间: 内联的位置列表 (list 对象 + 小整数缓存之外的 int 对象) 与位置流的字节数
+3. 布尔查询不解码任何位置；短语 / 邻近查询只解码参与验证的 posting
+4. 从索引快照加载时直接由位置流构建 PackedValue (load_snapshot(position_store=...))，
+   结果与内联位置相同，并与先还原位置列表再 pack_positions 的加载方式对比耗时
+'''
+import random
+import shutil
+import sys, os
+import tempfile
+import time
+import compress_index as Compress
+import boolean_search_v2 as boolean_search
+import index_build
+import position_store
+
+
+PHRASES = [["last", "week"], ["food", "water"], ["around", "world"], ["information", "retrieval"]]
+BOOLEAN_QUERIES = [
+    "(book AND club) OR (chat AND date)",
+    "(book OR (chat AND date)) AND (club OR (chat AND date))",
+    "system AND NOT (book OR chat)",
+]
+
+
+def inline_size_in_bytes(inverted_posting_lists):
+    total = 0
+    for skip_list in inverted_posting_lists.values():
+        for value in skip_list.range(None, None):
+            total += sys.getsizeof(value.pos) + sum(sys.getsizeof(p) for p in value.pos if p > 256)
+    return total
+
+
+def timed(func):
+    start_time = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start_time
+
+
+def check_snapshot_load(input_path, input_ending, inline_lists):
+    """
+    :return: (不一致的词项数, 还原位置列表再打包的耗时, 直接由位置流加载的耗时, 位置流字节数)
+    """
+    checkpoint_dir = tempfile.mkdtemp(prefix="position_checkpoint_")
+    try:
+        index_build.build_index(input_path, input_ending, block_size=4, checkpoint_dir=checkpoint_dir)
+        path = os.path.join(checkpoint_dir, index_build.SNAPSHOT_NAME)
+
+        def load_then_pack():
+            inverted_posting_lists = index_build.load_snapshot(path)[3]
+            position_store.pack_positions(inverted_posting_lists)
+
+        _, repack_time = timed(load_then_pack)
+        store = position_store.PositionStore()
+        loaded, load_time = timed(lambda: index_build.load_snapshot(path, store)[3])
+    finally:
+        shutil.rmtree(checkpoint_dir, ignore_errors=True)
+
+    errors = 0
+    for token, skip_list in inline_lists.items():
+        expected = [(value.id, value.pos) for value in skip_list.range(None, None)]
+        values = list(loaded[token].range(None, None))
+        errors += not all(isinstance(value, position_store.PackedValue) for value in values) or \
+            expected != [(value.id, value.pos) for value in values]
+    errors += len(loaded) != len(inline_lists)
+    return errors, repack_time, load_time, store.size_in_bytes()
+
+
+def main_test_harness(input_path="output_data/", input_ending='.stw', n_random_phrases=200):
+    documents = Compress.read_documents(input_path, input_ending)
+    inline_lists = Compress.invert_index(documents)
+    packed_lists = Compress.invert_index(documents)
+    inline_bytes = inline_size_in_bytes(inline_lists)
+    store, pack_time = timed(lambda: position_store.pack_positions(packed_lists))
+
+    # 随机抽取语料中相邻的词作为额外的短语，保证有命中
+    rng = random.Random(42)
+    phrases = list(PHRASES)
+    doc_ids = sorted(documents)
+    for _ in range(n_random_phrases):
+        token_at = {p: token for token, pos in documents[rng.choice(doc_ids)].items() for p in pos}
+        start = rng.choice(sorted(token_at))
+        phrase = [token_at.get(start + i) for i in range(rng.choice((2, 3)))]
+        if None not in phrase:
+            phrases.append(phrase)
+
+    inline_engine = boolean_search.BooleanSearchEngine({}, inline_lists)
+    packed_engine = boolean_search.BooleanSearchEngine({}, packed_lists)
+
+    errors = 0
+    tf_errors = sum(a.tf != b.tf for token in inline_lists
+                    for a, b in zip(inline_lists[token].range(None, None), packed_lists[token].range(None, None)))
+
+    decodes = store.decodes
+    for query in BOOLEAN_QUERIES:
+        errors += inline_engine.search(query) != packed_engine.search(query)
+    boolean_decodes = store.decodes - decodes
+
+    decodes = store.decodes
+    inline_time = packed_time = 0.0
+    for phrase in phrases:
+        expected, t1 = timed(lambda: inline_engine.phrase_query(phrase))
+        result, t2 = timed(lambda: packed_engine.phrase_query(phrase))
+        inline_time += t1
+        packed_time += t2
+        errors += expected != result
+    for term1, term2 in PHRASES:
+        errors += inline_engine.positional_intersect(term1, term2, k=3) != \
+            packed_engine.positional_intersect(term1, term2, k=3)
+    phrase_decodes = store.decodes - decodes
+
+    snapshot_errors, repack_time, load_time, snapshot_bytes = check_snapshot_load(input_path, input_ending, inline_lists)
+    errors += snapshot_errors
+
+    os.makedirs("./test", exist_ok=True)
+    filename = "./test/test_position_store.log"
+    with open(filename, 'w', encoding='utf-8') as file:
+        STDOUT = sys.stdout
+        sys.stdout = file
+
+        print(f"位置流测试 (词项 {len(inline_lists)} 个, 短语查询 {len(phrases)} 个)")
+        print("-" * 80)
+        print(f"内联位置列表: {inline_bytes} 字节")
+        print(f"位置流:       {store.size_in_bytes()} 字节 ({store.size_in_bytes() / inline_bytes:.1%}), "
+              f"打包耗时 {pack_time * 1000:.2f} ms")
+        print("-" * 80)
+        print(f"布尔查询 {len(BOOLEAN_QUERIES)} 个: 解码位置 {boolean_decodes} 次")
+        print(f"短语 / 邻近查询: 解码位置 {phrase_decodes} 次")
+        print(f"短语查询总耗时: 内联 {inline_time * 1000:.2f} ms, 位置流 {packed_time * 1000:.2f} ms")
+        print("-" * 80)
+        print(f"快照加载: 还原位置列表后 pack_positions {repack_time * 1000:.2f} ms, "
+              f"直接由位置流构建 {load_time * 1000:.2f} ms (位置流 {snapshot_bytes} 字节)，"
+              f"不一致的词项: {snapshot_errors}")
+        print("-" * 80)
+        print(f"查询结果不一致: {errors}, tf 不一致: {tf_errors}")
+
+        sys.stdout = STDOUT
+        print(f"位置流测试结果已经写入到'{filename}'中！")
+    assert errors == 0 and tf_errors == 0 and boolean_decodes == 0
+
+
+if __name__ == '__main__':
+    main_test_harness()
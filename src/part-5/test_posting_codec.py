@@ -0,0 +1,116 @@
+'''
+Posting 文档编号压缩测试
+在语料的倒排表上，对 posting_codec.CODECS 中的每种编码 (varbyte / Elias gamma / Elias delta / Golomb-Rice ...)
+比较压缩率与编码、解码速度，用于在空间和延迟之间选择 build_index 的 codec:
+1. 正确性: 每个 posting list 编码后解码与原编号相同
+2. 压缩后大小: 总字节数、每个 posting 的位数，对比未压缩的 32 位整数数组
+3. 编码 / 解码吞吐 (百万文档编号 / 秒)
+4. 长 posting list (合成，默认 2×10^5 个文档编号，不同密度) 的解码吞吐；pfor 另外给出解码为 NumPy 数组的吞吐
+以及索引快照 (pickle) 中不压缩与压缩文档编号的大小对比
+'''
+import random
+import pickle
+import sys, os
+import time
+import compress_index as Compress
+import index_build
+import posting_codec
+from doc_table import DocIdTable
+
+
+def best_of(func, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start_time)
+    return best
+
+
+def measure_codec(codec, ordinal_lists, repeat=3):
+    encoded = [codec.encode(ordinals) for ordinals in ordinal_lists]
+    errors = sum(codec.decode(data) != ordinals for data, ordinals in zip(encoded, ordinal_lists))
+    total = sum(len(ordinals) for ordinals in ordinal_lists)
+    encode_time = best_of(lambda: [codec.encode(ordinals) for ordinals in ordinal_lists], repeat)
+    decode_time = best_of(lambda: [codec.decode(data) for data in encoded], repeat)
+    size = sum(len(data) for data in encoded)
+    return {
+        'bytes': size,
+        'bits_per_posting': size * 8 / total,
+        'encode_mps': total / encode_time / 1e6,
+        'decode_mps': total / decode_time / 1e6,
+        'errors': errors,
+    }
+
+
+def measure_long_lists(length=10**6, densities=(0.5, 0.1, 0.01), repeat=3, seed=42):
+    """
+    :return: {密度: {编码: (位/posting, 解码 M/s)}}
+    """
+    rng = random.Random(seed)
+    results = {}
+    for density in densities:
+        doc_ids = sorted(rng.sample(range(int(length / density)), length))
+        row = {}
+        for name, codec in posting_codec.CODECS.items():
+            data = codec.encode(doc_ids)
+            row[name] = (len(data) * 8 / length, length / best_of(lambda: codec.decode(data), repeat) / 1e6)
+        if posting_codec.np is not None:
+            codec = posting_codec.CODECS['pfor']
+            data = codec.encode(doc_ids)
+            row['pfor (NumPy 数组)'] = (len(data) * 8 / length,
+                                      length / best_of(lambda: codec.decode_array(data), repeat) / 1e6)
+        results[density] = row
+    return results
+
+
+def main_test_harness(input_path="output_data/", input_ending='.stw', repeat=3, long_list_length=2 * 10**5):
+    documents = Compress.read_documents(input_path, input_ending)
+    inverted_posting_lists = Compress.invert_index(documents)
+    doc_table = DocIdTable.from_posting_lists(inverted_posting_lists)
+    ordinal_lists = [doc_table.posting_ordinals(skip_list) for skip_list in inverted_posting_lists.values()]
+    total = sum(len(ordinals) for ordinals in ordinal_lists)
+
+    results = {name: measure_codec(codec, ordinal_lists, repeat) for name, codec in posting_codec.CODECS.items()}
+
+    long_lists = measure_long_lists(long_list_length, repeat=repeat)
+
+    postings = index_build.skiplists_to_postings(inverted_posting_lists)
+    raw_snapshot = len(pickle.dumps(postings, protocol=pickle.HIGHEST_PROTOCOL))
+    snapshot_sizes = {
+        name: len(pickle.dumps(posting_codec.encode_postings(postings, name), protocol=pickle.HIGHEST_PROTOCOL))
+        for name in posting_codec.CODECS
+    }
+
+    os.makedirs("./test", exist_ok=True)
+    filename = "./test/test_posting_codec.log"
+    with open(filename, 'w', encoding='utf-8') as file:
+        STDOUT = sys.stdout
+        sys.stdout = file
+
+        print(f"Posting 文档编号压缩测试 (文档 {len(doc_table)} 个, 词项 {len(ordinal_lists)} 个, "
+              f"posting {total} 个, 取 {repeat} 次中的最短时间)")
+        print("-" * 90)
+        print(f"{'编码':<10} | {'字节数':<10} | {'位/posting':<10} | {'编码 (M/s)':<10} | {'解码 (M/s)':<10} | {'错误':<6}")
+        print("-" * 90)
+        print(f"{'uint32':<10} | {total * 4:<13} | {32.0:<10.2f} | {'-':<10} | {'-':<10} | {'-':<6}")
+        for name, r in results.items():
+            print(f"{name:<10} | {r['bytes']:<13} | {r['bits_per_posting']:<10.2f} | "
+                  f"{r['encode_mps']:<10.2f} | {r['decode_mps']:<10.2f} | {r['errors']:<6}")
+        print("-" * 90)
+        print(f"长 posting list ({long_list_length} 个文档编号) 的解码吞吐 (M/s) 与位/posting:")
+        for density, row in long_lists.items():
+            print(f"  密度 {density:<5}: " + ", ".join(f"{name} {mps:.2f} ({bits:.2f} 位)"
+                                                for name, (bits, mps) in row.items()))
+        print("-" * 90)
+        print(f"索引快照中的倒排表 (pickle): 不压缩 {raw_snapshot} 字节")
+        for name, size in snapshot_sizes.items():
+            print(f"  {name:<10}: {size} 字节 ({size / raw_snapshot:.1%})")
+
+        sys.stdout = STDOUT
+        print(f"Posting 压缩测试结果已经写入到'{filename}'中！")
+    assert all(r['errors'] == 0 for r in results.values())
+
+
+if __name__ == '__main__':
+    main_test_harness()
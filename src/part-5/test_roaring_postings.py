@@ -0,0 +1,100 @@
+'''
+自适应 posting list (Roaring 压缩位图 / 有序数组) 的空间与运算速度测试
+词项分布沿用 part5-new 中 create_test_dataset_with_varied_sizes 的配置，按文档数等比放大
+'''
+import time
+import random
+import sys, os
+import roaring
+
+
+# (token, 出现在多少比例的文档中)，与 create_test_dataset_with_varied_sizes 一致 (原为 100 个文档)
+TOKEN_CONFIGS = [
+    ("very_rare", 0.02),
+    ("rare", 0.05),
+    ("uncommon", 0.15),
+    ("common", 0.40),
+    ("very_common", 0.70),
+    ("frequent", 0.85),
+    ("alpha", 0.10),
+    ("beta", 0.25),
+    ("gamma", 0.50),
+    ("delta", 0.80),
+]
+
+
+def create_dataset(n_docs, seed=42):
+    """{token: 有序的文档编号列表}"""
+    rng = random.Random(seed)
+    return {token: sorted(rng.sample(range(n_docs), int(n_docs * ratio)))
+            for token, ratio in TOKEN_CONFIGS}
+
+
+def python_set_bytes(values):
+    """Python set 的内存: 哈希表本身 + 每个 int 对象"""
+    s = set(values)
+    return sys.getsizeof(s) + sum(sys.getsizeof(v) for v in s)
+
+
+def describe(postings):
+    if isinstance(postings, roaring.RoaringBitmap):
+        stats = postings.container_stats()
+        return "bitmap " + "/".join(f"{k}:{v}" for k, v in stats.items() if v)
+    return "sorted array"
+
+
+def time_op(op, a, b, repeat):
+    start_time = time.perf_counter()
+    for _ in range(repeat):
+        result = op(a, b)
+    return (time.perf_counter() - start_time) / repeat * 1000, result
+
+
+def main_test_harness(n_docs=1000000, repeat=5):
+    dataset = create_dataset(n_docs)
+    adaptive = {token: roaring.make_postings(values, n_docs) for token, values in dataset.items()}
+    sets = {token: set(values) for token, values in dataset.items()}
+
+    os.makedirs("./test", exist_ok=True)
+    filename = "./test/test_roaring_postings.log"
+    with open(filename, 'w', encoding='utf-8') as file:
+        STDOUT = sys.stdout
+        sys.stdout = file
+
+        print(f"自适应 posting list 测试 (文档数 N={n_docs})")
+        print("-" * 100)
+        print(f"{'词项':<12} | {'df':<8} | {'表示':<28} | {'自适应 (KB)':<12} | {'Python set (KB)':<15}")
+        print("-" * 100)
+        total_adaptive = total_set = 0
+        for token, values in dataset.items():
+            adaptive_bytes = adaptive[token].size_in_bytes()
+            set_bytes = python_set_bytes(values)
+            total_adaptive += adaptive_bytes
+            total_set += set_bytes
+            print(f"{token:<12} | {len(values):<8} | {describe(adaptive[token]):<28} | "
+                  f"{adaptive_bytes / 1024:<12.1f} | {set_bytes / 1024:<15.1f}")
+        print("-" * 100)
+        print(f"{'合计':<12} | {'':<8} | {'':<28} | {total_adaptive / 1024:<12.1f} | {total_set / 1024:<15.1f}")
+
+        pairs = [("frequent", "delta"), ("frequent", "very_common"), ("frequent", "very_rare"),
+                 ("gamma", "alpha"), ("rare", "very_rare")]
+        ops = [
+            ("AND", roaring.postings_and, lambda a, b: a & b),
+            ("OR", roaring.postings_or, lambda a, b: a | b),
+            ("ANDNOT", roaring.postings_andnot, lambda a, b: a - b),
+        ]
+        print(f"\n{'运算':<36} | {'自适应 (ms)':<12} | {'set (ms)':<12} | {'加速比':<8}")
+        print("-" * 100)
+        for t1, t2 in pairs:
+            for op_name, adaptive_op, set_op in ops:
+                adaptive_time, result = time_op(adaptive_op, adaptive[t1], adaptive[t2], repeat)
+                set_time, expected = time_op(set_op, sets[t1], sets[t2], repeat)
+                assert list(result) == sorted(expected)
+                label = f"{t1} {op_name} {t2}"
+                print(f"{label:<36} | {adaptive_time:<12.4f} | {set_time:<12.4f} | {set_time / adaptive_time:<8.2f}x")
+
+        sys.stdout = STDOUT
+        print(f"自适应 posting list 测试结果已经写入到'{filename}'中！")
+
+if __name__ == '__main__':
+    main_test_harness()
@@ -0,0 +1,128 @@
+'''
+分片检索测试: ShardedSearchEngine 与单进程 BooleanSearchEngine / VectorSpaceModel 的结果对比
+1. 布尔查询（含 doc_range）的结果必须与单进程引擎相同
+2. shards_in_range 必须包含所有与区间内文档所在的分片（区间端点取在分片边界上时也一样）
+3. 排名查询的 Top-K 得分与单进程相同
+4. 工作进程退出后，查询抛出带分片编号与退出码的 RuntimeError，而不是一直阻塞
+分别检查内存中切分 (ShardedSearchEngine(inverted_posting_lists)) 与从检查点分区文件加载 (from_checkpoint) 两种方式
+'''
+import shutil
+import tempfile
+import compress_index as Compress
+import boolean_search_v2 as boolean_search
+import index_build
+import tfidf_vector_space
+from sharded_search import ShardedSearchEngine
+import os, sys
+
+
+QUERIES = [
+    "book AND club",
+    "(book OR club) AND NOT chat",
+    "(book AND club) OR (chat AND date)",
+    '"last week" AND tea',
+    "time AND NOT (book OR people)",
+]
+RANKED_QUERIES = [["book", "club"], ["last", "week"], ["information", "retrieval"], ["time", "people", "tea"]]
+
+
+def query_ranges(doc_ids, boundaries):
+    """一般区间，以及端点恰好落在分片边界上的区间"""
+    n = len(doc_ids)
+    ranges = [(None, None), (doc_ids[0], None), (None, doc_ids[n // 2]),
+              (doc_ids[n // 3], doc_ids[2 * n // 3]), (doc_ids[n // 2], doc_ids[n // 2] + '\0')]
+    for boundary in boundaries:
+        ranges += [(boundary, None), (None, boundary), (boundary, boundary + '\0')]
+    for a, b in zip(boundaries, boundaries[1:]):
+        ranges.append((a, b))
+    return ranges
+
+
+def check_engine(title, engine, single_engine, single_vsm, doc_ids):
+    errors = 0
+    print(f"\n{title}: {engine.num_shards} 个分片，边界 {engine.boundaries}")
+    print("-" * 100)
+    print(f"{'查询':<40} | {'区间':<30} | {'结果数':<8} | 状态")
+    print("-" * 100)
+    for doc_range in query_ranges(doc_ids, engine.boundaries):
+        lo, hi = doc_range
+        in_range = [doc_id for doc_id in doc_ids if (lo is None or doc_id >= lo) and (hi is None or doc_id < hi)]
+        expected_shards = {engine.shard_of(doc_id) for doc_id in in_range}
+        missing = expected_shards - set(engine.shards_in_range(doc_range))
+        if missing:
+            errors += 1
+            print(f"shards_in_range{doc_range} 缺少分片 {sorted(missing)}")
+
+        for query in QUERIES:
+            single = single_engine.search(query, None if doc_range == (None, None) else doc_range)
+            sharded = engine.search(query, None if doc_range == (None, None) else doc_range)
+            ok = sharded == single
+            errors += not ok
+            print(f"{query[:40]:<40} | {str(doc_range)[:30]:<30} | {len(sharded):<8} | {'一致' if ok else '不一致'}")
+
+    print(f"\n{'排名查询':<40} | Top-10 得分")
+    for query_terms in RANKED_QUERIES:
+        sharded = engine.search_ranked(query_terms, top_k=10)
+        single = single_vsm.search(query_terms, top_k=10)
+        ok = [round(s, 6) for _, s in sharded] == [round(s, 6) for _, s in single]
+        errors += not ok
+        print(f"{' '.join(query_terms):<40} | {'一致' if ok else '不一致'}")
+
+    ok = engine.search_many(QUERIES) == [single_engine.search(query) for query in QUERIES]
+    errors += not ok
+    print(f"{'search_many':<40} | {'一致' if ok else '不一致'}")
+    return errors
+
+
+def check_dead_worker(inverted_posting_lists, num_shards):
+    """杀死一个分片的工作进程后再查询"""
+    with ShardedSearchEngine(inverted_posting_lists, num_shards) as engine:
+        shard_id = engine.num_shards - 1
+        engine.processes[shard_id].kill()
+        engine.processes[shard_id].join()
+        try:
+            engine.search(QUERIES[0])
+        except RuntimeError as error:
+            ok = f"分片 {shard_id}" in str(error)
+            print(f"\n工作进程退出后查询: {error} | {'正确' if ok else '错误'}")
+            return not ok
+    print("\n工作进程退出后查询没有抛出异常 | 错误")
+    return 1
+
+
+def main_test_harness(input_path="output_data/", input_ending='.stw', num_shards=4):
+    documents = Compress.read_documents(input_path, input_ending)
+    inverted_posting_lists = Compress.invert_index(documents)
+    single_engine = boolean_search.BooleanSearchEngine({}, inverted_posting_lists)
+    single_vsm = tfidf_vector_space.VectorSpaceModel(inverted_posting_lists)
+    doc_ids = sorted(documents)
+
+    checkpoint_dir = tempfile.mkdtemp(prefix="sharded_checkpoint_")
+    os.makedirs("./test", exist_ok=True)
+    filename = "./test/test_sharded_search.log"
+    with open(filename, 'w', encoding='utf-8') as file:
+        STDOUT = sys.stdout
+        sys.stdout = file
+
+        print(f"分片检索测试 (文档数 {len(doc_ids)})")
+        with ShardedSearchEngine(inverted_posting_lists, num_shards) as engine:
+            errors = check_engine("[1] 内存中切分", engine, single_engine, single_vsm, doc_ids)
+        errors += check_dead_worker(inverted_posting_lists, num_shards)
+
+        try:
+            index_build.build_index(input_path, input_ending, block_size=4, checkpoint_dir=checkpoint_dir)
+            with ShardedSearchEngine.from_checkpoint(checkpoint_dir, num_shards) as engine:
+                errors += check_engine("[2] 从检查点分区文件加载", engine, single_engine, single_vsm, doc_ids)
+        finally:
+            shutil.rmtree(checkpoint_dir, ignore_errors=True)
+
+        print("-" * 100)
+        print(f"不一致: {errors}")
+
+        sys.stdout = STDOUT
+        print(f"分片检索测试结果已经写入到'{filename}'中！")
+    assert errors == 0
+
+
+if __name__ == '__main__':
+    main_test_harness()
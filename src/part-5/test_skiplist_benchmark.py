@@ -0,0 +1,249 @@
+'''
+SkipList 综合性能基准
+覆盖: 逐个插入、有序批量合并 (merge_sorted)、批量构建、点查询、顺序扫描、skip_to、两两求交、内存占用
+参数: p × max_level × N (N 可到 10^7)
+结果写入 JSON，可与保存的基线对比，任一指标变慢超过阈值时以非零状态退出
+
+用法:
+    python test_skiplist_benchmark.py                                   # 默认参数，写入 ./test/skiplist_benchmark.json
+    python test_skiplist_benchmark.py --save-baseline baseline.json     # 同时保存为基线
+    python test_skiplist_benchmark.py --baseline baseline.json --threshold 0.2
+    python test_skiplist_benchmark.py --sizes 10000000 --p 0.5 --max-level 16
+'''
+import argparse
+import json
+import platform
+import random
+import sys, os
+import time
+import tracemalloc
+import skiplist
+
+
+DEFAULT_SIZES = [10**4, 10**5, 10**6]
+DEFAULT_P = [0.25, 0.5, 0.75]
+DEFAULT_MAX_LEVELS = [8, 16]
+SAMPLE_SIZE = 10000          # 插入 / 点查询 / skip_to 的操作次数
+MEMORY_LIMIT = 10**6         # tracemalloc 会显著拖慢构建，超过该规模时按比例从较小的样本估算内存
+THRESHOLD = 0.2              # 相对基线变慢 20% 以上视为回退
+
+# 各指标的单位；所有指标都是越小越好
+METRICS = {
+    'bulk_build_s': '秒',
+    'insert_us': '微秒/次',
+    'merge_us': '微秒/元素',
+    'search_us': '微秒/次',
+    'scan_ns': '纳秒/元素',
+    'skip_to_us': '微秒/次',
+    'intersect_dense_ms': '毫秒',
+    'intersect_sparse_ms': '毫秒',
+    'bytes_per_element': '字节',
+}
+
+
+def best_of(func, repeat, setup=None):
+    """
+    重复执行取最短时间，降低噪声
+    setup: 可选，每次执行前调用（不计时），返回值作为 func 的参数；会修改数据的操作用它准备新的副本
+    """
+    best = float('inf')
+    for _ in range(repeat):
+        if setup is None:
+            start_time = time.perf_counter()
+            func()
+        else:
+            arg = setup()
+            start_time = time.perf_counter()
+            func(arg)
+        best = min(best, time.perf_counter() - start_time)
+    return best
+
+
+def make_values(doc_ids):
+    return [skiplist.Value(doc_id, [0]) for doc_id in doc_ids]
+
+
+def build(doc_ids, p, max_level):
+    return skiplist.SkipList.from_sorted(make_values(doc_ids), max_level=max_level, p=p, stride=None)
+
+
+def measure_memory(n, p, max_level):
+    """构建过程中分配的字节数 / 元素数（包括 Node、forward 数组和 Value）"""
+    sample = min(n, MEMORY_LIMIT)
+    tracemalloc.start()
+    sl = build(range(0, 2 * sample, 2), p, max_level)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del sl
+    return current / sample
+
+
+def scan(sl):
+    count = 0
+    current = sl.header.forward[0]
+    while current:
+        count += 1
+        current = current.forward[0]
+    return count
+
+
+def skip_to_all(sl, targets):
+    cursor = sl.cursor()
+    for target in targets:
+        if cursor.skip_to(target) is None:
+            break
+
+
+def run_config(n, p, max_level, repeat, seed=42):
+    """
+    单组参数的全部测试
+    主列表的 doc_id 为 0, 2, ..., 2n-2；查询在 [0, 2n) 中随机取值，约一半命中
+    """
+    rng = random.Random(seed)
+    doc_ids = range(0, 2 * n, 2)
+    samples = min(SAMPLE_SIZE, n)
+    result = {}
+
+    values = make_values(doc_ids)
+    result['bulk_build_s'] = best_of(
+        lambda: skiplist.SkipList.from_sorted(values, max_level=max_level, p=p, stride=None), repeat)
+    del values
+    sl = build(doc_ids, p, max_level)
+
+    queries = [rng.randrange(2 * n) for _ in range(samples)]
+    result['search_us'] = best_of(lambda: [sl.search_docid(q) for q in queries], repeat) / samples * 1e6
+
+    result['scan_ns'] = best_of(lambda: scan(sl), repeat) / n * 1e9
+
+    targets = sorted(queries)
+    result['skip_to_us'] = best_of(lambda: skip_to_all(sl, targets), repeat) / samples * 1e6
+
+    # 求交: 与一半规模的稠密列表、1% 规模的稀疏列表
+    dense = build(sorted(rng.sample(range(2 * n), max(1, n // 2))), p, max_level)
+    sparse = build(sorted(rng.sample(range(2 * n), max(1, n // 100))), p, max_level)
+    result['intersect_dense_ms'] = best_of(lambda: skiplist.intersect(sl, dense), repeat) * 1e3
+    result['intersect_sparse_ms'] = best_of(lambda: skiplist.intersect(sl, sparse), repeat) * 1e3
+    del dense, sparse
+
+    # 插入奇数 doc_id（一定是新元素）；会改变列表，每次都在主列表的新副本上进行
+    inserts = make_values(rng.randrange(n) * 2 + 1 for _ in range(samples))
+    batch = make_values(sorted({value.id for value in inserts}))
+    result['merge_us'] = best_of(lambda target: target.merge_sorted(batch), repeat, setup=sl.copy) / len(batch) * 1e6
+    result['insert_us'] = best_of(lambda target: [target.insert(value) for value in inserts], repeat,
+                                  setup=sl.copy) / samples * 1e6
+    del sl
+
+    result['bytes_per_element'] = measure_memory(n, p, max_level)
+    return result
+
+
+def config_key(n, p, max_level):
+    return f"N={n},p={p},max_level={max_level}"
+
+
+def run_suite(sizes, p_values, max_levels, repeat):
+    results = {}
+    for n in sizes:
+        for p in p_values:
+            for max_level in max_levels:
+                key = config_key(n, p, max_level)
+                print(f"[benchmark] {key}", file=sys.stderr)
+                results[key] = run_config(n, p, max_level, repeat)
+    return results
+
+
+def compare_with_baseline(results, baseline, threshold=THRESHOLD):
+    """
+    与基线逐项比较
+    :return: 回退列表 [(配置, 指标, 基线值, 当前值, 变化比例)]
+    """
+    regressions = []
+    for key, metrics in results.items():
+        base_metrics = baseline.get(key)
+        if base_metrics is None:
+            continue
+        for metric, value in metrics.items():
+            base = base_metrics.get(metric)
+            if not base:
+                continue
+            change = value / base - 1
+            if change > threshold:
+                regressions.append((key, metric, base, value, change))
+    return regressions
+
+
+def print_results(results):
+    header = f"{'配置':<32} | " + " | ".join(f"{m:<19}" for m in METRICS)
+    print(header)
+    print("-" * len(header))
+    for key, metrics in results.items():
+        print(f"{key:<32} | " + " | ".join(f"{metrics[m]:<19.4f}" for m in METRICS))
+    print("单位: " + ", ".join(f"{m}={unit}" for m, unit in METRICS.items()))
+
+
+def main_test_harness(sizes=DEFAULT_SIZES, p_values=DEFAULT_P, max_levels=DEFAULT_MAX_LEVELS, repeat=3,
+                      output="./test/skiplist_benchmark.json", baseline=None, save_baseline=None,
+                      threshold=THRESHOLD):
+    """
+    :return: 回退列表，为空表示没有超过阈值的回退
+    """
+    results = run_suite(sizes, p_values, max_levels, repeat)
+    report = {
+        'meta': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'time': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'repeat': repeat,
+            'sample_size': SAMPLE_SIZE,
+        },
+        'results': results,
+    }
+
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    if save_baseline:
+        with open(save_baseline, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+
+    regressions = []
+    filename = "./test/test_skiplist_benchmark.log"
+    with open(filename, 'w', encoding='utf-8') as file:
+        STDOUT = sys.stdout
+        sys.stdout = file
+
+        print(f"SkipList 综合性能基准 (Python {report['meta']['python']}, 取 {repeat} 次中的最短时间)")
+        print_results(results)
+        if baseline:
+            with open(baseline, 'r', encoding='utf-8') as f:
+                regressions = compare_with_baseline(results, json.load(f)['results'], threshold)
+            print(f"\n与基线 '{baseline}' 对比 (阈值 +{threshold:.0%}): "
+                  f"{'无回退' if not regressions else f'{len(regressions)} 项回退'}")
+            for key, metric, base, value, change in regressions:
+                print(f"  {key:<32} {metric:<20} {base:.4f} -> {value:.4f} ({change:+.1%})")
+
+        sys.stdout = STDOUT
+        print(f"SkipList 基准结果已经写入到'{output}'和'{filename}'中！")
+    for key, metric, base, value, change in regressions:
+        print(f"回退: {key} {metric} {base:.4f} -> {value:.4f} ({change:+.1%})")
+    return regressions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="SkipList 综合性能基准")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help="元素数量 N")
+    parser.add_argument('--p', type=float, nargs='+', default=DEFAULT_P, help="晋升概率 p")
+    parser.add_argument('--max-level', type=int, nargs='+', default=DEFAULT_MAX_LEVELS, help="最大层数")
+    parser.add_argument('--repeat', type=int, default=3, help="每项重复次数（取最短时间）")
+    parser.add_argument('--output', default="./test/skiplist_benchmark.json", help="JSON 结果文件")
+    parser.add_argument('--baseline', help="对比的基线 JSON 文件")
+    parser.add_argument('--save-baseline', help="把本次结果另存为基线")
+    parser.add_argument('--threshold', type=float, default=THRESHOLD, help="允许的变慢比例，默认 0.2")
+    return parser.parse_args(argv)
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    regressions = main_test_harness(args.sizes, args.p, args.max_level, args.repeat, args.output,
+                                    args.baseline, args.save_baseline, args.threshold)
+    sys.exit(1 if regressions else 0)
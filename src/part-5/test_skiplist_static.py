@@ -0,0 +1,114 @@
+'''
+静态跳表指针 (√n / 固定间隔 / 分层间隔) 与随机 SkipList 的求交性能对比
+使用真实语料中的词项对
+'''
+import time
+import random
+import skiplist
+import compress_index as Compress
+import os, sys
+
+
+# 参与对比的跳表布局: (名称, 构建函数)
+LAYOUTS = [
+    ('random p=0.25', lambda values: build_random(values, 0.25)),
+    ('random p=0.5',  lambda values: build_random(values, 0.5)),
+    ('static sqrt(n)', lambda values: skiplist.SkipList.from_sorted(values, stride='sqrt')),
+    ('static fixed=4', lambda values: skiplist.SkipList.from_sorted(values, stride=4)),
+    ('static fixed=16', lambda values: skiplist.SkipList.from_sorted(values, stride=16)),
+    ('static [4,16,64]', lambda values: skiplist.SkipList.from_sorted(values, stride=[4, 16, 64])),
+]
+
+
+def build_random(values, p, max_level=16):
+    sl = skiplist.SkipList(max_level, p)
+    for value in values:
+        sl.insert(value)
+    return sl
+
+
+def collect_postings(documents):
+    """{token: 有序的 Value 列表}"""
+    postings = {}
+    for doc_id in sorted(documents.keys()):
+        for token, pos in documents[doc_id].items():
+            postings.setdefault(token, []).append(skiplist.Value(doc_id, pos))
+    return postings
+
+
+def pick_term_pairs(postings, n_pairs=30, seed=42):
+    """
+    按 df 挑选词项对，覆盖不同的长度比:
+    高频 × 高频、高频 × 中频、高频 × 低频、中频 × 低频
+    """
+    rng = random.Random(seed)
+    by_df = sorted(postings, key=lambda t: len(postings[t]), reverse=True)
+    n = len(by_df)
+    high = by_df[:max(1, n // 100)]
+    mid = by_df[n // 100:max(n // 100 + 1, n // 10)]
+    low = [t for t in by_df[n // 10:] if len(postings[t]) >= 2] or by_df[-1:]
+
+    groups = [('高频×高频', high, high), ('高频×中频', high, mid),
+              ('高频×低频', high, low), ('中频×低频', mid, low)]
+    pairs = []
+    for name, left, right in groups:
+        for _ in range(n_pairs // len(groups)):
+            t1, t2 = rng.choice(left), rng.choice(right)
+            if t1 != t2:
+                pairs.append((name, t1, t2))
+    return pairs
+
+
+def run_intersection_test(postings, pairs, build, repeat=5):
+    """
+    :return: {分组: (总耗时, 总比较次数)}
+    """
+    terms = {t for _, t1, t2 in pairs for t in (t1, t2)}
+    lists = {t: build(postings[t]) for t in terms}
+
+    results = {}
+    for name, t1, t2 in pairs:
+        stats = {}
+        start_time = time.perf_counter()
+        for _ in range(repeat):
+            skiplist.intersect(lists[t1], lists[t2])
+        elapsed = (time.perf_counter() - start_time) / repeat
+        skiplist.intersect(lists[t1], lists[t2], stats)
+
+        total_time, total_cmp = results.get(name, (0.0, 0))
+        results[name] = (total_time + elapsed, total_cmp + stats['comparisons'])
+    return results
+
+
+def main_test_harness(input_path="output_data/", input_ending='.stw'):
+    documents = Compress.read_documents(input_path, input_ending)
+    postings = collect_postings(documents)
+    pairs = pick_term_pairs(postings)
+
+    os.makedirs("./test", exist_ok=True)
+    filename = "./test/test_skiplist_static.log"
+    with open(filename, 'w', encoding='utf-8') as file:
+        STDOUT = sys.stdout
+        sys.stdout = file
+
+        print(f"静态跳表指针 vs 随机跳表 求交性能对比 (文档数 {len(documents)}, 词项对 {len(pairs)})")
+        print("-" * 80)
+        for name, t1, t2 in pairs:
+            print(f"{name:<10} {t1}({len(postings[t1])}) AND {t2}({len(postings[t2])})")
+
+        groups = sorted({name for name, _, _ in pairs})
+        print("\n" + "-" * 80)
+        print(f"{'布局':<18} | {'分组':<10} | {'求交时间 (毫秒)':<15} | {'比较次数':<10}")
+        print("-" * 80)
+        for layout_name, build in LAYOUTS:
+            results = run_intersection_test(postings, pairs, build)
+            for group in groups:
+                total_time, total_cmp = results[group]
+                print(f"{layout_name:<18} | {group:<10} | {total_time * 1000:<15.4f} | {total_cmp:<10}")
+            print("-" * 80)
+
+        sys.stdout = STDOUT
+        print(f"静态跳表指针对比结果已经写入到'{filename}'中！")
+
+if __name__ == '__main__':
+    main_test_harness()
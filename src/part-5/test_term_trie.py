@@ -0,0 +1,92 @@
+'''
+DAWG 词典测试
+1. 正确性: 所有词项的精确查找与序号还原、所有 1~3 字符前缀的枚举和 top-k 补全，与有序词表上的暴力结果对比
+2. 空间: DAWG 节点数与普通字典树节点数、扁平数组字节数与前端编码词典字节数
+3. 输入提示延迟: complete(prefix, 10) 的 p50 / p99
+'''
+import time
+import sys, os
+import compress_index as Compress
+import term_trie
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))] if values else 0.0
+
+
+def check(trie, sorted_tokens, df, prefixes, k):
+    """返回不一致的数量"""
+    errors = 0
+    for term_id, token in enumerate(sorted_tokens):
+        if trie.lookup(token) != term_id or trie.term_at(term_id) != token:
+            errors += 1
+    for missing in ["", "zzzz_not_a_term", sorted_tokens[0] + "\x00"]:
+        if missing not in sorted_tokens and trie.lookup(missing) is not None:
+            errors += 1
+    for prefix in prefixes:
+        expected = [token for token in sorted_tokens if token.startswith(prefix)]
+        if list(trie.enumerate(prefix)) != expected:
+            errors += 1
+        top = sorted(expected, key=lambda token: (-df[token], token))[:k]
+        if trie.complete(prefix, k) != [(token, df[token]) for token in top]:
+            errors += 1
+    return errors
+
+
+def main_test_harness(input_path="output_data/", input_ending='.stw', k=10, block_size=4):
+    documents = Compress.read_documents(input_path, input_ending)
+    sorted_tokens = Compress.collect_and_sort_tokens(documents)
+    df = term_trie.document_frequencies(Compress.invert_index(documents))
+
+    start_time = time.perf_counter()
+    trie = term_trie.TermTrie.build(sorted_tokens, df)
+    build_time = time.perf_counter() - start_time
+
+    prefixes = sorted({token[:n] for token in sorted_tokens for n in (1, 2, 3) if len(token) >= n})
+    errors = check(trie, sorted_tokens, df, prefixes, k)
+
+    latencies = []
+    for prefix in prefixes:
+        start_time = time.perf_counter()
+        trie.complete(prefix, k)
+        latencies.append(time.perf_counter() - start_time)
+    lookup_latencies = []
+    for token in sorted_tokens:
+        start_time = time.perf_counter()
+        trie.lookup(token)
+        lookup_latencies.append(time.perf_counter() - start_time)
+
+    trie_nodes = len({token[:n] for token in sorted_tokens for n in range(len(token) + 1)})
+    term_bytes, dictionary_index = Compress.front_code_and_block_bytes(sorted_tokens, block_size)
+
+    os.makedirs("./test", exist_ok=True)
+    filename = "./test/test_term_trie.log"
+    with open(filename, 'w', encoding='utf-8') as file:
+        STDOUT = sys.stdout
+        sys.stdout = file
+
+        print(f"DAWG 词典测试 (词项数 {len(sorted_tokens)}, 前缀 {len(prefixes)} 个, k = {k})")
+        print("-" * 80)
+        print(f"构建耗时: {build_time * 1000:.2f} ms, 不一致结果: {errors}")
+        print(f"节点数: 普通字典树 {trie_nodes}, DAWG {trie.node_count} "
+              f"({trie.node_count / trie_nodes:.1%}), 边数 {len(trie.targets)}")
+        print(f"字节数: DAWG (含 df 与 RMQ) {trie.size_in_bytes()}, "
+              f"前端编码词典 (k={block_size}) {Compress.dictionary_size_in_bytes(term_bytes, dictionary_index)}, "
+              f"原始词项 {sum(len(t.encode('utf-8')) for t in sorted_tokens)}")
+        print(f"精确查找: p50 {percentile(lookup_latencies, 0.5) * 1e6:.2f} us, "
+              f"p99 {percentile(lookup_latencies, 0.99) * 1e6:.2f} us")
+        print(f"输入提示 complete(prefix, {k}): p50 {percentile(latencies, 0.5) * 1e6:.2f} us, "
+              f"p99 {percentile(latencies, 0.99) * 1e6:.2f} us, 最大 {max(latencies) * 1e6:.2f} us")
+        print("-" * 80)
+        for prefix in ['b', 'bo', 'inf', 'cl']:
+            print(f"'{prefix}': {trie.prefix_range(prefix)[1] - trie.prefix_range(prefix)[0]} 个词项, "
+                  f"补全 {trie.complete(prefix, 5)}")
+
+        sys.stdout = STDOUT
+        print(f"DAWG 词典测试结果已经写入到'{filename}'中！")
+    assert errors == 0
+
+
+if __name__ == '__main__':
+    main_test_harness()
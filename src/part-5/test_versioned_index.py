@@ -0,0 +1,171 @@
+'''
+多版本索引的并发测试
+读线程池持续查询，同时写线程分批添加 / 删除文档:
+1. 一致性: 每个查询结果都必须等于该查询所用快照版本的预期结果（不会看到只应用了一半的更新）
+2. 读延迟: 有写线程与无写线程时的查询延迟对比
+3. 覆盖已有文档: 文档从旧内容中独有的词项里删除，只能通过新内容检索到
+'''
+import time
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import compress_index as Compress
+from versioned_index import VersionedIndex
+import os, sys
+
+
+QUERIES = ["book AND club", "(book OR club) AND NOT chat", "new_common", "new_common AND book"]
+
+
+def make_batch(batch_id, size, vocabulary, rng):
+    """一批新文档：每个文档都包含 new_common 和 batch 专属词项，再加上若干语料中的词项"""
+    documents = {}
+    for i in range(size):
+        doc_id = f"new_{batch_id:04d}_{i:04d}"
+        tokens = {"new_common": [0], f"new_batch_{batch_id}": [1]}
+        for pos, token in enumerate(rng.sample(vocabulary, 20), start=2):
+            tokens.setdefault(token, []).append(pos)
+        documents[doc_id] = tokens
+    return documents
+
+
+def reader(index, stop, observations):
+    """每次查询先取一次快照，记录 (版本号, 查询, 结果, 延迟)，结果在写入结束后统一验证"""
+    rng = random.Random(threading.get_ident())
+    while not stop.is_set():
+        snapshot = index.snapshot()
+        query = rng.choice(QUERIES)
+        start_time = time.perf_counter()
+        result = snapshot.search(query)
+        observations.append((snapshot.version, query, result, time.perf_counter() - start_time))
+
+
+def run_readers(index, n_readers, duration, writer=None):
+    stop = threading.Event()
+    observations = []
+    with ThreadPoolExecutor(max_workers=n_readers) as pool:
+        futures = [pool.submit(reader, index, stop, observations) for _ in range(n_readers)]
+        if writer is not None:
+            writer()
+        else:
+            time.sleep(duration)
+        stop.set()
+        for future in futures:
+            future.result()
+    return observations
+
+
+def count_errors(observations, snapshots, live_new_docs):
+    """
+    并发查询的结果必须与同一版本在无并发时的结果相同；
+    new_common 的结果还必须恰好是该版本中存活的新文档
+    """
+    expected = {}
+    errors = 0
+    for version, query, result, _ in observations:
+        key = (version, query)
+        if key not in expected:
+            expected[key] = snapshots[version].search(query)
+        if result != expected[key]:
+            errors += 1
+        elif query == "new_common" and result != live_new_docs[version]:
+            errors += 1
+    return errors
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))] if values else 0.0
+
+
+def check_overwrite(inverted_posting_lists, documents):
+    """
+    覆盖文档后逐个检查: (版本, 查询, 结果, 预期)
+    先在空索引上复现 d1 {'book','club'} -> d1 {'book'}，再在真实语料上覆盖一个已有文档（分别给出与不给出旧内容）
+    """
+    checks = []
+    index = VersionedIndex({})
+    index.add_documents({"d1": {"book": [1], "club": [2]}})
+    snapshot = index.add_documents({"d1": {"book": [5]}})
+    checks.append((snapshot.version, "club", snapshot.search("club"), set()))
+    checks.append((snapshot.version, "book", snapshot.search("book"), {"d1"}))
+    checks.append((snapshot.version, "book 的位置", snapshot.engine.search_with_positions("book"), {"d1": [5]}))
+
+    doc_id = sorted(documents)[len(documents) // 2]
+    old_tokens = sorted(documents[doc_id])
+    for old_documents in (None, {doc_id: documents[doc_id]}):
+        index = VersionedIndex(inverted_posting_lists)
+        before = {token: index.search(token) for token in old_tokens}
+        snapshot = index.add_documents({doc_id: {"overwritten": [0], old_tokens[0]: [3]}}, old_documents)
+        for token in old_tokens:
+            expected = before[token] if token == old_tokens[0] else before[token] - {doc_id}
+            checks.append((snapshot.version, token, snapshot.search(token), expected))
+        checks.append((snapshot.version, "overwritten", snapshot.search("overwritten"), {doc_id}))
+    return checks
+
+
+def main_test_harness(input_path="output_data/", input_ending='.stw', n_readers=4, n_batches=10, batch_size=50):
+    documents = Compress.read_documents(input_path, input_ending)
+    inverted_posting_lists = Compress.invert_index(documents)
+    vocabulary = sorted(inverted_posting_lists)
+    rng = random.Random(42)
+
+    index = VersionedIndex(inverted_posting_lists)
+    snapshots = {0: index.snapshot()}
+    live_new_docs = {0: set()}
+    batches = [make_batch(b, batch_size, vocabulary, rng) for b in range(n_batches)]
+    publish_times = []
+
+    def writer():
+        live = set()
+        for batch_id, batch in enumerate(batches):
+            start_time = time.perf_counter()
+            if batch_id % 3 == 2:
+                # 每隔几批删除上一批的文档
+                snapshot = index.remove_documents(batches[batch_id - 1].keys(), batches[batch_id - 1])
+                live -= set(batches[batch_id - 1])
+            else:
+                snapshot = index.add_documents(batch)
+                live |= set(batch)
+            publish_times.append(time.perf_counter() - start_time)
+            snapshots[snapshot.version] = snapshot
+            live_new_docs[snapshot.version] = set(live)
+
+    baseline = run_readers(index, n_readers, duration=1.0)
+    concurrent = run_readers(index, n_readers, duration=None, writer=writer)
+    results = [("无写入", baseline, count_errors(baseline, snapshots, live_new_docs)),
+               ("并发写入", concurrent, count_errors(concurrent, snapshots, live_new_docs))]
+
+    os.makedirs("./test", exist_ok=True)
+    filename = "./test/test_versioned_index.log"
+    with open(filename, 'w', encoding='utf-8') as file:
+        STDOUT = sys.stdout
+        sys.stdout = file
+
+        print(f"多版本索引并发测试 (读线程 {n_readers} 个, 写入 {n_batches} 批 × {batch_size} 个文档)")
+        print("-" * 80)
+        print(f"{'场景':<16} | {'查询数':<8} | {'不一致结果':<10} | {'p50 (ms)':<10} | {'p99 (ms)':<10}")
+        print("-" * 80)
+        for name, observations, errors in results:
+            latencies = [latency for _, _, _, latency in observations]
+            versions = {version for version, _, _, _ in observations}
+            print(f"{name:<16} | {len(latencies):<8} | {errors:<10} | "
+                  f"{percentile(latencies, 0.5) * 1000:<10.4f} | {percentile(latencies, 0.99) * 1000:<10.4f}"
+                  f" | 涉及版本 {len(versions)} 个")
+        print(f"\n最终版本: {index.version}, 每次发布新版本平均耗时 "
+              f"{sum(publish_times) / len(publish_times) * 1000:.2f} ms")
+
+        overwrite_checks = check_overwrite(inverted_posting_lists, documents)
+        overwrite_errors = sum(result != expected for _, _, result, expected in overwrite_checks)
+        print(f"\n覆盖已有文档: 检查 {len(overwrite_checks)} 项, 不一致 {overwrite_errors} 项")
+        for version, query, result, expected in overwrite_checks:
+            if result != expected:
+                print(f"  版本 {version} {query}: 结果 {result}, 预期 {expected}")
+
+        sys.stdout = STDOUT
+        print(f"多版本索引并发测试结果已经写入到'{filename}'中！")
+    assert all(errors == 0 for _, _, errors in results)
+    assert overwrite_errors == 0
+
+if __name__ == '__main__':
+    main_test_harness()
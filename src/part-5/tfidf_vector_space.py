@@ -113,14 +113,16 @@ class DocumentVector:
 class VectorSpaceModel:
     """向量空间模型"""
     
-    def __init__(self, inverted_posting_lists, tf_scheme='log', idf_scheme='standard'):
+    def __init__(self, inverted_posting_lists, tf_scheme='log', idf_scheme='standard', global_stats=None):
         """
         :param inverted_posting_lists: 倒排索引 {term: SkipList}
         :param tf_scheme: TF计算方案
         :param idf_scheme: IDF计算方案
+        :param global_stats: 全局统计 (num_docs, {term: df})，分片时用它计算IDF，保证各分片得分可比
         """
         self.posting_lists = inverted_posting_lists
         self.calculator = TFIDFCalculator(tf_scheme, idf_scheme)
+        self.global_stats = global_stats
         
         # 统计信息
         self.num_docs = 0
@@ -159,11 +161,10 @@ class VectorSpaceModel:
             
             while current:
                 doc_id = current.value.id
-                positions = current.value.pos
                 
                 all_docs.add(doc_id)
                 term_doc_freq[term] += 1
-                doc_term_counts[doc_id][term] = len(positions)
+                doc_term_counts[doc_id][term] = current.value.tf
                 
                 current = current.forward[0]
         
@@ -177,6 +178,12 @@ class VectorSpaceModel:
     
     def _compute_idf(self):
         """计算所有词项的IDF"""
+        if self.global_stats is not None:
+            num_docs, global_df = self.global_stats
+            for term in self.df:
+                self.idf[term] = self.calculator.compute_idf(num_docs, global_df.get(term, 0))
+            return
+        
         for term, doc_freq in self.df.items():
             self.idf[term] = self.calculator.compute_idf(self.num_docs, doc_freq)
     
@@ -190,7 +197,7 @@ class VectorSpaceModel:
             
             while current:
                 doc_id = current.value.id
-                term_count = len(current.value.pos)
+                term_count = current.value.tf
                 doc_term_freqs[doc_id][term] = term_count
                 current = current.forward[0]
         
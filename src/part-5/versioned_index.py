@@ -0,0 +1,155 @@
+"""
+写时复制 (copy-on-write) 的多版本索引
+读线程与写线程并发时的快照隔离:
+- IndexSnapshot: 某一版本的只读索引视图，发布之后不再修改，读线程可以不加锁地查询
+- VersionedIndex: 写线程串行地 (写锁) 在新版本上应用更新，只复制被修改的词项的 SkipList，
+                  其余词项的 SkipList 在新旧版本之间共享；新版本构建完成后用一次引用赋值发布
+读线程每次查询先取一次当前快照的引用，之后只访问该快照，因此不会被写线程阻塞，也不会看到只应用了一半的更新。
+引用赋值在 CPython (包括 free-threaded 构建) 中是原子的，发布不需要读锁。
+"""
+
+import threading
+from collections import defaultdict
+import skiplist
+import compress_index as Compress
+import boolean_search_v2 as boolean_search
+
+
+class IndexSnapshot:
+    """某一版本的只读索引：倒排表和在其上构建的检索引擎"""
+
+    def __init__(self, version, inverted_posting_lists, dictionary_index=None, backend='skiplist'):
+        """
+        :param version: 版本号，每发布一次加一
+        :param inverted_posting_lists: 该版本的倒排索引 {token: SkipList}，发布后不再修改
+        :param dictionary_index: 压缩词典，原样传给检索引擎（增量更新不重建词典）
+        :param backend: 布尔运算后端，见 BooleanSearchEngine
+        """
+        self.version = version
+        self.posting_lists = inverted_posting_lists
+        self.dictionary = dictionary_index or {}
+        self.engine = boolean_search.BooleanSearchEngine(self.dictionary, inverted_posting_lists, backend=backend)
+
+    def search(self, query, doc_range=None):
+        return self.engine.search(query, doc_range)
+
+    def phrase_query(self, phrase_tokens):
+        return self.engine.phrase_query(phrase_tokens)
+
+
+class VersionedIndex:
+    """
+    用法:
+        index = VersionedIndex(inverted_posting_lists)
+        # 读线程
+        index.search("book AND club")            # 或 snapshot = index.snapshot() 后在同一版本上执行多个查询
+        # 写线程
+        index.add_documents({doc_id: {token: [positions]}})
+        index.remove_documents([doc_id, ...])
+    只支持 'skiplist' / 'set' 后端: 数组后端 (numpy / roaring / compressed) 在创建引擎时要把整个倒排表转换一遍，
+    每发布一个版本都重新转换的代价是 O(索引大小)
+    """
+
+    BACKENDS = ('skiplist', 'set')
+
+    def __init__(self, inverted_posting_lists, dictionary_index=None, backend='skiplist'):
+        if backend not in self.BACKENDS:
+            raise ValueError(f"VersionedIndex 不支持后端 '{backend}'，可选: {', '.join(self.BACKENDS)}")
+        self.backend = backend
+        self._write_lock = threading.Lock()
+        self._current = IndexSnapshot(0, dict(inverted_posting_lists), dictionary_index, backend)
+        # 当前版本中的全部文档ID，只由写线程在写锁内读写，用于判断 add_documents 是否覆盖已有文档
+        self._doc_ids = {value.id for skip_list in inverted_posting_lists.values() for value in skip_list.cursor()}
+
+    def snapshot(self):
+        """当前版本的只读快照"""
+        return self._current
+
+    @property
+    def version(self):
+        return self._current.version
+
+    def search(self, query, doc_range=None):
+        return self._current.search(query, doc_range)
+
+    def _publish(self, inverted_posting_lists):
+        current = self._current
+        snapshot = IndexSnapshot(current.version + 1, inverted_posting_lists, current.dictionary, self.backend)
+        self._current = snapshot
+        return snapshot
+
+    def add_documents(self, new_documents, old_documents=None):
+        """
+        添加（或覆盖）文档并发布新版本；覆盖已有文档时先把它从原来的词项中删除（同 remove_documents），再加入新内容
+        :param new_documents: {doc_id: {token: [positions]}}，格式同 read_documents
+        :param old_documents: 可选，被覆盖文档的旧内容，含义同 remove_documents 的 documents
+        :return: 新版本的快照
+        """
+        new_postings = defaultdict(list)
+        for doc_id in sorted(new_documents):
+            for token, pos in new_documents[doc_id].items():
+                new_postings[token].append(skiplist.Value(doc_id, pos))
+
+        with self._write_lock:
+            current = self._current.posting_lists
+            posting_lists = dict(current)
+            copied = set()
+            replaced = sorted(doc_id for doc_id in new_documents if doc_id in self._doc_ids)
+            if replaced:
+                self._remove(current, posting_lists, copied, replaced, old_documents)
+            for token, values in new_postings.items():
+                if token in copied:
+                    skip_list = posting_lists[token]
+                elif token in posting_lists:
+                    skip_list = posting_lists[token].copy()
+                else:
+                    skip_list = skiplist.SkipList(max_level=Compress.MAX_LEVEL, p=Compress.P)
+                skip_list.merge_sorted(values)
+                posting_lists[token] = skip_list
+            self._doc_ids.update(new_documents)
+            return self._publish(posting_lists)
+
+    def remove_documents(self, doc_ids, documents=None):
+        """
+        删除文档并发布新版本；posting list 被删空的词项一并移除
+        :param doc_ids: 要删除的文档ID
+        :param documents: 可选，被删除文档的内容 {doc_id: {token: [positions]}}；
+                          给出时只检查这些文档中出现的词项，否则需要检查所有词项
+        :return: 新版本的快照
+        """
+        doc_ids = sorted(set(doc_ids))
+        with self._write_lock:
+            current = self._current.posting_lists
+            posting_lists = dict(current)
+            self._remove(current, posting_lists, set(), doc_ids, documents)
+            self._doc_ids.difference_update(doc_ids)
+            return self._publish(posting_lists)
+
+    @staticmethod
+    def _remove(current, posting_lists, copied, doc_ids, documents=None):
+        """
+        在新版本的倒排表 posting_lists 中删除文档，被修改的词项先复制 SkipList，复制过的词项记入 copied
+        :param current: 当前版本的倒排表（只读）
+        :param doc_ids: 有序的文档ID列表
+        """
+        if documents is not None:
+            tokens = {token for doc_id in doc_ids for token in documents.get(doc_id, ())}
+        else:
+            tokens = current.keys()
+
+        for token in tokens:
+            if token not in current:
+                continue
+            # 被删除的文档按序用游标 skip_to 探测，找出该词项中实际存在的文档
+            cursor = current[token].cursor()
+            affected = [doc_id for doc_id in doc_ids if cursor.skip_to(doc_id) == doc_id]
+            if not affected:
+                continue
+            skip_list = current[token].copy()
+            for doc_id in affected:
+                skip_list.delete(doc_id)
+            if skip_list.header.forward[0] is None:
+                del posting_lists[token]
+            else:
+                posting_lists[token] = skip_list
+                copied.add(token)
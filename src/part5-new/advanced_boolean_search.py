@@ -5,6 +5,7 @@
 
 import time
 from collections import defaultdict
+import skiplist
 
 
 class AdvancedBooleanSearchEngine:
@@ -13,9 +14,14 @@ class AdvancedBooleanSearchEngine:
     记录每次操作的细节，用于分析优化效果
     """
     
-    def __init__(self, dictionary_index, inverted_posting_lists):
+    def __init__(self, dictionary_index, inverted_posting_lists, use_skip_pointers=False):
+        """
+        :param use_skip_pointers: True 时 AND 直接在 SkipList 上做有序归并并利用跳表指针跳跃，
+                                  False 时沿用先展开为 set 再求交的方式
+        """
         self.dictionary = dictionary_index
         self.posting_lists = inverted_posting_lists
+        self.use_skip_pointers = use_skip_pointers
         self.reset_metrics()
     
     def reset_metrics(self):
@@ -57,10 +63,67 @@ class AdvancedBooleanSearchEngine:
         
         return doc_ids
     
+    def _term_operand(self, token):
+        """普通词项作为运算对象：跳表模式下保留 SkipList，不逐个展开"""
+        if self.use_skip_pointers and token in self.posting_lists:
+            self.metrics['posting_list_accesses'] += 1
+            return self.posting_lists[token]
+        return self.get_posting_list(token)
+    
+    def _to_set(self, posting):
+        """SkipList 运算对象展开为集合，展开时每个元素计一次比较"""
+        if not isinstance(posting, skiplist.SkipList):
+            return posting
+        doc_ids = set()
+        for value in posting.cursor():
+            doc_ids.add(value.id)
+            self.metrics['comparison_count'] += 1
+        return doc_ids
+    
+    def _skip_and(self, posting1, posting2, label):
+        """AND操作 - 跳表指针归并求交，比较次数来自游标的实际比较"""
+        stats = {'comparisons': 0}
+        start_time = time.perf_counter()
+        
+        if isinstance(posting1, skiplist.SkipList) and isinstance(posting2, skiplist.SkipList):
+            result = set(skiplist.intersect(posting1, posting2, stats))
+        else:
+            skip_list, doc_ids = (posting1, posting2) if isinstance(posting1, skiplist.SkipList) else (posting2, posting1)
+            cursor = skip_list.cursor(stats)
+            result = set()
+            for doc_id in sorted(doc_ids):
+                stats['comparisons'] += 1
+                if cursor.skip_to(doc_id) == doc_id:
+                    result.add(doc_id)
+        
+        end_time = time.perf_counter()
+        self.metrics['comparison_count'] += stats['comparisons']
+        
+        size1, size2 = len(posting1), len(posting2)
+        self.metrics['intermediate_result_sizes'].append(len(result))
+        self.metrics['operation_times'].append({
+            'operation': label,
+            'input_sizes': (size1, size2),
+            'output_size': len(result),
+            'time': (end_time - start_time) * 1000,
+            'comparisons': stats['comparisons']
+        })
+        self.metrics['operation_sequence'].append({
+            'op': label,
+            'input1_size': size1,
+            'input2_size': size2,
+            'output_size': len(result)
+        })
+        
+        return result
+    
     def boolean_and(self, posting1, posting2, label="AND"):
         """AND操作 - 带性能监控"""
         self.metrics['set_operations'] += 1
         
+        if isinstance(posting1, skiplist.SkipList) or isinstance(posting2, skiplist.SkipList):
+            return self._skip_and(posting1, posting2, label)
+        
         start_time = time.perf_counter()
         
         # 使用较小的集合进行迭代（优化）
@@ -95,6 +158,7 @@ class AdvancedBooleanSearchEngine:
     def boolean_or(self, posting1, posting2, label="OR"):
         """OR操作 - 带性能监控"""
         self.metrics['set_operations'] += 1
+        posting1, posting2 = self._to_set(posting1), self._to_set(posting2)
         
         start_time = time.perf_counter()
         result = posting1 | posting2
@@ -119,6 +183,7 @@ class AdvancedBooleanSearchEngine:
     def boolean_not(self, posting1, all_docs, label="NOT"):
         """NOT操作 - 带性能监控"""
         self.metrics['set_operations'] += 1
+        posting1 = self._to_set(posting1)
         
         start_time = time.perf_counter()
         result = all_docs - posting1
@@ -221,7 +286,7 @@ class AdvancedBooleanSearchEngine:
                     result = self.boolean_or(result, not_result, f"OR_NOT_{i}")
                     
             elif token != ')':
-                current_posting = self.get_posting_list(token)
+                current_posting = self._term_operand(token)
                 
                 if result is None:
                     result = current_posting
@@ -234,7 +299,7 @@ class AdvancedBooleanSearchEngine:
             else:
                 i += 1
         
-        return result if result is not None else set()
+        return self._to_set(result) if result is not None else set()
     
     def search(self, query):
         """执行查询"""
@@ -372,3 +437,52 @@ def analyze_and_operation_cost(search_engine, token_pairs):
             print(f"{desc:<40} {order:<20} {metrics['comparisons']:<15} {metrics['total_time_ms']:>8.4f}")
     
     print("-"*100)
+
+
+def compare_and_strategies(dictionary_index, inverted_posting_lists, token_pairs, repeat=20):
+    """
+    对比 set 求交与跳表指针归并求交的比较次数和耗时
+    长度比越悬殊，跳表指针能跳过的文档越多
+    
+    :param token_pairs: [(token1, token2, desc), ...]
+    :return: [{'desc', 'query', 'size_ratio', 'set_comparisons', 'skip_comparisons', 'set_time', 'skip_time', 'mismatches'}, ...]
+             mismatches: 两种方式结果中不一致的文档数，正常应为 0
+    """
+    set_engine = AdvancedBooleanSearchEngine(dictionary_index, inverted_posting_lists)
+    skip_engine = AdvancedBooleanSearchEngine(dictionary_index, inverted_posting_lists, use_skip_pointers=True)
+    
+    print("\n" + "="*100)
+    print("AND求交方式对比: set vs 跳表指针")
+    print("="*100)
+    print(f"\n{'词项对':<35} {'大小比例':<10} {'set比较':<10} {'跳表比较':<10} {'set(ms)':<10} {'跳表(ms)':<10}")
+    print("-"*100)
+    
+    rows = []
+    for token1, token2, desc in token_pairs:
+        query = f"{token1} AND {token2}"
+        row = {'desc': desc, 'query': query}
+        
+        for name, engine in (('set', set_engine), ('skip', skip_engine)):
+            result = engine.search(query)
+            row[f'{name}_comparisons'] = engine.get_metrics_summary()['comparisons']
+            
+            start_time = time.perf_counter()
+            for _ in range(repeat):
+                engine.search(query)
+            row[f'{name}_time'] = (time.perf_counter() - start_time) * 1000 / repeat
+            row[f'{name}_result'] = result
+        
+        row['mismatches'] = len(row['set_result'] ^ row['skip_result'])
+        size1 = len(set_engine.get_posting_list(token1))
+        size2 = len(set_engine.get_posting_list(token2))
+        row['size_ratio'] = max(size1, size2) / max(1, min(size1, size2))
+        
+        print(f"{query + ' (' + desc + ')':<35} {row['size_ratio']:>8.2f}x  "
+              f"{row['set_comparisons']:<10} {row['skip_comparisons']:<10} "
+              f"{row['set_time']:<10.4f} {row['skip_time']:<10.4f}")
+        if row['mismatches']:
+            print(f"  !! 两种求交方式的结果不一致: {row['mismatches']} 个文档")
+        rows.append(row)
+    
+    print("-"*100)
+    return rows
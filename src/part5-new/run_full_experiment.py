@@ -17,7 +17,8 @@ from query_optimization_experiment import (
 from advanced_boolean_search import (
     AdvancedBooleanSearchEngine,
     compare_query_orders_detailed,
-    analyze_and_operation_cost
+    analyze_and_operation_cost,
+    compare_and_strategies
 )
 from experiment_visualizer import (
     ExperimentReport, PerformanceComparison,
@@ -271,6 +272,26 @@ def experiment_4_detailed_cost_analysis(advanced_engine, optimizer):
     print(f"  - 执行时间: {metrics_optimal['total_time_ms']:.4f} ms")
 
 
+def experiment_5_skip_pointer_intersection(dictionary_index, inverted_posting_lists):
+    """实验5: 跳表指针归并求交 vs set求交"""
+    print("\n\n" + "="*120)
+    print("【实验5】跳表指针归并求交 vs set求交")
+    print("="*120)
+    print("目标: 验证利用跳表指针的AND比set求交比较次数更少，且大小差异越大优势越明显\n")
+    
+    test_pairs = [
+        ("very_rare", "rare", "小差异"),
+        ("very_rare", "uncommon", "中等差异"),
+        ("very_rare", "common", "较大差异"),
+        ("very_rare", "very_common", "大差异"),
+        ("very_rare", "frequent", "极大差异"),
+        ("delta", "frequent", "两个高频词"),
+    ]
+    
+    rows = compare_and_strategies(dictionary_index, inverted_posting_lists, test_pairs)
+    return [(row['size_ratio'], row['set_comparisons'], row['skip_comparisons']) for row in rows]
+
+
 def generate_final_report(all_results):
     """生成最终实验报告"""
     print("\n\n" + "="*120)
@@ -389,6 +410,10 @@ def main():
         print("\n正在运行实验4...")
         experiment_4_detailed_cost_analysis(advanced_engine, optimizer)
         
+        print("\n正在运行实验5...")
+        exp5_results = experiment_5_skip_pointer_intersection(dictionary_index, inverted_posting_lists)
+        all_results['实验5_跳表指针求交'] = exp5_results
+        
         # 生成报告
         report_file = generate_final_report(all_results)
         
@@ -398,7 +423,7 @@ def main():
         print("="*120)
         print(f"""
 实验总结:
-  ✓ 完成 4 组实验
+  ✓ 完成 5 组实验
   ✓ 测试 20+ 个查询场景
   ✓ 生成详细报告: {report_file}
 
@@ -18,13 +18,22 @@ class SkipList:
     ├── header.value: 元素的值，在 inverted_list 中是文档序号 doc_id
     └── header.forward: 元素个数为 level+1 的数组, forward[i] 表示第i层的节点的后继
     level: 节点的层数，表示某个元素有几个(层)跳表节点
+    length: 第0层的元素个数 (df)，insert / delete 时维护，求交时无需遍历即可得到 posting list 的长度
     '''
     def __init__(self, max_level, p):
         self.max_level = max_level
         self.p = p
         self.header = Node(-1, max_level)
         self.level = 0
+        self.length = 0
         
+    def __len__(self):
+        return self.length
+
+    def cursor(self, stats=None):
+        '''返回指向第一个元素的游标'''
+        return PostingCursor(self, stats)
+
     def random_level(self):
         level = 0
         while random.random() < self.p and level < self.max_level:
@@ -59,6 +68,7 @@ class SkipList:
         for i in range(level + 1):
             new_node.forward[i] = update[i].forward[i]
             update[i].forward[i] = new_node
+        self.length += 1
             
     def delete(self, value):
         update = [None] * (self.max_level + 1)
@@ -73,14 +83,117 @@ class SkipList:
                 if update[i].forward[i] != current:
                     break
                 update[i].forward[i] = current.forward[i]
+            self.length -= 1
             while self.level > 0 and not self.header.forward[self.level]:
                 self.level -= 1
                 
                 
+# --- 利用跳表指针的有序归并求交 ---
+
+def _finger_search(node, id, stats=None):
+    '''
+    从 node (node.value.id < id) 出发向后查找，返回第一个 id >= 目标的节点
+    每到一个节点都先尝试它最高层的指针，跳不过去再逐层下降
+    '''
+    # 目标就是下一个节点时（稠密列表求交的常见情况）无需尝试高层指针
+    nxt = node.forward[0]
+    if nxt is None or nxt.value.id >= id:
+        if stats is not None:
+            stats['comparisons'] = stats.get('comparisons', 0) + 1
+        return nxt
+    i = len(node.forward) - 1
+    while i >= 0:
+        nxt = node.forward[i]
+        if stats is not None:
+            stats['comparisons'] = stats.get('comparisons', 0) + 1
+        if nxt and nxt.value.id < id:
+            node = nxt
+            i = len(node.forward) - 1
+        else:
+            i -= 1
+    return node.forward[0]
+
+class PostingCursor:
+    '''
+    SkipList 上的游标，顺序读取 posting list 而不必先把整个链表展开为集合
+    ├── doc():          当前文档ID，遍历结束后为 None
+    ├── positions():    当前文档中的位置列表
+    ├── next():         前进到下一个元素
+    └── skip_to(id):    前进到第一个 doc_id >= id 的元素，从当前节点出发利用高层指针跳跃 (finger search)
+    stats: 可选的统计字典，累计 'comparisons'
+    '''
+    def __init__(self, skip_list, stats=None):
+        self.node = skip_list.header.forward[0]
+        self.stats = stats
+
+    def doc(self):
+        return self.node.value.id if self.node else None
+
+    def positions(self):
+        return self.node.value.pos if self.node else None
+
+    def value(self):
+        return self.node.value if self.node else None
+
+    def next(self):
+        node = self.node
+        if node:
+            node = self.node = node.forward[0]
+        return node.value.id if node else None
+
+    def skip_to(self, id):
+        node = self.node
+        if node and node.value.id < id:
+            node = self.node = _finger_search(node, id, self.stats)
+        return node.value.id if node else None
+
+    def __iter__(self):
+        while self.node:
+            yield self.node.value
+            self.node = self.node.forward[0]
+
+def intersect_cursors(cursors, stats=None):
+    '''
+    多个游标的有序归并求交（生成器）
+    每产出一个 doc_id 时，所有游标都停在该文档上，可以直接读取各自的 positions()
+    游标只需提供 doc() / next() / skip_to() 三个方法
+    '''
+    if not cursors:
+        return
+    lead, others = cursors[0], cursors[1:]
+    target = lead.doc()
+    while target is not None:
+        doc = target
+        for cursor in others:
+            if stats is not None:
+                stats['comparisons'] = stats.get('comparisons', 0) + 1
+            doc = cursor.skip_to(target)
+            if doc != target:
+                break
+        if doc == target:
+            yield target
+            target = lead.next()
+        elif doc is None:
+            return
+        else:
+            target = lead.skip_to(doc)
+
+def intersect(list1, list2, stats=None):
+    '''
+    两个跳表的有序归并求交，落后的一方利用跳表指针跳过不可能匹配的文档
+    stats: 可选的统计字典，累计 'comparisons'
+    返回: 交集的 doc_id 列表（有序）
+    '''
+    cursors = [list1.cursor(stats), list2.cursor(stats)]
+    return list(intersect_cursors(cursors, stats))
+
+
 # --- 词典和 Posting List 结构 ---
 
 class DictionaryEntry:
-    """词典条目结构：存储指针和元数据"""
+    """
+    词典条目结构：存储指针和元数据
+    """
     def __init__(self, block_id, term_string_offset, compressed_length, df, post_list_ref):
         self.block_id = block_id
         self.term_string_offset = term_string_offset